@@ -11,8 +11,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 
-from app.database import get_cursor
 from app.models import LoginRequest, TokenResponse
+from app.services import params
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 security = HTTPBearer(auto_error=False)
@@ -80,14 +80,10 @@ async def login(req: LoginRequest):
 
     param_key = f"PIN_{req.target.upper()}"
 
-    with get_cursor() as cur:
-        cur.execute("SELECT valeur FROM params WHERE cle = %s", (param_key,))
-        row = cur.fetchone()
-
-    if not row:
+    stored_pin = (await params.cache.aall()).get(param_key)
+    if stored_pin is None:
         raise HTTPException(500, "PIN non configuré dans la base")
 
-    stored_pin = row["valeur"]
     if req.pin != stored_pin:
         raise HTTPException(401, "PIN incorrect")
 
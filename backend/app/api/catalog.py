@@ -32,24 +32,24 @@ async def get_pannes():
 @router.get("/marques")
 async def get_marques(categorie: str = Query(...)):
     """Liste les marques pour une catégorie."""
-    with get_cursor() as cur:
-        cur.execute(
+    async with get_cursor() as cur:
+        await cur.execute(
             "SELECT DISTINCT marque FROM catalog_marques WHERE categorie = %s ORDER BY marque",
             (categorie,),
         )
-        rows = cur.fetchall()
+        rows = await cur.fetchall()
     return [r["marque"] for r in rows]
 
 
 @router.get("/modeles")
 async def get_modeles(categorie: str = Query(...), marque: str = Query(...)):
     """Liste les modèles pour une catégorie et marque."""
-    with get_cursor() as cur:
-        cur.execute(
+    async with get_cursor() as cur:
+        await cur.execute(
             "SELECT DISTINCT modele FROM catalog_modeles WHERE categorie = %s AND marque = %s ORDER BY modele",
             (categorie, marque),
         )
-        rows = cur.fetchall()
+        rows = await cur.fetchall()
     return [r["modele"] for r in rows]
 
 
@@ -60,8 +60,8 @@ async def add_marque(
     user: dict = Depends(get_current_user),
 ):
     """Ajoute une marque au catalogue."""
-    with get_cursor() as cur:
-        cur.execute(
+    async with get_cursor() as cur:
+        await cur.execute(
             "INSERT INTO catalog_marques (categorie, marque) VALUES (%s, %s) ON CONFLICT DO NOTHING",
             (categorie, marque),
         )
@@ -76,8 +76,8 @@ async def add_modele(
     user: dict = Depends(get_current_user),
 ):
     """Ajoute un modèle au catalogue."""
-    with get_cursor() as cur:
-        cur.execute(
+    async with get_cursor() as cur:
+        await cur.execute(
             "INSERT INTO catalog_modeles (categorie, marque, modele) VALUES (%s, %s, %s) ON CONFLICT DO NOTHING",
             (categorie, marque, modele),
         )
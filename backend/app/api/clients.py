@@ -3,8 +3,10 @@ API CRUD Clients — compatible schéma PostgreSQL existant.
 """
 
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from app.database import get_cursor
+from app.api.pagination import keyset_condition, set_next_cursor, sort_expr
+from app.services import search as search_index
 from app.models import ClientCreate, ClientUpdate, ClientOut
 from app.api.auth import get_current_user
 
@@ -16,36 +18,54 @@ async def list_clients(
     search: Optional[str] = None,
     limit: int = Query(100, le=500),
     offset: int = 0,
+    cursor: Optional[str] = None,
+    response: Response = None,
     user: dict = Depends(get_current_user),
 ):
-    """Liste les clients avec recherche optionnelle."""
+    """Liste les clients avec recherche optionnelle.
+
+    Sans recherche : pagination par `cursor` ou `offset`. Avec `search` :
+    résultats classés par pertinence, pagination par `offset`.
+    """
+    conditions = []
+    params = []
+    rank_params = []
+    order = f"{sort_expr('date_creation')} DESC, id DESC"
+
     if search:
-        with get_cursor() as cur:
-            s = f"%{search}%"
-            cur.execute("""
-                SELECT * FROM clients 
-                WHERE nom ILIKE %s OR prenom ILIKE %s 
-                      OR telephone LIKE %s OR email ILIKE %s 
-                      OR societe ILIKE %s
-                ORDER BY date_creation DESC
-                LIMIT %s OFFSET %s
-            """, (s, s, s, s, s, limit, offset))
-            return cur.fetchall()
-    else:
-        with get_cursor() as cur:
-            cur.execute(
-                "SELECT * FROM clients ORDER BY date_creation DESC LIMIT %s OFFSET %s",
-                (limit, offset),
-            )
-            return cur.fetchall()
+        if search_index.is_phone(search):
+            conditions.append(search_index.phone_clause(search, params))
+            rank = search_index.rank_expr(search, rank_params, phone_alias="")
+        else:
+            conditions.append(search_index.text_clause(search, params, ""))
+            rank = search_index.rank_expr(search, rank_params, "")
+        order = f"{rank} DESC, {order}"
+    elif cursor:
+        conditions.append(keyset_condition("date_creation", "id", cursor, params))
+        offset = 0
+
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+    async with get_cursor() as cur:
+        await cur.execute(
+            f"""SELECT * FROM clients {where}
+                ORDER BY {order}
+                LIMIT %s OFFSET %s""",
+            params + rank_params + [limit, offset],
+        )
+        rows = await cur.fetchall()
+
+    if not search:
+        set_next_cursor(response, rows, limit, "date_creation")
+    return rows
 
 
 @router.get("/{client_id}", response_model=ClientOut)
 async def get_client(client_id: int, user: dict = Depends(get_current_user)):
     """Récupère un client par ID."""
-    with get_cursor() as cur:
-        cur.execute("SELECT * FROM clients WHERE id = %s", (client_id,))
-        row = cur.fetchone()
+    async with get_cursor() as cur:
+        await cur.execute("SELECT * FROM clients WHERE id = %s", (client_id,))
+        row = await cur.fetchone()
     if not row:
         raise HTTPException(404, "Client non trouvé")
     return row
@@ -54,9 +74,9 @@ async def get_client(client_id: int, user: dict = Depends(get_current_user)):
 @router.get("/tel/{telephone}")
 async def get_client_by_tel(telephone: str):
     """Recherche un client par téléphone (public — formulaire client)."""
-    with get_cursor() as cur:
-        cur.execute("SELECT * FROM clients WHERE telephone = %s", (telephone,))
-        row = cur.fetchone()
+    async with get_cursor() as cur:
+        await cur.execute("SELECT * FROM clients WHERE telephone = %s", (telephone,))
+        row = await cur.fetchone()
     return row  # None si pas trouvé (pas d'erreur 404)
 
 
@@ -66,14 +86,14 @@ async def create_or_get_client(data: ClientCreate):
     
     Compatible avec get_or_create_client de l'app Streamlit.
     """
-    with get_cursor() as cur:
+    async with get_cursor() as cur:
         # Vérifier si le client existe
-        cur.execute("SELECT * FROM clients WHERE telephone = %s", (data.telephone,))
-        existing = cur.fetchone()
+        await cur.execute("SELECT * FROM clients WHERE telephone = %s", (data.telephone,))
+        existing = await cur.fetchone()
 
         if existing:
             # Mettre à jour les infos si elles ont changé
-            cur.execute("""
+            await cur.execute("""
                 UPDATE clients SET 
                     nom = COALESCE(NULLIF(%s, ''), nom),
                     prenom = COALESCE(NULLIF(%s, ''), prenom),
@@ -86,10 +106,10 @@ async def create_or_get_client(data: ClientCreate):
                 data.nom, data.prenom, data.email,
                 data.societe, data.carte_camby, existing["id"],
             ))
-            return cur.fetchone()
+            return await cur.fetchone()
 
         # Créer le client
-        cur.execute("""
+        await cur.execute("""
             INSERT INTO clients (nom, prenom, telephone, email, societe, carte_camby)
             VALUES (%s, %s, %s, %s, %s, %s)
             RETURNING *
@@ -97,7 +117,7 @@ async def create_or_get_client(data: ClientCreate):
             data.nom, data.prenom, data.telephone,
             data.email, data.societe, data.carte_camby,
         ))
-        return cur.fetchone()
+        return await cur.fetchone()
 
 
 @router.patch("/{client_id}", response_model=dict)
@@ -114,8 +134,8 @@ async def update_client(
     set_clause = ", ".join(f"{k} = %s" for k in updates.keys())
     values = list(updates.values()) + [client_id]
 
-    with get_cursor() as cur:
-        cur.execute(f"UPDATE clients SET {set_clause} WHERE id = %s", values)
+    async with get_cursor() as cur:
+        await cur.execute(f"UPDATE clients SET {set_clause} WHERE id = %s", values)
 
     return {"ok": True}
 
@@ -123,13 +143,13 @@ async def update_client(
 @router.delete("/{client_id}", response_model=dict)
 async def delete_client(client_id: int, user: dict = Depends(get_current_user)):
     """Supprime un client (vérifie qu'il n'a pas de tickets)."""
-    with get_cursor() as cur:
-        cur.execute("SELECT COUNT(*) as cnt FROM tickets WHERE client_id = %s", (client_id,))
-        row = cur.fetchone()
+    async with get_cursor() as cur:
+        await cur.execute("SELECT COUNT(*) as cnt FROM tickets WHERE client_id = %s", (client_id,))
+        row = await cur.fetchone()
         if row and row["cnt"] > 0:
             raise HTTPException(400, f"Ce client a {row['cnt']} ticket(s). Supprimez-les d'abord.")
 
-        cur.execute("DELETE FROM clients WHERE id = %s", (client_id,))
+        await cur.execute("DELETE FROM clients WHERE id = %s", (client_id,))
 
     return {"ok": True}
 
@@ -137,9 +157,9 @@ async def delete_client(client_id: int, user: dict = Depends(get_current_user)):
 @router.get("/{client_id}/tickets", response_model=list)
 async def get_client_tickets(client_id: int, user: dict = Depends(get_current_user)):
     """Récupère tous les tickets d'un client."""
-    with get_cursor() as cur:
-        cur.execute(
+    async with get_cursor(readonly=True) as cur:
+        await cur.execute(
             "SELECT * FROM tickets WHERE client_id = %s ORDER BY date_depot DESC",
             (client_id,),
         )
-        return cur.fetchall()
+        return await cur.fetchall()
@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends
 from app.database import get_cursor
 from app.models import ParamUpdate, ParamOut
 from app.api.auth import get_current_user
+from app.services import params as params_cache
 
 router = APIRouter(prefix="/api/config", tags=["config"])
 
@@ -13,9 +14,9 @@ router = APIRouter(prefix="/api/config", tags=["config"])
 @router.get("", response_model=list[ParamOut])
 async def list_params(user: dict = Depends(get_current_user)):
     """Liste tous les paramètres."""
-    with get_cursor() as cur:
-        cur.execute("SELECT cle, valeur FROM params ORDER BY cle")
-        return cur.fetchall()
+    async with get_cursor() as cur:
+        await cur.execute("SELECT cle, valeur FROM params ORDER BY cle")
+        return await cur.fetchall()
 
 
 @router.get("/public")
@@ -25,32 +26,34 @@ async def get_public_params():
         "NOM_BOUTIQUE", "TEL_BOUTIQUE", "ADRESSE_BOUTIQUE",
         "HORAIRES_BOUTIQUE", "URL_SUIVI",
     ]
-    with get_cursor() as cur:
-        cur.execute(
+    async with get_cursor() as cur:
+        await cur.execute(
             "SELECT cle, valeur FROM params WHERE cle = ANY(%s)",
             (public_keys,),
         )
-        rows = cur.fetchall()
+        rows = await cur.fetchall()
     return {row["cle"]: row["valeur"] for row in rows}
 
 
 @router.get("/{cle}")
 async def get_param(cle: str, user: dict = Depends(get_current_user)):
     """Récupère un paramètre par clé."""
-    with get_cursor() as cur:
-        cur.execute("SELECT valeur FROM params WHERE cle = %s", (cle,))
-        row = cur.fetchone()
+    async with get_cursor() as cur:
+        await cur.execute("SELECT valeur FROM params WHERE cle = %s", (cle,))
+        row = await cur.fetchone()
     return {"cle": cle, "valeur": row["valeur"] if row else None}
 
 
 @router.put("")
 async def set_param(data: ParamUpdate, user: dict = Depends(get_current_user)):
     """Crée ou met à jour un paramètre."""
-    with get_cursor() as cur:
-        cur.execute("""
+    async with get_cursor() as cur:
+        await cur.execute("""
             INSERT INTO params (cle, valeur) VALUES (%s, %s)
             ON CONFLICT (cle) DO UPDATE SET valeur = EXCLUDED.valeur
         """, (data.cle, data.valeur))
+    # Les autres workers sont prévenus par le trigger params_notify
+    params_cache.cache.invalidate()
     return {"ok": True}
 
 
@@ -60,10 +63,10 @@ async def set_params_batch(
     user: dict = Depends(get_current_user),
 ):
     """Met à jour plusieurs paramètres en une fois."""
-    with get_cursor() as cur:
-        for p in params:
-            cur.execute("""
-                INSERT INTO params (cle, valeur) VALUES (%s, %s)
-                ON CONFLICT (cle) DO UPDATE SET valeur = EXCLUDED.valeur
-            """, (p.cle, p.valeur))
+    async with get_cursor() as cur:
+        await cur.executemany("""
+            INSERT INTO params (cle, valeur) VALUES (%s, %s)
+            ON CONFLICT (cle) DO UPDATE SET valeur = EXCLUDED.valeur
+        """, [(p.cle, p.valeur) for p in params])
+    params_cache.cache.invalidate()
     return {"ok": True}
@@ -0,0 +1,59 @@
+"""
+Pagination par curseur (keyset) pour les listes triées par date.
+
+Le curseur est opaque pour le client : c'est la clé de tri et l'id de la
+dernière ligne renvoyée, encodés en base64. La page suivante est
+`WHERE (date, id) < (curseur)`, servie par un index (date DESC, id DESC) :
+coût constant quelle que soit la profondeur, et pas de doublons ni de trous
+quand des lignes arrivent pendant la pagination.
+
+Le curseur suivant est renvoyé dans l'en-tête `X-Next-Cursor` (absent en fin
+de liste) ; le corps reste une simple liste, et `offset` reste accepté.
+
+Une date NULL (valeur legacy illisible) est triée comme '-infinity', donc en
+fin de liste : tri (`sort_expr`), curseur et index utilisent la même
+expression, sinon `(NULL, id) < (...)` vaut NULL et les pages suivantes
+reviennent vides.
+"""
+
+import base64
+import json
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+NULL_SORT_VALUE = "-infinity"
+
+
+def sort_expr(sort_col: str) -> str:
+    """Expression de tri d'une colonne date (NULL en dernier en DESC)."""
+    return f"COALESCE({sort_col}, '{NULL_SORT_VALUE}'::timestamptz)"
+
+
+def encode_cursor(sort_value, row_id) -> str:
+    raw = json.dumps([sort_value, row_id], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Retourne (valeur de tri, id) ; 400 si le curseur est illisible."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Curseur de pagination invalide")
+
+
+def keyset_condition(sort_col: str, id_col: str, cursor: str, params: list) -> str:
+    """Condition SQL "après le curseur" pour un tri (sort_col DESC, id_col DESC)."""
+    params.extend(decode_cursor(cursor))
+    return f"({sort_expr(sort_col)}, {id_col}) < (%s::timestamptz, %s)"
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, sort_key: str):
+    """Pose X-Next-Cursor si la page est pleine (il peut rester des lignes)."""
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        sort_value = last[sort_key] if last[sort_key] is not None else NULL_SORT_VALUE
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(sort_value, last["id"])
@@ -3,8 +3,9 @@ API Commandes de pièces.
 """
 
 from typing import Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from app.database import get_cursor
+from app.api.pagination import keyset_condition, set_next_cursor, sort_expr
 from app.models import CommandePieceCreate, CommandePieceUpdate, CommandePieceOut
 from app.api.auth import get_current_user
 
@@ -15,9 +16,13 @@ router = APIRouter(prefix="/api/parts", tags=["parts"])
 async def list_parts(
     ticket_id: Optional[int] = None,
     statut: Optional[str] = None,
+    limit: int = Query(200, le=1000),
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    response: Response = None,
     user: dict = Depends(get_current_user),
 ):
-    """Liste les commandes de pièces avec filtres."""
+    """Liste les commandes de pièces avec filtres (pagination par `cursor` ou `offset`)."""
     conditions = []
     params = []
 
@@ -27,29 +32,37 @@ async def list_parts(
     if statut:
         conditions.append("statut = %s")
         params.append(statut)
+    if cursor:
+        conditions.append(keyset_condition("date_creation", "id", cursor, params))
+        offset = 0
 
     where = "WHERE " + " AND ".join(conditions) if conditions else ""
 
-    with get_cursor() as cur:
-        cur.execute(
-            f"SELECT * FROM commandes_pieces {where} ORDER BY date_creation DESC",
-            params,
+    async with get_cursor() as cur:
+        await cur.execute(
+            f"""SELECT * FROM commandes_pieces {where}
+                ORDER BY {sort_expr('date_creation')} DESC, id DESC
+                LIMIT %s OFFSET %s""",
+            params + [limit, offset],
         )
-        return cur.fetchall()
+        rows = await cur.fetchall()
+
+    set_next_cursor(response, rows, limit, "date_creation")
+    return rows
 
 
 @router.post("", response_model=dict)
 async def create_part(data: CommandePieceCreate, user: dict = Depends(get_current_user)):
     """Crée une commande de pièce."""
-    with get_cursor() as cur:
-        cur.execute("""
+    async with get_cursor() as cur:
+        await cur.execute("""
             INSERT INTO commandes_pieces (ticket_id, description, fournisseur, reference, prix, notes)
             VALUES (%s, %s, %s, %s, %s, %s) RETURNING id
         """, (
             data.ticket_id, data.description, data.fournisseur,
             data.reference, data.prix, data.notes,
         ))
-        row = cur.fetchone()
+        row = await cur.fetchone()
     return {"id": row["id"]}
 
 
@@ -67,8 +80,8 @@ async def update_part(
     set_clause = ", ".join(f"{k} = %s" for k in updates.keys())
     values = list(updates.values()) + [commande_id]
 
-    with get_cursor() as cur:
-        cur.execute(f"UPDATE commandes_pieces SET {set_clause} WHERE id = %s", values)
+    async with get_cursor() as cur:
+        await cur.execute(f"UPDATE commandes_pieces SET {set_clause} WHERE id = %s", values)
 
     return {"ok": True}
 
@@ -76,6 +89,6 @@ async def update_part(
 @router.delete("/{commande_id}", response_model=dict)
 async def delete_part(commande_id: int, user: dict = Depends(get_current_user)):
     """Supprime une commande de pièce."""
-    with get_cursor() as cur:
-        cur.execute("DELETE FROM commandes_pieces WHERE id = %s", (commande_id,))
+    async with get_cursor() as cur:
+        await cur.execute("DELETE FROM commandes_pieces WHERE id = %s", (commande_id,))
     return {"ok": True}
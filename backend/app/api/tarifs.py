@@ -3,86 +3,21 @@ API Tarifs — Gestion des grilles tarifaires de réparation.
 """
 
 import math
-import threading
-from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import Optional
 
-from app.database import get_cursor
-from app.models import TarifOut, TarifImportRequest, TarifStats
+from app.database import get_cursor, run_in_db_thread
+from app.services import pricing, scrape_jobs, tarif_index
+from app.services.tarif_loader import TarifLoadError, load_tarifs
+from app.models import (
+    TarifOut, TarifImportRequest, TarifStats, TarifTendance, TarifPrixPoint, ScrapeJobOut,
+    TarifSearchResult,
+)
 from app.api.auth import get_current_user
 
 router = APIRouter(prefix="/api/tarifs", tags=["tarifs"])
 
-# ─── TABLE INIT ──────────────────────────────────────────────
-INIT_SQL = """
-CREATE TABLE IF NOT EXISTS tarifs (
-    id SERIAL PRIMARY KEY,
-    marque VARCHAR(50) NOT NULL,
-    modele VARCHAR(100) NOT NULL,
-    type_piece VARCHAR(50) NOT NULL,
-    qualite VARCHAR(50) DEFAULT '',
-    nom_fournisseur TEXT DEFAULT '',
-    prix_fournisseur_ht DECIMAL(10,2),
-    prix_client INTEGER NOT NULL,
-    categorie VARCHAR(20) DEFAULT 'standard',
-    source VARCHAR(50) DEFAULT 'mobilax',
-    updated_at TIMESTAMP DEFAULT NOW()
-);
-
-CREATE INDEX IF NOT EXISTS idx_tarifs_marque ON tarifs(marque);
-CREATE INDEX IF NOT EXISTS idx_tarifs_modele ON tarifs(modele);
-CREATE INDEX IF NOT EXISTS idx_tarifs_recherche ON tarifs(marque, modele, type_piece);
-"""
-
-
-def _ensure_table():
-    """Crée la table tarifs si elle n'existe pas."""
-    try:
-        with get_cursor() as cur:
-            cur.execute(INIT_SQL)
-    except Exception:
-        pass  # Table existe déjà
-
-
-# ─── HELPERS ─────────────────────────────────────────────────
-
-def arrondi_9(prix):
-    """Arrondi au 9 : 0-1→9 inf, 2-9→9 sup."""
-    p = round(prix)
-    if p <= 0:
-        return 9
-    last = p % 10
-    if last == 9:
-        return p
-    elif last <= 1:
-        return p - last - 1
-    else:
-        return p + (9 - last)
-
-
-def calcul_prix_client(prix_ht, type_piece, categorie="standard"):
-    """
-    Règles KLIKPHONE:
-    - Écrans standard : prix × 1.2 + 60
-    - Écrans haut de gamme : prix × 1.2 + 70
-    - Écrans pliants : prix × 1.2 + 100
-    - Batteries / Connecteurs / Caméras : prix × 1.2 + 60
-    """
-    base = prix_ht * 1.2
-    if type_piece.lower() in ["ecran", "écran"]:
-        if categorie == "pliant":
-            marge = 100
-        elif categorie == "haut_de_gamme":
-            marge = 70
-        else:
-            marge = 60
-    else:
-        marge = 60
-    return arrondi_9(base + marge)
-
-
 # ─── ENDPOINTS ───────────────────────────────────────────────
 
 @router.get("", response_model=list[TarifOut])
@@ -90,48 +25,47 @@ async def list_tarifs(
     q: Optional[str] = None,
     marque: Optional[str] = None,
     type_piece: Optional[str] = None,
+    qualite: Optional[str] = None,
     limit: int = Query(1000, le=5000),
     offset: int = 0,
     user: dict = Depends(get_current_user),
 ):
-    """Liste les tarifs avec filtres optionnels."""
-    _ensure_table()
-
-    conditions = []
-    params = []
+    """Liste les tarifs avec filtres optionnels (index mémoire).
 
-    if q:
-        conditions.append("(LOWER(modele) LIKE %s OR LOWER(marque) LIKE %s OR LOWER(nom_fournisseur) LIKE %s)")
-        term = f"%{q.lower()}%"
-        params.extend([term, term, term])
-
-    if marque:
-        conditions.append("LOWER(marque) = %s")
-        params.append(marque.lower())
+    `q` garde sa sémantique historique de sous-chaîne ("52" trouve "A52") ;
+    la recherche par débuts de mots est sur /search.
+    """
+    idx = await tarif_index.index.aget()
+    result = idx.search(q, limit=limit, offset=offset, substring=True,
+                        marque=marque, type_piece=type_piece, qualite=qualite)
+    return result["items"]
 
-    if type_piece:
-        conditions.append("LOWER(type_piece) = %s")
-        params.append(type_piece.lower())
 
-    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+@router.get("/search", response_model=TarifSearchResult)
+async def search_tarifs(
+    q: Optional[str] = None,
+    marque: Optional[str] = None,
+    type_piece: Optional[str] = None,
+    qualite: Optional[str] = None,
+    limit: int = Query(50, le=1000),
+    offset: int = 0,
+    user: dict = Depends(get_current_user),
+):
+    """Recherche instantanée (saisie au fil de l'eau) avec compteurs par facette.
 
-    with get_cursor() as cur:
-        cur.execute(
-            f"""SELECT * FROM tarifs {where}
-                ORDER BY marque, modele, type_piece, qualite
-                LIMIT %s OFFSET %s""",
-            params + [limit, offset],
-        )
-        return cur.fetchall()
+    Chaque mot de `q` doit commencer un mot de la marque, du modèle ou du
+    nom fournisseur ("gal a52 ole" trouve "Galaxy A52 ... OLED").
+    """
+    idx = await tarif_index.index.aget()
+    return idx.search(q, limit=limit, offset=offset,
+                      marque=marque, type_piece=type_piece, qualite=qualite)
 
 
 @router.get("/stats", response_model=TarifStats)
 async def get_stats(user: dict = Depends(get_current_user)):
     """Statistiques sur les tarifs."""
-    _ensure_table()
-
-    with get_cursor() as cur:
-        cur.execute("""
+    async with get_cursor(readonly=True) as cur:
+        await cur.execute("""
             SELECT
                 COUNT(*) as total_tarifs,
                 COUNT(DISTINCT modele) as total_modeles,
@@ -141,13 +75,13 @@ async def get_stats(user: dict = Depends(get_current_user)):
                 MAX(updated_at) as last_update
             FROM tarifs
         """)
-        row = cur.fetchone()
+        row = await cur.fetchone()
 
-        cur.execute("""
+        await cur.execute("""
             SELECT marque, COUNT(DISTINCT modele) as nb_modeles
             FROM tarifs GROUP BY marque ORDER BY marque
         """)
-        par_marque = {r["marque"]: r["nb_modeles"] for r in cur.fetchall()}
+        par_marque = {r["marque"]: r["nb_modeles"] for r in await cur.fetchall()}
 
     return TarifStats(
         total_tarifs=row["total_tarifs"] or 0,
@@ -155,69 +89,142 @@ async def get_stats(user: dict = Depends(get_current_user)):
         total_marques=row["total_marques"] or 0,
         prix_min=row["prix_min"],
         prix_max=row["prix_max"],
-        last_update=str(row["last_update"]) if row["last_update"] else None,
+        last_update=row["last_update"],
         par_marque=par_marque,
     )
 
 
+@router.get("/tendance", response_model=list[TarifTendance])
+async def get_tendance(
+    modele: str,
+    marque: Optional[str] = None,
+    type_piece: Optional[str] = None,
+    user: dict = Depends(get_current_user),
+):
+    """Évolution des prix d'un modèle, par pièce et qualité (tarifs_history)."""
+    conditions = ["LOWER(modele) = %s"]
+    params = [modele.lower()]
+    if marque:
+        conditions.append("LOWER(marque) = %s")
+        params.append(marque.lower())
+    if type_piece:
+        conditions.append("LOWER(type_piece) = %s")
+        params.append(type_piece.lower())
+
+    async with get_cursor(readonly=True) as cur:
+        await cur.execute(
+            f"""SELECT marque, modele, type_piece, qualite, changed_at,
+                       nouveau_prix_fournisseur_ht, nouveau_prix_client
+                FROM tarifs_history
+                WHERE {" AND ".join(conditions)}
+                ORDER BY marque, modele, type_piece, qualite, changed_at, id""",
+            params,
+        )
+        rows = await cur.fetchall()
+
+    series = {}
+    for r in rows:
+        key = (r["marque"], r["modele"], r["type_piece"], r["qualite"])
+        if key not in series:
+            series[key] = TarifTendance(
+                marque=r["marque"], modele=r["modele"],
+                type_piece=r["type_piece"], qualite=r["qualite"],
+            )
+        # Prix à NULL : tarif retiré de la grille à cette date
+        series[key].points.append(TarifPrixPoint(
+            date=r["changed_at"],
+            prix_fournisseur_ht=r["nouveau_prix_fournisseur_ht"],
+            prix_client=r["nouveau_prix_client"],
+        ))
+    return list(series.values())
+
+
 @router.post("/import", response_model=dict)
 async def import_tarifs(
     data: TarifImportRequest,
+    force: bool = False,
     user: dict = Depends(get_current_user),
 ):
-    """Import bulk de tarifs (JSON). Vide et recrée."""
-    _ensure_table()
-
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    count = 0
-
-    with get_cursor() as cur:
-        # Vider la table
-        cur.execute("DELETE FROM tarifs")
-
-        for t in data.tarifs:
-            cur.execute(
-                """INSERT INTO tarifs
-                   (marque, modele, type_piece, qualite, nom_fournisseur,
-                    prix_fournisseur_ht, prix_client, categorie, source, updated_at)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
-                (
-                    t.marque, t.modele, t.type_piece, t.qualite,
-                    t.nom_fournisseur, t.prix_fournisseur_ht, t.prix_client,
-                    t.categorie, t.source, now,
-                ),
-            )
-            count += 1
+    """Import bulk de tarifs (JSON) : la grille est alignée sur le contenu envoyé.
+
+    Seuls les tarifs nouveaux, modifiés ou absents sont écrits. `force`
+    accepte une grille beaucoup plus petite que l'actuelle.
+    """
+    try:
+        report = await run_in_db_thread(
+            load_tarifs, (t.model_dump() for t in data.tarifs), force=force,
+        )
+    except TarifLoadError as e:
+        raise HTTPException(400, str(e))
+
+    await tarif_index.index.arefresh()
+    return {"ok": True, "imported": report["rows"], **report}
 
-    return {"ok": True, "imported": count}
+
+@router.post("/reprice", response_model=dict)
+async def reprice_tarifs(dry_run: bool = False, user: dict = Depends(get_current_user)):
+    """Recalcule tous les prix client avec les marges actuelles (params TARIF_*).
+
+    Pas de re-scraping : le prix fournisseur en base suffit. `dry_run`
+    compte les prix qui changeraient sans rien écrire.
+    """
+    report = await run_in_db_thread(pricing.reprice_tarifs, dry_run=dry_run)
+    if report["updated"] and not dry_run:
+        await tarif_index.index.arefresh()
+    return {"ok": True, "dry_run": dry_run, **report}
 
 
 @router.post("/update", response_model=dict)
-async def update_tarifs(user: dict = Depends(get_current_user)):
-    """Lance le scraping Mobilax en background et met à jour la BDD."""
-    _ensure_table()
+async def update_tarifs(replay: bool = False, user: dict = Depends(get_current_user)):
+    """Lance le scraping Mobilax en background et met à jour la BDD.
+
+    Un seul scraping à la fois : si un job tourne déjà (sur n'importe quel
+    worker), c'est lui qui est renvoyé. `replay` : recalcule depuis les
+    pages en cache, sans réseau.
+    """
+    job, created = await run_in_db_thread(
+        scrape_jobs.start_job, replay=replay, requested_by=user.get("sub", ""),
+    )
+    if job is None:
+        raise HTTPException(409, "Un scraping est déjà en cours")
+    message = "Mise à jour lancée en arrière-plan" if created else "Une mise à jour est déjà en cours"
+    return {"ok": True, "message": message, "job_id": job["id"], "created": created}
+
+
+@router.get("/jobs", response_model=list[ScrapeJobOut])
+async def list_jobs(
+    limit: int = Query(20, le=200),
+    user: dict = Depends(get_current_user),
+):
+    """Historique des jobs de mise à jour des tarifs."""
+    return await run_in_db_thread(scrape_jobs.list_jobs, limit)
 
-    def _run_scrape():
-        try:
-            from app.services.scraper_mobilax import scrape_and_update
-            scrape_and_update()
-        except Exception as e:
-            print(f"[SCRAPER] Erreur: {e}")
 
-    thread = threading.Thread(target=_run_scrape, daemon=True)
-    thread.start()
+@router.get("/jobs/{job_id}", response_model=ScrapeJobOut)
+async def get_job(job_id: int, user: dict = Depends(get_current_user)):
+    """État et progression d'un job."""
+    job = await run_in_db_thread(scrape_jobs.get_job, job_id)
+    if not job:
+        raise HTTPException(404, "Job non trouvé")
+    return job
 
-    return {"ok": True, "message": "Mise à jour lancée en arrière-plan"}
+
+@router.post("/jobs/{job_id}/cancel", response_model=ScrapeJobOut)
+async def cancel_job(job_id: int, user: dict = Depends(get_current_user)):
+    """Demande l'annulation d'un job en cours (prise en compte sous ~1 s)."""
+    job = await run_in_db_thread(scrape_jobs.request_cancel, job_id)
+    if not job:
+        raise HTTPException(404, "Job non trouvé")
+    return job
 
 
 @router.delete("/clear", response_model=dict)
 async def clear_tarifs(user: dict = Depends(get_current_user)):
     """Vide la table tarifs."""
-    _ensure_table()
-
-    with get_cursor() as cur:
-        cur.execute("DELETE FROM tarifs")
-        cur.execute("SELECT COUNT(*) as c FROM tarifs")
-        row = cur.fetchone()
+    async with get_cursor() as cur:
+        await cur.execute("DELETE FROM tarifs")
+        await cur.execute("SELECT COUNT(*) as c FROM tarifs")
+        row = await cur.fetchone()
 
+    await tarif_index.index.arefresh()
     return {"ok": True, "remaining": row["c"]}
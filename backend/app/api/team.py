@@ -13,28 +13,28 @@ router = APIRouter(prefix="/api/team", tags=["team"])
 @router.get("", response_model=list[MembreEquipeOut])
 async def list_members(user: dict = Depends(get_current_user)):
     """Liste les membres de l'équipe."""
-    with get_cursor() as cur:
-        cur.execute("SELECT * FROM membres_equipe ORDER BY nom")
-        return cur.fetchall()
+    async with get_cursor() as cur:
+        await cur.execute("SELECT * FROM membres_equipe ORDER BY nom")
+        return await cur.fetchall()
 
 
 @router.get("/active", response_model=list[MembreEquipeOut])
 async def list_active_members(user: dict = Depends(get_current_user)):
     """Liste les membres actifs uniquement."""
-    with get_cursor() as cur:
-        cur.execute("SELECT * FROM membres_equipe WHERE actif = 1 ORDER BY nom")
-        return cur.fetchall()
+    async with get_cursor() as cur:
+        await cur.execute("SELECT * FROM membres_equipe WHERE actif = 1 ORDER BY nom")
+        return await cur.fetchall()
 
 
 @router.post("", response_model=dict)
 async def create_member(data: MembreEquipeCreate, user: dict = Depends(get_current_user)):
     """Ajoute un membre à l'équipe."""
-    with get_cursor() as cur:
-        cur.execute(
+    async with get_cursor() as cur:
+        await cur.execute(
             "INSERT INTO membres_equipe (nom, role, couleur) VALUES (%s, %s, %s) RETURNING id",
             (data.nom, data.role, data.couleur),
         )
-        row = cur.fetchone()
+        row = await cur.fetchone()
     return {"id": row["id"]}
 
 
@@ -52,8 +52,8 @@ async def update_member(
     set_clause = ", ".join(f"{k} = %s" for k in updates.keys())
     values = list(updates.values()) + [membre_id]
 
-    with get_cursor() as cur:
-        cur.execute(f"UPDATE membres_equipe SET {set_clause} WHERE id = %s", values)
+    async with get_cursor() as cur:
+        await cur.execute(f"UPDATE membres_equipe SET {set_clause} WHERE id = %s", values)
 
     return {"ok": True}
 
@@ -61,6 +61,6 @@ async def update_member(
 @router.delete("/{membre_id}", response_model=dict)
 async def delete_member(membre_id: int, user: dict = Depends(get_current_user)):
     """Supprime un membre de l'équipe."""
-    with get_cursor() as cur:
-        cur.execute("DELETE FROM membres_equipe WHERE id = %s", (membre_id,))
+    async with get_cursor() as cur:
+        await cur.execute("DELETE FROM membres_equipe WHERE id = %s", (membre_id,))
     return {"ok": True}
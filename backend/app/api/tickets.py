@@ -3,20 +3,30 @@ API CRUD Tickets — compatible schéma PostgreSQL existant.
 Reprend exactement la logique de l'app Streamlit.
 """
 
-from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
 
-from app.database import get_cursor
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+from psycopg2.extras import Json
+
+from app.database import get_cursor, run_in_db_thread
 from app.models import (
     TicketCreate, TicketUpdate, TicketOut, TicketFull,
-    StatusChange, KPIResponse,
+    StatusChange, KPIResponse, TicketEventOut, TicketQuote,
 )
-from app.api.auth import get_current_user, get_optional_user
+from app.api.auth import get_current_user, get_optional_user, decode_token
+from app.api.pagination import keyset_condition, set_next_cursor, sort_expr
+from app.services import search as search_index
 from app.services.notifications import (
     notif_nouveau_ticket, notif_changement_statut, notif_reparation_terminee,
 )
+from app.services import kpi, shop_time
+from app.services.quote import quotes
+from app.services.ticket_events import JOURNAL_LIMIT, is_migrated, render_journal
+from app.services.ticket_stream import stream
 
 router = APIRouter(prefix="/api/tickets", tags=["tickets"])
 
@@ -26,6 +36,44 @@ STATUTS = [
     "Réparation terminée", "Rendu au client", "Clôturé",
 ]
 
+# Commentaire SSE envoyé régulièrement pour garder la connexion ouverte
+STREAM_HEARTBEAT = 15
+
+# Colonnes renvoyées par la liste : sans les blocs texte historique /
+# notes_internes, servis uniquement par le détail et /events.
+LIST_COLUMNS = """
+    t.id, t.ticket_code, t.client_id, t.categorie, t.marque, t.modele,
+    t.modele_autre, t.imei, t.panne, t.panne_detail, t.pin, t.pattern,
+    t.notes_client, t.commentaire_client, t.reparation_supp, t.prix_supp,
+    t.devis_estime, t.acompte, t.tarif_final, t.personne_charge,
+    t.technicien_assigne, t.commande_piece, t.date_recuperation,
+    t.client_contacte, t.client_accord, t.paye, t.msg_whatsapp, t.msg_sms,
+    t.msg_email, t.statut, t.date_depot, t.date_maj, t.date_cloture,
+    t.type_ecran
+"""
+
+
+async def _attach_journal(cur, ticket: dict) -> dict:
+    """Reconstruit historique / notes_internes depuis ticket_events."""
+    await cur.execute("""
+        SELECT kind, ts, payload FROM ticket_events
+        WHERE ticket_id = %s
+        ORDER BY ts DESC, id DESC
+        LIMIT %s
+    """, (ticket["id"], JOURNAL_LIMIT))
+    events = await cur.fetchall()
+    events.reverse()
+    migrated = is_migrated(events)
+    if not migrated and len(events) >= JOURNAL_LIMIT:
+        # Les événements legacy (les plus anciens) peuvent être hors de la fenêtre
+        await cur.execute("""
+            SELECT EXISTS (
+                SELECT 1 FROM ticket_events WHERE ticket_id = %s AND payload ? 'legacy'
+            ) AS migrated
+        """, (ticket["id"],))
+        migrated = (await cur.fetchone())["migrated"]
+    return render_journal(ticket, events, migrated)
+
 
 # ─── LISTE / RECHERCHE ─────────────────────────────────────────
 @router.get("", response_model=list[TicketFull])
@@ -37,18 +85,28 @@ async def list_tickets(
     search: Optional[str] = None,
     limit: int = Query(100, le=500),
     offset: int = 0,
+    cursor: Optional[str] = None,
+    fresh: bool = False,
+    response: Response = None,
     user: dict = Depends(get_current_user),
 ):
-    """Liste les tickets avec filtres optionnels."""
+    """Liste les tickets avec filtres optionnels.
+
+    Pagination : `cursor` (valeur de l'en-tête X-Next-Cursor de la page
+    précédente) de préférence à `offset`. Avec `search`, les résultats sont
+    classés par pertinence et se paginent par `offset`.
+    `fresh` lit la base principale plutôt que la réplique : rechargement
+    après une notification temps réel, que la réplique peut ne pas avoir vue.
+    """
     conditions = []
     params = []
+    rank_params = []
 
     if statut:
         conditions.append("t.statut = %s")
         params.append(statut)
     if tel:
-        conditions.append("c.telephone LIKE %s")
-        params.append(f"%{tel}%")
+        conditions.append(search_index.phone_clause(tel, params, "c."))
     if code:
         conditions.append("t.ticket_code ILIKE %s")
         params.append(f"%{code}%")
@@ -56,39 +114,91 @@ async def list_tickets(
         conditions.append("(c.nom ILIKE %s OR c.prenom ILIKE %s)")
         params.extend([f"%{nom}%", f"%{nom}%"])
     if search:
-        conditions.append(
-            "(t.ticket_code ILIKE %s OR c.nom ILIKE %s OR c.prenom ILIKE %s "
-            "OR c.telephone LIKE %s OR t.marque ILIKE %s OR t.modele ILIKE %s)"
-        )
-        s = f"%{search}%"
-        params.extend([s, s, s, s, s, s])
+        clause = search_index.text_clause(search, params, "t.", "c.")
+        if search_index.is_phone(search):
+            # Des chiffres : téléphone, mais aussi IMEI ou code ticket
+            clause = f"({search_index.phone_clause(search, params, 'c.')} OR {clause})"
+        conditions.append(clause)
+        rank = search_index.rank_expr(search, rank_params, "t.", "c.", phone_alias="c.")
+        order = f"rank DESC, {sort_expr('t.date_depot')} DESC, t.id DESC"
+    else:
+        rank = "NULL"
+        order = f"{sort_expr('t.date_depot')} DESC, t.id DESC"
+    if cursor and not search:
+        conditions.append(keyset_condition("t.date_depot", "t.id", cursor, params))
+        offset = 0
 
     where = "WHERE " + " AND ".join(conditions) if conditions else ""
 
     query = f"""
-        SELECT t.*, 
+        SELECT {LIST_COLUMNS}, {rank} as rank,
                c.nom as client_nom, c.prenom as client_prenom,
                c.telephone as client_tel, c.email as client_email,
                c.societe as client_societe, c.carte_camby as client_carte_camby
         FROM tickets t 
         JOIN clients c ON t.client_id = c.id
         {where}
-        ORDER BY t.date_depot DESC
+        ORDER BY {order}
         LIMIT %s OFFSET %s
     """
-    params.extend([limit, offset])
+    params = rank_params + params + [limit, offset]
+
+    async with get_cursor(readonly=not fresh) as cur:
+        await cur.execute(query, params)
+        rows = await cur.fetchall()
+
+    if not search:
+        set_next_cursor(response, rows, limit, "date_depot")
+    return rows
+
+
+# ─── FLUX TEMPS RÉEL (SSE) ─────────────────────────────────────
+@router.get("/stream")
+async def ticket_stream(
+    request: Request,
+    token: str = Query(...),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Pousse les changements de tickets et les KPI (Server-Sent Events).
 
-    with get_cursor() as cur:
-        cur.execute(query, params)
-        return cur.fetchall()
+    EventSource ne permet pas d'en-tête Authorization : le JWT passe en query.
+    """
+    decode_token(token)
+
+    async def events():
+        queue = stream.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            missed = stream.replay(last_event_id)
+            if missed is None:
+                yield "event: reset\ndata: {}\n\n"
+            else:
+                for message in missed:
+                    yield message
+
+            while not await request.is_disconnected():
+                if stream.overflowed(queue):
+                    yield "event: reset\ndata: {}\n\n"
+                try:
+                    yield await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+        finally:
+            stream.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ─── TICKET UNIQUE ─────────────────────────────────────────────
 @router.get("/{ticket_id}", response_model=TicketFull)
 async def get_ticket(ticket_id: int, user: Optional[dict] = Depends(get_optional_user)):
     """Récupère un ticket par ID avec les infos client."""
-    with get_cursor() as cur:
-        cur.execute("""
+    async with get_cursor() as cur:
+        await cur.execute("""
             SELECT t.*, 
                    c.nom as client_nom, c.prenom as client_prenom,
                    c.telephone as client_tel, c.email as client_email,
@@ -97,17 +207,46 @@ async def get_ticket(ticket_id: int, user: Optional[dict] = Depends(get_optional
             JOIN clients c ON t.client_id = c.id
             WHERE t.id = %s
         """, (ticket_id,))
-        row = cur.fetchone()
-    if not row:
+        row = await cur.fetchone()
+        if not row:
+            raise HTTPException(404, "Ticket non trouvé")
+        return await _attach_journal(cur, row)
+
+
+@router.get("/{ticket_id}/quote", response_model=TicketQuote)
+async def get_quote(ticket_id: int, user: dict = Depends(get_current_user)):
+    """Devis automatique : tarifs correspondant au modèle et à la panne du ticket.
+
+    Options classées par qualité de correspondance du modèle, puis par
+    panne, puis par prix client croissant.
+    """
+    async with get_cursor(readonly=True) as cur:
+        await cur.execute(
+            "SELECT marque, modele, modele_autre, panne, panne_detail FROM tickets WHERE id = %s",
+            (ticket_id,),
+        )
+        ticket = await cur.fetchone()
+    if not ticket:
         raise HTTPException(404, "Ticket non trouvé")
-    return row
+
+    modele = ticket["modele"]
+    if not modele or modele == "Autre":
+        modele = ticket["modele_autre"]
+    result = await quotes.aquote(ticket["marque"], modele, ticket["panne"], ticket["panne_detail"])
+    return {
+        "ticket_id": ticket_id,
+        "marque": ticket["marque"],
+        "modele": modele,
+        "panne": ticket["panne"],
+        **result,
+    }
 
 
 @router.get("/code/{ticket_code}", response_model=TicketFull)
 async def get_ticket_by_code(ticket_code: str):
     """Récupère un ticket par code (public — pour suivi client)."""
-    with get_cursor() as cur:
-        cur.execute("""
+    async with get_cursor() as cur:
+        await cur.execute("""
             SELECT t.*, 
                    c.nom as client_nom, c.prenom as client_prenom,
                    c.telephone as client_tel, c.email as client_email,
@@ -116,18 +255,18 @@ async def get_ticket_by_code(ticket_code: str):
             JOIN clients c ON t.client_id = c.id
             WHERE t.ticket_code = %s
         """, (ticket_code,))
-        row = cur.fetchone()
-    if not row:
-        raise HTTPException(404, "Ticket non trouvé")
-    return row
+        row = await cur.fetchone()
+        if not row:
+            raise HTTPException(404, "Ticket non trouvé")
+        return await _attach_journal(cur, row)
 
 
 # ─── CRÉATION ───────────────────────────────────────────────────
 @router.post("", response_model=dict)
-async def create_ticket(data: TicketCreate):
+async def create_ticket(data: TicketCreate, background_tasks: BackgroundTasks):
     """Crée un nouveau ticket (accessible sans auth — formulaire client)."""
-    with get_cursor() as cur:
-        cur.execute("""
+    async with get_cursor() as cur:
+        await cur.execute("""
             INSERT INTO tickets 
             (client_id, categorie, marque, modele, modele_autre, imei,
              panne, panne_detail, pin, pattern, notes_client, 
@@ -139,15 +278,17 @@ async def create_ticket(data: TicketCreate):
             data.modele_autre, data.imei, data.panne, data.panne_detail,
             data.pin, data.pattern, data.notes_client, data.commande_piece,
         ))
-        row = cur.fetchone()
+        row = await cur.fetchone()
         tid = row["id"]
 
         code = f"KP-{tid:06d}"
-        cur.execute("UPDATE tickets SET ticket_code = %s WHERE id = %s", (code, tid))
+        await cur.execute("UPDATE tickets SET ticket_code = %s WHERE id = %s", (code, tid))
 
-    # Notification Discord (non bloquant)
+    # Notification Discord (après la réponse, dans le threadpool)
     appareil = data.modele_autre if data.modele_autre else f"{data.marque} {data.modele}"
-    notif_nouveau_ticket(code, appareil, data.panne or data.panne_detail or "Réparation")
+    background_tasks.add_task(
+        notif_nouveau_ticket, code, appareil, data.panne or data.panne_detail or "Réparation",
+    )
 
     return {"id": tid, "ticket_code": code}
 
@@ -164,13 +305,11 @@ async def update_ticket(
     if not updates:
         return {"ok": True}
 
-    updates["date_maj"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    set_clause = ", ".join(f"{k} = %s" for k in updates.keys())
+    set_clause = ", ".join(f"{k} = %s" for k in updates.keys()) + ", date_maj = NOW()"
     values = list(updates.values()) + [ticket_id]
 
-    with get_cursor() as cur:
-        cur.execute(
+    async with get_cursor() as cur:
+        await cur.execute(
             f"UPDATE tickets SET {set_clause} WHERE id = %s",
             values,
         )
@@ -183,47 +322,48 @@ async def update_ticket(
 async def change_status(
     ticket_id: int,
     data: StatusChange,
+    background_tasks: BackgroundTasks,
     user: dict = Depends(get_current_user),
 ):
     """Change le statut d'un ticket avec historique et notifications."""
     if data.statut not in STATUTS:
         raise HTTPException(400, f"Statut invalide. Valides: {STATUTS}")
 
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    ts = datetime.now().strftime("%d/%m %H:%M")
-
-    with get_cursor() as cur:
-        # Récupérer ancien statut et historique
-        cur.execute("SELECT statut, historique, ticket_code FROM tickets WHERE id = %s", (ticket_id,))
-        row = cur.fetchone()
+    async with get_cursor() as cur:
+        # Verrou sur la ligne + mise à jour + événement en un seul aller-retour
+        await cur.execute("""
+            WITH old AS (
+                SELECT id, statut FROM tickets WHERE id = %s FOR UPDATE
+            ), upd AS (
+                UPDATE tickets t
+                SET statut = %s, date_maj = NOW(),
+                    date_cloture = CASE WHEN %s = 'Clôturé' THEN NOW() ELSE t.date_cloture END
+                FROM old
+                WHERE t.id = old.id
+                RETURNING t.id, t.ticket_code, old.statut AS ancien_statut
+            ), ev AS (
+                INSERT INTO ticket_events (ticket_id, kind, author, payload)
+                SELECT id, 'statut', %s,
+                       jsonb_build_object('de', COALESCE(ancien_statut, ''), 'vers', %s::text)
+                FROM upd
+            )
+            SELECT ancien_statut, ticket_code FROM upd
+        """, (
+            ticket_id, data.statut, data.statut,
+            user.get("sub", ""), data.statut,
+        ))
+        row = await cur.fetchone()
         if not row:
             raise HTTPException(404, "Ticket non trouvé")
 
-        ancien_statut = row.get("statut", "")
-        historique = row.get("historique") or ""
-        ticket_code = row.get("ticket_code", f"#{ticket_id}")
-
-        # Ajouter à l'historique
-        log_entry = f"[{ts}] Statut: {ancien_statut} → {data.statut}"
-        new_hist = f"{historique.rstrip()}\n{log_entry}" if historique.strip() else log_entry
-
-        # Mise à jour
-        if data.statut == "Clôturé":
-            cur.execute(
-                "UPDATE tickets SET statut=%s, date_maj=%s, date_cloture=%s, historique=%s WHERE id=%s",
-                (data.statut, now, now, new_hist, ticket_id),
-            )
-        else:
-            cur.execute(
-                "UPDATE tickets SET statut=%s, date_maj=%s, historique=%s WHERE id=%s",
-                (data.statut, now, new_hist, ticket_id),
-            )
+    ancien_statut = row.get("ancien_statut") or ""
+    ticket_code = row.get("ticket_code") or f"#{ticket_id}"
 
-    # Notifications Discord
+    # Notifications Discord (après la réponse, dans le threadpool)
     if data.statut == "Réparation terminée":
-        notif_reparation_terminee(ticket_code)
+        background_tasks.add_task(notif_reparation_terminee, ticket_code)
     elif ancien_statut and ancien_statut != data.statut:
-        notif_changement_statut(ticket_code, ancien_statut, data.statut)
+        background_tasks.add_task(notif_changement_statut, ticket_code, ancien_statut, data.statut)
 
     return {"ok": True, "ancien_statut": ancien_statut, "nouveau_statut": data.statut}
 
@@ -236,19 +376,15 @@ async def add_history(
     user: dict = Depends(get_current_user),
 ):
     """Ajoute une entrée dans l'historique du ticket."""
-    ts = datetime.now().strftime("%d/%m %H:%M")
-    entry = f"[{ts}] {texte}"
-
-    with get_cursor() as cur:
-        cur.execute("SELECT historique FROM tickets WHERE id = %s", (ticket_id,))
-        row = cur.fetchone()
-        if not row:
+    async with get_cursor() as cur:
+        await cur.execute("""
+            INSERT INTO ticket_events (ticket_id, kind, author, payload)
+            SELECT id, 'historique', %s, %s FROM tickets WHERE id = %s
+            RETURNING id
+        """, (user.get("sub", ""), Json({"texte": texte}), ticket_id))
+        if not await cur.fetchone():
             raise HTTPException(404, "Ticket non trouvé")
 
-        historique = row.get("historique") or ""
-        new_hist = f"{historique.rstrip()}\n{entry}" if historique.strip() else entry
-        cur.execute("UPDATE tickets SET historique = %s WHERE id = %s", (new_hist, ticket_id))
-
     return {"ok": True}
 
 
@@ -260,53 +396,79 @@ async def add_note(
     user: dict = Depends(get_current_user),
 ):
     """Ajoute une note interne au ticket."""
-    ts = datetime.now().strftime("%d/%m/%Y %H:%M")
-
-    with get_cursor() as cur:
-        cur.execute("SELECT notes_internes FROM tickets WHERE id = %s", (ticket_id,))
-        row = cur.fetchone()
-        if not row:
+    async with get_cursor() as cur:
+        await cur.execute("""
+            WITH t AS (
+                UPDATE tickets SET date_maj = NOW() WHERE id = %s RETURNING id
+            )
+            INSERT INTO ticket_events (ticket_id, kind, author, payload)
+            SELECT id, 'note', %s, %s FROM t
+            RETURNING id
+        """, (
+            ticket_id, user.get("sub", ""), Json({"texte": note}),
+        ))
+        if not await cur.fetchone():
             raise HTTPException(404, "Ticket non trouvé")
 
-        existing = row.get("notes_internes") or ""
-        new_notes = f"{existing}\n[{ts}] {note}" if existing.strip() else f"[{ts}] {note}"
-        cur.execute(
-            "UPDATE tickets SET notes_internes = %s, date_maj = %s WHERE id = %s",
-            (new_notes, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), ticket_id),
-        )
-
     return {"ok": True}
 
 
+# ─── JOURNAL ─────────────────────────────────────────────────────
+@router.get("/{ticket_id}/events", response_model=list[TicketEventOut])
+async def list_events(
+    ticket_id: int,
+    kind: Optional[str] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(50, le=200),
+    user: dict = Depends(get_current_user),
+):
+    """Journal du ticket, du plus récent au plus ancien (paginé par `before_id`)."""
+    conditions = ["ticket_id = %s"]
+    params = [ticket_id]
+    if kind:
+        conditions.append("kind = %s")
+        params.append(kind)
+    if before_id:
+        conditions.append("id < %s")
+        params.append(before_id)
+
+    async with get_cursor() as cur:
+        await cur.execute(
+            f"""SELECT id, ticket_id, ts, kind, author, payload FROM ticket_events
+                WHERE {" AND ".join(conditions)}
+                ORDER BY ts DESC, id DESC
+                LIMIT %s""",
+            params + [limit],
+        )
+        return await cur.fetchall()
+
+
 # ─── SUPPRESSION ─────────────────────────────────────────────────
 @router.delete("/{ticket_id}", response_model=dict)
 async def delete_ticket(ticket_id: int, user: dict = Depends(get_current_user)):
-    """Supprime un ticket et ses commandes de pièces."""
-    with get_cursor() as cur:
-        cur.execute("DELETE FROM commandes_pieces WHERE ticket_id = %s", (ticket_id,))
-        cur.execute("DELETE FROM tickets WHERE id = %s", (ticket_id,))
+    """Supprime un ticket, ses commandes de pièces et son journal."""
+    async with get_cursor() as cur:
+        await cur.execute("DELETE FROM commandes_pieces WHERE ticket_id = %s", (ticket_id,))
+        await cur.execute("DELETE FROM ticket_events WHERE ticket_id = %s", (ticket_id,))
+        await cur.execute("DELETE FROM tickets WHERE id = %s", (ticket_id,))
     return {"ok": True}
 
 
 # ─── KPI DASHBOARD ───────────────────────────────────────────────
 @router.get("/stats/kpi", response_model=KPIResponse)
 async def get_kpi(user: dict = Depends(get_current_user)):
-    """Récupère les KPI du dashboard."""
-    today = datetime.now().strftime("%Y-%m-%d")
-
-    with get_cursor() as cur:
-        cur.execute("""
-            SELECT 
-                COUNT(*) FILTER (WHERE statut = 'En attente de diagnostic') as en_attente_diagnostic,
-                COUNT(*) FILTER (WHERE statut = 'En cours de réparation') as en_cours,
-                COUNT(*) FILTER (WHERE statut = 'En attente de pièce') as en_attente_piece,
-                COUNT(*) FILTER (WHERE statut = 'En attente d''accord client') as en_attente_accord,
-                COUNT(*) FILTER (WHERE statut = 'Réparation terminée') as reparation_terminee,
-                COUNT(*) FILTER (WHERE statut NOT IN ('Clôturé', 'Rendu au client')) as total_actifs,
-                COUNT(*) FILTER (WHERE date_cloture::date = %s::date) as clotures_aujourdhui,
-                COUNT(*) FILTER (WHERE date_depot::date = %s::date) as nouveaux_aujourdhui
-            FROM tickets
-        """, (today, today))
-        row = cur.fetchone()
+    """Récupère les KPI du dashboard (compteurs maintenus par trigger)."""
+    debut, fin = await shop_time.atoday_bounds()
+
+    async with get_cursor(readonly=True) as cur:
+        await cur.execute(kpi.KPI_SQL, {"debut": debut, "fin": fin})
+        row = await cur.fetchone()
 
     return KPIResponse(**row) if row else KPIResponse()
+
+
+@router.post("/stats/kpi/rebuild", response_model=dict)
+async def rebuild_kpi(user: dict = Depends(get_current_user)):
+    """Réconciliation : recalcule les compteurs KPI depuis la table tickets."""
+    total = await run_in_db_thread(kpi.rebuild)
+    return {"ok": True, "total_tickets": total}
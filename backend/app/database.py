@@ -2,44 +2,498 @@
 Database connection pool pour PostgreSQL/Supabase.
 Utilise psycopg2 avec un pool de connexions pour des performances optimales.
 Compatible avec la base existante Klikphone SAV.
+
+Les routers FastAPI utilisent `get_cursor()` (async) : chaque appel psycopg2
+bloquant tourne dans un thread pool dédié, la boucle uvicorn reste libre.
+Les services synchrones (scraper, notifications) utilisent `get_sync_cursor()`.
+
+Deux thread pools séparés :
+  - connexions : requêtes sur une connexion déjà détenue (au plus une par
+    connexion, donc jamais en attente d'un autre thread) ;
+  - bloquant (`run_in_db_thread`) : code synchrone qui prend lui-même une
+    connexion et peut attendre dans la file du pool. Dimensionné pour
+    couvrir détenteurs + file d'attente (`DB_BLOCKING_THREADS`), il ne
+    peut pas affamer les threads qui rendraient les connexions.
+
+Le pool est borné : au-delà de `maxconn`, les demandes attendent dans une file
+FIFO limitée (`DB_POOL_MAX_WAITING`) pendant au plus `DB_POOL_ACQUIRE_TIMEOUT`
+secondes. File pleine ou attente trop longue → `PoolSaturated` (HTTP 503).
+
+Supabase/PgBouncer coupent les connexions inactives : chaque connexion est
+vérifiée à la sortie du pool (ping si inactive depuis `DB_POOL_PING_IDLE`,
+recyclage après `DB_POOL_MAX_LIFETIME`), et une lecture idempotente qui tombe
+sur une socket morte est rejouée une fois sur une connexion neuve.
+
+Si `DATABASE_READ_URL` est définie, `get_cursor(readonly=True)` lit sur le
+réplica (pool séparé), sauf s'il est en panne ou en retard de plus de
+`DB_REPLICA_MAX_LAG` secondes : on retombe alors sur le primaire.
 """
 
+import asyncio
+import functools
 import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+
 import psycopg2
 import psycopg2.pool
 import psycopg2.extras
-from contextlib import contextmanager
 
-# Pool de connexions global
+POOL_MINCONN = int(os.getenv("DB_POOL_MIN", "2"))
+POOL_MAXCONN = int(os.getenv("DB_POOL_MAX", "10"))
+POOL_MAX_WAITING = int(os.getenv("DB_POOL_MAX_WAITING", "20"))
+POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5"))
+POOL_RETRY_AFTER = int(os.getenv("DB_POOL_RETRY_AFTER", "2"))
+POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+POOL_PING_IDLE = float(os.getenv("DB_POOL_PING_IDLE", "10"))
+REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "10"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+REPLICA_RETRY_AFTER = float(os.getenv("DB_REPLICA_RETRY_AFTER", "30"))
+# 0 : détenteurs + file d'attente de chaque pool
+BLOCKING_THREADS = int(os.getenv("DB_BLOCKING_THREADS", "0"))
+
+# Requêtes rejouables sans risque après une coupure réseau
+_READ_RE = re.compile(r"^\s*(SELECT|WITH|SHOW)\b", re.IGNORECASE)
+_WRITE_RE = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|NEXTVAL|SETVAL|PG_NOTIFY|PG_ADVISORY\w*)\b",
+    re.IGNORECASE,
+)
+
+# Pools de connexions globaux (primaire, réplica de lecture optionnel)
 _pool = None
+_read_pool = None
+# État du réplica : indisponible jusqu'à, dernier contrôle du retard, en retard ?
+_replica_lock = threading.Lock()
+_replica_down_until = 0.0
+_replica_checked_at = 0.0
+_replica_lagging = False
+_replica_lag = None
+# Threads des requêtes sur connexion détenue (un par connexion au maximum)
+_executor = None
+# Threads du code synchrone qui prend lui-même ses connexions
+_blocking_executor = None
+
+
+class PoolSaturated(Exception):
+    """Aucune connexion disponible : file d'attente pleine ou délai dépassé."""
+
+    def __init__(self, reason: str, retry_after: int = POOL_RETRY_AFTER):
+        super().__init__(f"Pool de connexions saturé ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class BoundedPool:
+    """ThreadedConnectionPool avec file d'attente FIFO bornée et compteurs.
+
+    Un "slot" représente le droit de détenir une connexion : il y en a
+    `maxconn`. Quand un slot se libère, il est transmis directement au
+    premier de la file (pas de resquille). Les attentes se font soit dans
+    un thread (`getconn`), soit dans la boucle asyncio (`agetconn`) sans
+    occuper de thread du pool DB.
+    """
+
+    def __init__(self, minconn, maxconn, max_waiting, acquire_timeout,
+                 max_lifetime=POOL_MAX_LIFETIME, ping_idle=POOL_PING_IDLE, **kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.max_waiting = max_waiting
+        self.acquire_timeout = acquire_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_idle = ping_idle
+        self._pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, **kwargs)
+        self._lock = threading.Lock()
+        # id(conn) → (créée à, rendue au pool à), en temps monotone
+        self._born = {}
+        self._returned = {}
+        # id(conn) des connexions sorties de self._pool et pas encore rendues
+        self._checked_out = set()
+        self._recycled = 0
+        self._waiters = deque()
+        self._in_use = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._peak_in_use = 0
+        self._peak_waiting = 0
+
+    # ─── SLOTS ───────────────────────────────────────────────
+
+    def _reserve(self, wake):
+        """Prend un slot libre, sinon inscrit `wake` dans la file.
+
+        Retourne True si le slot est obtenu immédiatement.
+        """
+        with self._lock:
+            if self._in_use < self.maxconn and not self._waiters:
+                self._in_use += 1
+                self._peak_in_use = max(self._peak_in_use, self._in_use)
+                return True
+            if len(self._waiters) >= self.max_waiting:
+                self._rejected += 1
+                raise PoolSaturated("file d'attente pleine")
+            self._waiters.append(wake)
+            self._peak_waiting = max(self._peak_waiting, len(self._waiters))
+            return False
+
+    def _withdraw(self, wake):
+        """Retire un waiter de la file. False s'il a déjà reçu un slot."""
+        with self._lock:
+            try:
+                self._waiters.remove(wake)
+            except ValueError:
+                return False
+            return True
+
+    def _release_slot(self):
+        """Libère un slot ou le transmet au premier waiter."""
+        with self._lock:
+            if not self._waiters:
+                self._in_use -= 1
+                return
+            wake = self._waiters.popleft()
+        wake()
+
+    def _acquire_slot(self, timeout):
+        event = threading.Event()
+        wake = event.set
+        if self._reserve(wake):
+            return
+        if not event.wait(timeout) and self._withdraw(wake):
+            with self._lock:
+                self._timed_out += 1
+            raise PoolSaturated("délai d'attente dépassé")
+
+    async def _acquire_slot_async(self, timeout):
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def _set_granted():
+            if not granted.done():
+                granted.set_result(None)
+
+        def wake():
+            loop.call_soon_threadsafe(_set_granted)
+
+        if self._reserve(wake):
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), timeout)
+        except asyncio.TimeoutError:
+            if self._withdraw(wake):
+                with self._lock:
+                    self._timed_out += 1
+                raise PoolSaturated("délai d'attente dépassé")
+            # Slot transmis au même instant : il nous appartient
+        except asyncio.CancelledError:
+            if not self._withdraw(wake):
+                self._release_slot()
+            raise
+
+    # ─── CONNEXIONS ──────────────────────────────────────────
+
+    def _pool_get(self):
+        conn = self._pool.getconn()
+        with self._lock:
+            self._checked_out.add(id(conn))
+        return conn
+
+    def _pool_put(self, conn, close=False):
+        """Rend une connexion à self._pool, si elle en est sortie et n'y est pas revenue."""
+        with self._lock:
+            if id(conn) not in self._checked_out:
+                return
+            self._checked_out.discard(id(conn))
+        self._pool.putconn(conn, close=close)
+
+    def _forget(self, conn):
+        self._born.pop(id(conn), None)
+        self._returned.pop(id(conn), None)
+
+    def _is_healthy(self, conn):
+        """Vérifie une connexion qui sort du pool (âge, état, ping)."""
+        now = time.monotonic()
+        born = self._born.setdefault(id(conn), now)
+        if conn.closed or now - born > self.max_lifetime:
+            return False
+        returned = self._returned.get(id(conn))
+        if returned is None or now - returned < self.ping_idle:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        """Sort une connexion saine du pool (le slot est déjà détenu)."""
+        while True:
+            conn = self._pool_get()
+            if self._is_healthy(conn):
+                return conn
+            # Connexion morte ou trop vieille : on la ferme, la suivante
+            # est soit une autre connexion inactive, soit une neuve.
+            self._forget(conn)
+            self._pool_put(conn, close=True)
+            with self._lock:
+                self._recycled += 1
+
+    def _take(self):
+        try:
+            return self._checkout()
+        except BaseException:
+            self._release_slot()
+            raise
+
+    def reconnect(self, conn):
+        """Remplace une connexion cassée en gardant le même slot."""
+        self._forget(conn)
+        self._pool_put(conn, close=True)
+        with self._lock:
+            self._recycled += 1
+        return self._checkout()
+
+    def getconn(self, timeout=None):
+        """Obtient une connexion (bloquant, pour les threads)."""
+        self._acquire_slot(self.acquire_timeout if timeout is None else timeout)
+        return self._take()
+
+    async def agetconn(self, timeout=None):
+        """Obtient une connexion sans bloquer la boucle asyncio."""
+        await self._acquire_slot_async(self.acquire_timeout if timeout is None else timeout)
+        try:
+            future = asyncio.get_running_loop().run_in_executor(get_executor(), self._take)
+        except BaseException:
+            self._release_slot()
+            raise
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Requête annulée pendant _take : la connexion obtenue sera rendue
+            future.add_done_callback(self._return_abandoned)
+            raise
+
+    def _return_abandoned(self, future):
+        """Rend la connexion d'un agetconn annulé (ou son slot si _take n'a pas tourné)."""
+        if future.cancelled():
+            self._release_slot()
+        elif future.exception() is None:
+            self.putconn(future.result())
+        # Sinon _take a déjà libéré le slot
+
+    def putconn(self, conn, close=False):
+        """Rend une connexion au pool et libère son slot."""
+        try:
+            # Une connexion déjà retirée par `reconnect` (échec de reconnexion)
+            # n'appartient plus au pool : seul son slot reste à libérer.
+            self._pool_put(conn, close=close or bool(conn.closed))
+            if conn.closed:
+                self._forget(conn)
+            else:
+                self._returned[id(conn)] = time.monotonic()
+        finally:
+            self._release_slot()
+
+    def prewarm(self):
+        """Ouvre et vérifie `minconn` connexions (appelé au démarrage)."""
+        conns = [self.getconn() for _ in range(self.minconn)]
+        for conn in conns:
+            self.putconn(conn)
+
+    def closeall(self):
+        self._pool.closeall()
+
+    def stats(self):
+        """Compteurs instantanés pour dimensionner `maxconn`."""
+        with self._lock:
+            return {
+                "in_use": self._in_use,
+                "idle": len(self._pool._pool),
+                "waiting": len(self._waiters),
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "recycled": self._recycled,
+                "peak_in_use": self._peak_in_use,
+                "peak_waiting": self._peak_waiting,
+                "maxconn": self.maxconn,
+                "max_waiting": self.max_waiting,
+            }
+
+
+def with_sslmode(database_url):
+    """Ajoute sslmode=require si absent (requis pour Supabase)."""
+    if "sslmode=" not in database_url:
+        sep = "&" if "?" in database_url else "?"
+        database_url = f"{database_url}{sep}sslmode=require"
+    return database_url
+
+
+def _build_pool(database_url):
+    """Crée un BoundedPool pour une URL PostgreSQL."""
+    database_url = with_sslmode(database_url)
+    return BoundedPool(
+        minconn=POOL_MINCONN,
+        maxconn=POOL_MAXCONN,
+        max_waiting=POOL_MAX_WAITING,
+        acquire_timeout=POOL_ACQUIRE_TIMEOUT,
+        dsn=database_url,
+        connect_timeout=10,
+        # Keepalives TCP : détecte plus tôt les sockets coupées par le proxy
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=3,
+    )
 
 
 def get_pool():
-    """Initialise et retourne le pool de connexions PostgreSQL."""
+    """Initialise et retourne le pool de connexions PostgreSQL (primaire)."""
     global _pool
     if _pool is None:
         database_url = os.getenv("DATABASE_URL")
         if not database_url:
             raise RuntimeError("DATABASE_URL non définie")
+        _pool = _build_pool(database_url)
+    return _pool
+
+
+def get_read_pool():
+    """Pool du réplica de lecture, ou None si DATABASE_READ_URL n'est pas définie."""
+    global _read_pool
+    if _read_pool is None:
+        database_url = os.getenv("DATABASE_READ_URL")
+        if not database_url:
+            return None
+        _read_pool = _build_pool(database_url)
+    return _read_pool
+
 
-        # Ajouter sslmode si absent (requis pour Supabase)
-        if "sslmode=" not in database_url:
-            sep = "&" if "?" in database_url else "?"
-            database_url = f"{database_url}{sep}sslmode=require"
+def _mark_replica_down():
+    global _replica_down_until
+    with _replica_lock:
+        _replica_down_until = time.monotonic() + REPLICA_RETRY_AFTER
+    print(f"[DB] Réplica indisponible, lectures sur le primaire pendant {REPLICA_RETRY_AFTER:.0f}s")
 
-        _pool = psycopg2.pool.ThreadedConnectionPool(
-            minconn=2,
-            maxconn=10,
-            dsn=database_url,
-            connect_timeout=10,
+
+def _replica_usable(pool):
+    """Vérifie (au plus toutes les REPLICA_CHECK_INTERVAL s) le retard du réplica."""
+    global _replica_checked_at, _replica_lagging, _replica_lag
+    now = time.monotonic()
+    with _replica_lock:
+        if now < _replica_down_until:
+            return False
+        if now - _replica_checked_at < REPLICA_CHECK_INTERVAL:
+            return not _replica_lagging
+        _replica_checked_at = now
+
+    # Sur un réplica à jour (LSN reçu = LSN rejoué), le retard est nul même
+    # si la dernière transaction rejouée est ancienne. NULL hors standby.
+    conn = pool.getconn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT CASE
+                    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+                END
+            """)
+            lag = cur.fetchone()[0]
+        conn.rollback()
+    finally:
+        pool.putconn(conn)
+
+    lag = float(lag or 0)
+    with _replica_lock:
+        _replica_lag = lag
+        _replica_lagging = lag > REPLICA_MAX_LAG
+        return not _replica_lagging
+
+
+def _pick_pool(readonly):
+    """Choisit le pool : réplica pour les lectures s'il est sain, sinon primaire."""
+    if readonly:
+        replica = get_read_pool()
+        if replica is not None:
+            try:
+                if _replica_usable(replica):
+                    return replica
+            except (psycopg2.Error, PoolSaturated):
+                _mark_replica_down()
+    return get_pool()
+
+
+async def _apick_pool(readonly):
+    """_pick_pool sans thread dans le cas courant (pools créés, état du réplica récent).
+
+    Seuls la création des pools et le contrôle périodique du retard du
+    réplica font de l'I/O ; ils passent alors par le thread pool bloquant.
+    """
+    primary = _pool
+    if primary is not None:
+        if not readonly or not os.getenv("DATABASE_READ_URL"):
+            return primary
+        if _read_pool is not None:
+            now = time.monotonic()
+            with _replica_lock:
+                if now < _replica_down_until:
+                    return primary
+                if now - _replica_checked_at < REPLICA_CHECK_INTERVAL:
+                    return primary if _replica_lagging else _read_pool
+    return await run_in_db_thread(_pick_pool, readonly)
+
+
+def _pool_count():
+    return 2 if os.getenv("DATABASE_READ_URL") else 1
+
+
+def get_executor():
+    """Thread pool des requêtes sur une connexion déjà détenue."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=POOL_MAXCONN * _pool_count(),
+            thread_name_prefix="db",
         )
-    return _pool
+    return _executor
+
+
+def get_blocking_executor():
+    """Thread pool du code synchrone qui attend lui-même une connexion."""
+    global _blocking_executor
+    if _blocking_executor is None:
+        workers = BLOCKING_THREADS or (POOL_MAXCONN + POOL_MAX_WAITING) * _pool_count()
+        _blocking_executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="db-blocking",
+        )
+    return _blocking_executor
+
+
+async def _run_on_conn(func, *args, **kwargs):
+    """Exécute un appel sur une connexion déjà détenue (thread pool connexions)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+async def run_in_db_thread(func, *args, **kwargs):
+    """Exécute un appel bloquant (qui prend ses connexions) et l'attend."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_blocking_executor(), functools.partial(func, *args, **kwargs)
+    )
 
 
 @contextmanager
 def get_db():
     """Context manager pour obtenir une connexion du pool.
-    
+
     Usage:
         with get_db() as conn:
             with conn.cursor() as cur:
@@ -58,11 +512,13 @@ def get_db():
 
 
 @contextmanager
-def get_cursor(dict_cursor=True):
-    """Context manager pour obtenir directement un curseur.
-    
+def get_sync_cursor(dict_cursor=True):
+    """Context manager synchrone pour obtenir directement un curseur.
+
+    Réservé au code qui tourne hors de la boucle asyncio (threads, scripts).
+
     Usage:
-        with get_cursor() as cur:
+        with get_sync_cursor() as cur:
             cur.execute("SELECT * FROM tickets")
             rows = cur.fetchall()
     """
@@ -72,9 +528,149 @@ def get_cursor(dict_cursor=True):
             yield cur
 
 
+def _is_idempotent_read(query):
+    """Vrai pour une lecture pure, rejouable après une coupure."""
+    return bool(_READ_RE.match(query)) and not _WRITE_RE.search(query)
+
+
+class AsyncCursor:
+    """Curseur awaitable au-dessus d'un curseur psycopg2.
+
+    `execute` part dans le thread pool DB. Les curseurs psycopg2 côté client
+    rapatrient tout le résultat pendant `execute` : les `fetch*` ne font pas
+    d'I/O, ils restent awaitables pour garder une API homogène.
+
+    Si la toute première requête de la transaction est une lecture et que la
+    connexion s'avère morte, elle est rejouée une fois sur une connexion neuve.
+    """
+
+    def __init__(self, pool, conn, cursor_factory=None):
+        self.pool = pool
+        self.conn = conn
+        self._cursor_factory = cursor_factory
+        self._cur = conn.cursor(cursor_factory=cursor_factory)
+        self._executed = False
+
+    def _execute(self, query, params):
+        try:
+            self._cur.execute(query, params)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            if self._executed or not self.conn.closed or not _is_idempotent_read(query):
+                raise
+            self.conn = self.pool.reconnect(self.conn)
+            self._cur = self.conn.cursor(cursor_factory=self._cursor_factory)
+            self._cur.execute(query, params)
+        self._executed = True
+
+    def close(self):
+        if not self._cur.closed:
+            self._cur.close()
+
+    async def execute(self, query, params=None):
+        await _run_on_conn(self._execute, query, params)
+
+    async def executemany(self, query, params_seq):
+        await _run_on_conn(self._cur.executemany, query, params_seq)
+        self._executed = True
+
+    async def fetchone(self):
+        return self._cur.fetchone()
+
+    async def fetchall(self):
+        return self._cur.fetchall()
+
+    async def fetchmany(self, size=None):
+        return self._cur.fetchmany(size) if size else self._cur.fetchmany()
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+
+@asynccontextmanager
+async def get_cursor(dict_cursor=True, readonly=False):
+    """Context manager async pour obtenir un curseur (transaction unique).
+
+    `readonly=True` autorise la lecture sur le réplica (DATABASE_READ_URL) ;
+    à réserver aux requêtes qui tolèrent quelques secondes de retard.
+
+    Usage:
+        async with get_cursor() as cur:
+            await cur.execute("SELECT * FROM tickets")
+            rows = await cur.fetchall()
+    """
+    pool = await _apick_pool(readonly)
+    try:
+        conn = await pool.agetconn()
+    except (psycopg2.Error, PoolSaturated):
+        if pool is _pool:
+            raise
+        # Réplica injoignable ou saturé : lecture sur le primaire
+        _mark_replica_down()
+        pool = _pool or await run_in_db_thread(get_pool)
+        conn = await pool.agetconn()
+    cursor_factory = psycopg2.extras.RealDictCursor if dict_cursor else None
+    try:
+        cur = AsyncCursor(pool, conn, cursor_factory)
+    except BaseException:
+        pool.putconn(conn)
+        raise
+    try:
+        try:
+            yield cur
+        finally:
+            cur.close()
+        await _run_on_conn(cur.conn.commit)
+    except BaseException:
+        if not cur.conn.closed:
+            try:
+                await _run_on_conn(cur.conn.rollback)
+            except psycopg2.Error:
+                pass  # Connexion morte : elle sera fermée par putconn
+        raise
+    finally:
+        pool.putconn(cur.conn)
+
+
+def prewarm_pool():
+    """Crée les pools et vérifie leurs `minconn` connexions (démarrage)."""
+    get_pool().prewarm()
+    replica = get_read_pool()
+    if replica is not None:
+        try:
+            replica.prewarm()
+        except psycopg2.Error:
+            _mark_replica_down()
+
+
+def pool_stats():
+    """Compteurs des pools (vides si les pools ne sont pas encore créés)."""
+    with _replica_lock:
+        replica_state = {
+            "configured": bool(os.getenv("DATABASE_READ_URL")),
+            "down": time.monotonic() < _replica_down_until,
+            "lagging": _replica_lagging,
+            "lag_seconds": _replica_lag,
+        }
+    return {
+        "primary": _pool.stats() if _pool else {},
+        "replica": _read_pool.stats() if _read_pool else {},
+        "replica_state": replica_state,
+    }
+
+
 def close_pool():
-    """Ferme proprement le pool de connexions."""
-    global _pool
+    """Ferme proprement les pools de connexions."""
+    global _pool, _read_pool, _executor, _blocking_executor
     if _pool:
         _pool.closeall()
         _pool = None
+    if _read_pool:
+        _read_pool.closeall()
+        _read_pool = None
+    if _executor:
+        _executor.shutdown(wait=False)
+        _executor = None
+    if _blocking_executor:
+        _blocking_executor.shutdown(wait=False)
+        _blocking_executor = None
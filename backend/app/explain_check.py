@@ -0,0 +1,239 @@
+"""
+Contrôle des plans d'exécution des requêtes chaudes de l'API.
+
+Sur une base PostgreSQL locale et jetable (jamais celle de production) :
+
+    1. applique les migrations ;
+    2. charge un jeu de données synthétique (clients, tickets, commandes,
+       catalogue) si la base n'en a pas déjà assez, puis ANALYZE ;
+    3. passe chaque requête de QUERIES dans `EXPLAIN (FORMAT JSON)` ;
+    4. échoue (code de sortie 1) si le plan d'une requête chaude contient un
+       Seq Scan sur une table de plus de `--max-rows` lignes.
+
+Les requêtes reprennent celles de app/api/*.py avec des valeurs réalistes
+(les clauses de recherche passent par les mêmes helpers que l'API). Une
+requête ajoutée à l'API sur un nouveau filtre doit être ajoutée ici, avec
+son index dans une migration.
+
+    EXPLAIN_DATABASE_URL=postgresql://localhost/klikphone_explain \\
+        python -m app.explain_check [--tickets 50000] [--max-rows 1000]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Taille du jeu synthétique (tickets ; clients et commandes en proportion)
+DEFAULT_TICKETS = 50_000
+# Au-delà de ce nombre de lignes, un Seq Scan sur une requête chaude échoue
+DEFAULT_MAX_ROWS = 1_000
+
+STATUTS_OUVERTS = (
+    "En attente de diagnostic", "En attente de pièce", "Pièce reçue",
+    "En attente d'accord client", "En cours de réparation", "Réparation terminée",
+)
+
+SEED_SQL = """
+INSERT INTO clients (nom, prenom, telephone, email, societe, date_creation)
+SELECT 'Nom' || i, 'Prenom' || i,
+       '06' || lpad(((i::bigint * 7919) %% 100000000)::text, 8, '0'),
+       'client' || i || '@example.com', '',
+       NOW() - i * INTERVAL '10 minutes'
+FROM generate_series(1, %(clients)s) i;
+
+WITH b AS (SELECT MIN(id) AS first_id, COUNT(*) AS n FROM clients)
+INSERT INTO tickets (ticket_code, client_id, categorie, marque, modele, imei,
+                     panne, statut, date_depot, date_maj, date_cloture)
+SELECT 'KP-' || lpad(i::text, 6, '0'),
+       b.first_id + (i %% b.n),
+       'Smartphone',
+       (ARRAY['Apple', 'Samsung', 'Xiaomi', 'Huawei', 'Google'])[1 + i %% 5],
+       'Modele ' || (i %% 150),
+       lpad(((i::bigint * 104729) %% 1000000000000000)::text, 15, '0'),
+       (ARRAY['Écran casse', 'Batterie', 'Connecteur de charge', 'Caméra'])[1 + i %% 4],
+       CASE WHEN i %% 10 < 7 THEN 'Clôturé'
+            ELSE (%(statuts)s::text[])[1 + i %% 6] END,
+       NOW() - i * INTERVAL '7 minutes',
+       NOW() - i * INTERVAL '7 minutes' + INTERVAL '1 day',
+       CASE WHEN i %% 10 < 7 THEN NOW() - i * INTERVAL '7 minutes' + INTERVAL '2 days' END
+FROM generate_series(1, %(tickets)s) i, b;
+
+INSERT INTO commandes_pieces (ticket_id, description, fournisseur, statut, date_creation)
+SELECT id, 'Pièce ' || marque || ' ' || modele, 'Mobilax',
+       CASE WHEN id %% 4 = 0 THEN 'En attente' ELSE 'Reçue' END,
+       date_depot + INTERVAL '1 hour'
+FROM tickets WHERE id %% 3 = 0;
+
+INSERT INTO catalog_marques (categorie, marque)
+SELECT c, 'Marque ' || m
+FROM unnest(ARRAY['Smartphone', 'Tablette', 'Ordinateur']) c, generate_series(1, 20) m
+ON CONFLICT DO NOTHING;
+
+INSERT INTO catalog_modeles (categorie, marque, modele)
+SELECT c, 'Marque ' || m, 'Modele ' || n
+FROM unnest(ARRAY['Smartphone', 'Tablette', 'Ordinateur']) c,
+     generate_series(1, 20) m, generate_series(1, 150) n
+ON CONFLICT DO NOTHING;
+
+ANALYZE clients, tickets, commandes_pieces, catalog_marques, catalog_modeles;
+"""
+
+
+def _queries():
+    """[(nom, chaude ?, sql, params)] : les requêtes de l'API à contrôler."""
+    from datetime import datetime, timedelta, timezone
+
+    from app.api.pagination import encode_cursor, keyset_condition, sort_expr
+    from app.api.tickets import LIST_COLUMNS
+    from app.services import kpi, search, shop_time
+
+    ticket_list = f"""
+        SELECT {LIST_COLUMNS}, NULL as rank,
+               c.nom as client_nom, c.prenom as client_prenom,
+               c.telephone as client_tel, c.email as client_email,
+               c.societe as client_societe, c.carte_camby as client_carte_camby
+        FROM tickets t
+        JOIN clients c ON t.client_id = c.id
+        {{where}}
+        ORDER BY {sort_expr('t.date_depot')} DESC, t.id DESC
+        LIMIT 100
+    """
+    debut, fin = shop_time.day_bounds()
+    cursor = encode_cursor(datetime.now(timezone.utc) - timedelta(days=30), 1_000_000)
+    cursor_params = []
+
+    client_search = []
+    client_search_sql = f"SELECT * FROM clients WHERE {search.text_clause('prenom12', client_search, '')} LIMIT 50"
+    client_phone = []
+    client_phone_sql = f"SELECT * FROM clients WHERE {search.phone_clause('06 12 34', client_phone)} LIMIT 50"
+    ticket_search = []
+    ticket_search_sql = ticket_list.format(
+        where=f"WHERE {search.text_clause('KP-0012', ticket_search, 't.', 'c.')}"
+    )
+
+    return [
+        # ─── tickets ───
+        ("tickets.liste", True, ticket_list.format(where=""), []),
+        ("tickets.liste_statut", True,
+         ticket_list.format(where="WHERE t.statut = %s"), ["En cours de réparation"]),
+        ("tickets.liste_curseur", True,
+         ticket_list.format(where="WHERE " + keyset_condition("t.date_depot", "t.id", cursor, cursor_params)),
+         cursor_params),
+        ("tickets.par_id", True, "SELECT * FROM tickets WHERE id = %s", [1234]),
+        ("tickets.par_code", True,
+         "SELECT t.* FROM tickets t JOIN clients c ON t.client_id = c.id WHERE t.ticket_code = %s",
+         ["KP-001234"]),
+        ("tickets.journal", True,
+         "SELECT kind, ts, payload FROM ticket_events WHERE ticket_id = %s ORDER BY ts DESC, id DESC LIMIT 500",
+         [1234]),
+        ("tickets.kpi", True, kpi.KPI_SQL, {"debut": debut, "fin": fin}),
+        # Recherche sur deux tables jointes (OR) : suivie, non bloquante
+        ("tickets.recherche", False, ticket_search_sql, ticket_search),
+        # ─── clients ───
+        ("clients.liste", True,
+         f"SELECT * FROM clients ORDER BY {sort_expr('date_creation')} DESC, id DESC LIMIT 100", []),
+        ("clients.par_tel", True, "SELECT * FROM clients WHERE telephone = %s", ["0600007919"]),
+        ("clients.tickets", True,
+         "SELECT * FROM tickets WHERE client_id = %s ORDER BY date_depot DESC", [42]),
+        ("clients.nb_tickets", True,
+         "SELECT COUNT(*) as cnt FROM tickets WHERE client_id = %s", [42]),
+        ("clients.recherche", True, client_search_sql, client_search),
+        ("clients.recherche_tel", True, client_phone_sql, client_phone),
+        # ─── commandes de pièces ───
+        ("parts.liste", True,
+         f"SELECT * FROM commandes_pieces ORDER BY {sort_expr('date_creation')} DESC, id DESC LIMIT 200", []),
+        ("parts.par_ticket", True,
+         f"SELECT * FROM commandes_pieces WHERE ticket_id = %s "
+         f"ORDER BY {sort_expr('date_creation')} DESC, id DESC LIMIT 200",
+         [1233]),
+        # ─── catalogue ───
+        ("catalog.marques", True,
+         "SELECT DISTINCT marque FROM catalog_marques WHERE categorie = %s ORDER BY marque",
+         ["Smartphone"]),
+        ("catalog.modeles", True,
+         "SELECT DISTINCT modele FROM catalog_modeles WHERE categorie = %s AND marque = %s ORDER BY modele",
+         ["Smartphone", "Marque 7"]),
+    ]
+
+
+def seed(cur, tickets: int):
+    """Charge le jeu synthétique si la base a moins de `tickets` tickets."""
+    cur.execute("SELECT COUNT(*) AS n FROM tickets")
+    if cur.fetchone()["n"] >= tickets:
+        return
+    cur.execute(SEED_SQL, {
+        "clients": max(tickets * 2 // 5, 1),
+        "tickets": tickets,
+        "statuts": list(STATUTS_OUVERTS),
+    })
+    print(f"[EXPLAIN] Jeu synthétique chargé ({tickets} tickets)")
+
+
+def _seq_scans(plan) -> list:
+    """Tables parcourues en Seq Scan dans un nœud de plan et ses enfants."""
+    found = [plan["Relation Name"]] if plan.get("Node Type") == "Seq Scan" else []
+    for child in plan.get("Plans", ()):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def check(cur, max_rows: int) -> list:
+    """EXPLAIN de chaque requête ; retourne les noms des requêtes en échec."""
+    cur.execute("SELECT relname, reltuples::bigint AS n FROM pg_class WHERE relkind = 'r'")
+    table_rows = {r["relname"]: r["n"] for r in cur.fetchall()}
+
+    failures = []
+    for name, hot, sql, params in _queries():
+        cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cur.fetchone()["QUERY PLAN"]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        plan = plan[0]["Plan"]
+        big = sorted({t for t in _seq_scans(plan) if table_rows.get(t, 0) > max_rows})
+        if not big:
+            state = "OK"
+        elif hot:
+            state = "ÉCHEC"
+            failures.append(name)
+        else:
+            state = "info"
+        detail = f"  Seq Scan: {', '.join(big)}" if big else ""
+        print(f"[EXPLAIN] {state:<5} {name:<24} coût {plan['Total Cost']:>10.1f}{detail}")
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.explain_check", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tickets", type=int, default=DEFAULT_TICKETS)
+    parser.add_argument("--max-rows", type=int, default=DEFAULT_MAX_ROWS)
+    args = parser.parse_args(argv)
+
+    database_url = os.getenv("EXPLAIN_DATABASE_URL")
+    if not database_url:
+        print("[EXPLAIN] EXPLAIN_DATABASE_URL non définie (base locale jetable, le jeu de test y est écrit)")
+        return 2
+    # Le pool de l'app lit DATABASE_URL au premier appel
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.pop("DATABASE_READ_URL", None)
+
+    from app import migrate
+    from app.database import get_sync_cursor
+
+    migrate.migrate()
+    with get_sync_cursor() as cur:
+        seed(cur, args.tickets)
+    with get_sync_cursor() as cur:
+        failures = check(cur, args.max_rows)
+
+    if failures:
+        print(f"[EXPLAIN] {len(failures)} requête(s) chaude(s) en Seq Scan: {', '.join(failures)}")
+        return 1
+    print("[EXPLAIN] Tous les plans chauds passent par un index")
+    return 0
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    sys.exit(main())
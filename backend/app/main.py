@@ -3,23 +3,52 @@ KLIKPHONE SAV — API REST FastAPI
 Point d'entrée principal.
 """
 
+import asyncio
 import os
 from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from app.database import close_pool
+from app.database import close_pool, prewarm_pool, run_in_db_thread, pool_stats, PoolSaturated
 from app.api import auth, tickets, clients, config, team, parts, catalog, tarifs
+from app import migrate
+from app.services import ticket_stream, params, tarif_index, quote
+from app.services.pg_listener import stop_listener
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Lifecycle: fermer proprement le pool DB à l'arrêt."""
+    """Lifecycle: pré-chauffer le pool DB, appliquer les migrations et lancer
+    LISTEN au démarrage ; tout fermer proprement à l'arrêt.
+
+    Un échec des migrations empêche le démarrage : le code servi suppose le
+    schéma à jour."""
+    try:
+        await run_in_db_thread(prewarm_pool)
+    except Exception as e:
+        # Le pool se remplira à la demande : l'API démarre quand même
+        print(f"[DB] Pré-chauffage du pool impossible: {e}")
+    try:
+        await run_in_db_thread(migrate.migrate)
+    except Exception as e:
+        print(f"[MIGRATE] Migrations en échec, démarrage annulé: {e}")
+        close_pool()
+        raise
+    try:
+        # Le listener se reconnecte tout seul si la base est injoignable
+        params.cache.start()
+        tarif_index.index.start()
+        quote.quotes.start()
+        ticket_stream.stream.start(asyncio.get_running_loop())
+    except RuntimeError as e:
+        print(f"[DB] Flux temps réel désactivé: {e}")
     yield
+    stop_listener()
     close_pool()
 
 
@@ -44,8 +73,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# ─── SURCHARGE DB ───────────────────────────────────────────────
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    """Pool DB saturé : 503 propre avec Retry-After au lieu d'une 500."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Serveur occupé, réessayez dans un instant"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 # ─── ROUTERS ────────────────────────────────────────────────────
 app.include_router(auth.router)
 app.include_router(tickets.router)
@@ -63,6 +104,12 @@ async def health():
     return {"status": "ok", "service": "klikphone-sav-api"}
 
 
+@app.get("/health/db")
+async def health_db():
+    """Compteurs des pools de connexions (in_use, idle, waiting, rejected...)."""
+    return pool_stats()
+
+
 @app.get("/")
 async def root():
     return {
@@ -0,0 +1,142 @@
+"""
+Migrations de schéma versionnées.
+
+Les fichiers `app/migrations/NNNN_nom.sql` sont appliqués dans l'ordre de
+leur numéro, une seule fois chacun, et enregistrés dans `schema_migrations`
+(version, nom, empreinte sha256, date, durée). Une migration appliquée ne
+se modifie plus : on en ajoute une nouvelle.
+
+Chaque migration tourne dans sa propre transaction, qui commence par
+`pg_advisory_xact_lock` : si plusieurs workers démarrent en même temps, un
+seul l'applique, les autres attendent puis la trouvent déjà faite. Un
+verrou de transaction (et non de session) fonctionne aussi derrière
+PgBouncer en mode transaction.
+
+Appelé au démarrage de l'API (lifespan). En ligne de commande :
+    python -m app.migrate           applique les migrations en attente
+    python -m app.migrate status    liste les migrations et leur état
+"""
+
+import hashlib
+import os
+import re
+import time
+
+from app.database import get_sync_cursor
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+# Clé du verrou consultatif "migrations" (arbitraire, propre à l'app)
+LOCK_KEY = 7_310_000
+
+_FILE_RE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    duration_ms INTEGER
+)
+"""
+
+
+def load_migrations(directory: str = MIGRATIONS_DIR) -> list:
+    """Migrations du dépôt, triées : [{"version", "name", "sql", "checksum"}]."""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        m = _FILE_RE.match(filename)
+        if not m:
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            sql = f.read()
+        migrations.append({
+            "version": int(m.group(1)),
+            "name": m.group(2),
+            "sql": sql,
+            "checksum": hashlib.sha256(sql.encode("utf-8")).hexdigest(),
+        })
+    versions = [m["version"] for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Numéros de migration en double dans {directory}")
+    return migrations
+
+
+def applied_migrations() -> dict:
+    """{version: {"name", "checksum", "applied_at"}} (vide si la table n'existe pas)."""
+    with get_sync_cursor() as cur:
+        cur.execute("SELECT to_regclass('schema_migrations') IS NOT NULL AS ok")
+        if not cur.fetchone()["ok"]:
+            return {}
+        cur.execute("SELECT version, name, checksum, applied_at FROM schema_migrations")
+        return {r["version"]: r for r in cur.fetchall()}
+
+
+def _check(migration, row):
+    if row["checksum"] != migration["checksum"]:
+        print(
+            f"[MIGRATIONS] Attention : {migration['version']:04d}_{migration['name']} "
+            f"a été modifiée après son application (ignorée)"
+        )
+
+
+def migrate() -> list:
+    """Applique les migrations en attente. Retourne les versions appliquées."""
+    migrations = load_migrations()
+    applied = applied_migrations()
+    for migration in migrations:
+        if migration["version"] in applied:
+            _check(migration, applied[migration["version"]])
+    pending = [m for m in migrations if m["version"] not in applied]
+    if not pending:
+        return []
+
+    done = []
+    for migration in pending:
+        label = f"{migration['version']:04d}_{migration['name']}"
+        with get_sync_cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (LOCK_KEY,))
+            cur.execute(TABLE_SQL)
+            cur.execute(
+                "SELECT checksum FROM schema_migrations WHERE version = %s",
+                (migration["version"],),
+            )
+            if cur.fetchone():
+                continue  # appliquée entre-temps par un autre worker
+            start = time.perf_counter()
+            cur.execute(migration["sql"])
+            duration_ms = round((time.perf_counter() - start) * 1000)
+            cur.execute(
+                """INSERT INTO schema_migrations (version, name, checksum, duration_ms)
+                   VALUES (%s, %s, %s, %s)""",
+                (migration["version"], migration["name"], migration["checksum"], duration_ms),
+            )
+        print(f"[MIGRATIONS] {label} appliquée en {duration_ms} ms")
+        done.append(migration["version"])
+    return done
+
+
+def status() -> list:
+    """[(version, nom, appliquée le / None, modifiée depuis ?)] pour chaque migration."""
+    applied = applied_migrations()
+    return [
+        (
+            m["version"], m["name"],
+            applied[m["version"]]["applied_at"] if m["version"] in applied else None,
+            m["version"] in applied and applied[m["version"]]["checksum"] != m["checksum"],
+        )
+        for m in load_migrations()
+    ]
+
+
+if __name__ == "__main__":
+    import sys
+    from dotenv import load_dotenv
+    load_dotenv()
+    if sys.argv[1:] == ["status"]:
+        for version, name, applied_at, modified in status():
+            state = applied_at.strftime("%Y-%m-%d %H:%M") if applied_at else "en attente"
+            print(f"{version:04d}_{name:<30} {state}{'  (modifiée)' if modified else ''}")
+    else:
+        versions = migrate()
+        print(f"[MIGRATIONS] {len(versions)} migration(s) appliquée(s)")
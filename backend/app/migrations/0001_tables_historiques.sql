@@ -0,0 +1,101 @@
+-- Tables historiques de l'app Streamlit (tickets, clients, commandes,
+-- équipe, paramètres, catalogue). Sans effet sur une base existante :
+-- elles ne sont créées que sur une base neuve. Les dates sont du texte
+-- "YYYY-MM-DD HH:MM:SS", comme dans l'app Streamlit.
+
+CREATE TABLE IF NOT EXISTS params (
+    cle TEXT PRIMARY KEY,
+    valeur TEXT
+);
+
+CREATE TABLE IF NOT EXISTS clients (
+    id SERIAL PRIMARY KEY,
+    nom TEXT NOT NULL,
+    prenom TEXT DEFAULT '',
+    telephone TEXT,
+    email TEXT DEFAULT '',
+    societe TEXT DEFAULT '',
+    carte_camby INTEGER DEFAULT 0,
+    date_creation TEXT DEFAULT to_char(NOW(), 'YYYY-MM-DD HH24:MI:SS')
+);
+
+CREATE TABLE IF NOT EXISTS tickets (
+    id SERIAL PRIMARY KEY,
+    ticket_code TEXT,
+    client_id INTEGER REFERENCES clients(id),
+    categorie TEXT,
+    marque TEXT,
+    modele TEXT,
+    modele_autre TEXT DEFAULT '',
+    imei TEXT DEFAULT '',
+    panne TEXT,
+    panne_detail TEXT DEFAULT '',
+    pin TEXT DEFAULT '',
+    pattern TEXT DEFAULT '',
+    notes_client TEXT DEFAULT '',
+    notes_internes TEXT DEFAULT '',
+    commentaire_client TEXT DEFAULT '',
+    historique TEXT DEFAULT '',
+    reparation_supp TEXT,
+    prix_supp REAL,
+    devis_estime REAL,
+    acompte REAL,
+    tarif_final REAL,
+    personne_charge TEXT,
+    technicien_assigne TEXT,
+    commande_piece INTEGER DEFAULT 0,
+    date_recuperation TEXT,
+    client_contacte INTEGER DEFAULT 0,
+    client_accord INTEGER DEFAULT 0,
+    paye INTEGER DEFAULT 0,
+    msg_whatsapp INTEGER DEFAULT 0,
+    msg_sms INTEGER DEFAULT 0,
+    msg_email INTEGER DEFAULT 0,
+    type_ecran TEXT,
+    statut TEXT DEFAULT 'En attente de diagnostic',
+    date_depot TEXT DEFAULT to_char(NOW(), 'YYYY-MM-DD HH24:MI:SS'),
+    date_maj TEXT DEFAULT to_char(NOW(), 'YYYY-MM-DD HH24:MI:SS'),
+    date_cloture TEXT
+);
+
+CREATE TABLE IF NOT EXISTS commandes_pieces (
+    id SERIAL PRIMARY KEY,
+    ticket_id INTEGER REFERENCES tickets(id) ON DELETE CASCADE,
+    description TEXT NOT NULL,
+    fournisseur TEXT DEFAULT '',
+    reference TEXT DEFAULT '',
+    prix REAL DEFAULT 0,
+    statut TEXT DEFAULT 'En attente',
+    date_commande TEXT,
+    date_reception TEXT,
+    notes TEXT DEFAULT '',
+    date_creation TEXT DEFAULT to_char(NOW(), 'YYYY-MM-DD HH24:MI:SS')
+);
+
+CREATE TABLE IF NOT EXISTS membres_equipe (
+    id SERIAL PRIMARY KEY,
+    nom TEXT NOT NULL,
+    role TEXT,
+    couleur TEXT DEFAULT '#3B82F6',
+    actif INTEGER DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS catalog_marques (
+    id SERIAL PRIMARY KEY,
+    categorie TEXT NOT NULL,
+    marque TEXT NOT NULL,
+    UNIQUE (categorie, marque)
+);
+
+CREATE TABLE IF NOT EXISTS catalog_modeles (
+    id SERIAL PRIMARY KEY,
+    categorie TEXT NOT NULL,
+    marque TEXT NOT NULL,
+    modele TEXT NOT NULL,
+    UNIQUE (categorie, marque, modele)
+);
+
+-- Pagination par curseur : ORDER BY date DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_tickets_depot_id ON tickets(date_depot DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_clients_creation_id ON clients(date_creation DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_commandes_creation_id ON commandes_pieces(date_creation DESC, id DESC);
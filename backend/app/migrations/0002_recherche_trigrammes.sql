@@ -0,0 +1,31 @@
+-- Recherche tickets / clients : colonnes search_doc / tel_digits et index pg_trgm.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() n'est pas IMMUTABLE (dictionnaire résolu au runtime) :
+-- wrapper à dictionnaire explicite, utilisable dans une colonne générée.
+CREATE OR REPLACE FUNCTION f_unaccent(text)
+RETURNS text LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$;
+
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS search_doc TEXT
+    GENERATED ALWAYS AS (f_unaccent(lower(
+        COALESCE(ticket_code, '') || ' ' || COALESCE(marque, '') || ' ' ||
+        COALESCE(modele, '') || ' ' || COALESCE(modele_autre, '') || ' ' ||
+        COALESCE(imei, '')
+    ))) STORED;
+
+ALTER TABLE clients ADD COLUMN IF NOT EXISTS search_doc TEXT
+    GENERATED ALWAYS AS (f_unaccent(lower(
+        COALESCE(nom, '') || ' ' || COALESCE(prenom, '') || ' ' ||
+        COALESCE(societe, '') || ' ' || COALESCE(email, '')
+    ))) STORED;
+
+ALTER TABLE clients ADD COLUMN IF NOT EXISTS tel_digits TEXT
+    GENERATED ALWAYS AS (regexp_replace(COALESCE(telephone, ''), '[^0-9]', '', 'g')) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_tickets_search_trgm ON tickets USING gin (search_doc gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_clients_search_trgm ON clients USING gin (search_doc gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_clients_tel_trgm ON clients USING gin (tel_digits gin_trgm_ops);
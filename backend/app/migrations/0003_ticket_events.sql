@@ -0,0 +1,12 @@
+-- Journal append-only des tickets.
+
+CREATE TABLE IF NOT EXISTS ticket_events (
+    id BIGSERIAL PRIMARY KEY,
+    ticket_id INTEGER NOT NULL,
+    ts TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    kind VARCHAR(20) NOT NULL,
+    author TEXT DEFAULT '',
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb
+);
+
+CREATE INDEX IF NOT EXISTS idx_ticket_events_ticket_ts ON ticket_events(ticket_id, ts, id);
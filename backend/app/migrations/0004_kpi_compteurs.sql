@@ -0,0 +1,90 @@
+-- Compteurs KPI tenus par trigger sur tickets, puis amorçage depuis la table.
+
+CREATE TABLE IF NOT EXISTS ticket_kpi_statut (
+    statut TEXT PRIMARY KEY,
+    total INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS ticket_kpi_jour (
+    jour DATE PRIMARY KEY,
+    nouveaux INTEGER NOT NULL DEFAULT 0,
+    clotures INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION kpi_bump_statut(p_statut TEXT, p_delta INTEGER)
+RETURNS void LANGUAGE sql AS $$
+    INSERT INTO ticket_kpi_statut (statut, total)
+    SELECT COALESCE(p_statut, ''), p_delta
+    ON CONFLICT (statut) DO UPDATE SET total = ticket_kpi_statut.total + EXCLUDED.total;
+$$;
+
+CREATE OR REPLACE FUNCTION kpi_bump_jour(p_jour DATE, p_nouveaux INTEGER, p_clotures INTEGER)
+RETURNS void LANGUAGE sql AS $$
+    INSERT INTO ticket_kpi_jour (jour, nouveaux, clotures)
+    SELECT p_jour, p_nouveaux, p_clotures
+    WHERE p_jour IS NOT NULL
+    ON CONFLICT (jour) DO UPDATE SET
+        nouveaux = ticket_kpi_jour.nouveaux + EXCLUDED.nouveaux,
+        clotures = ticket_kpi_jour.clotures + EXCLUDED.clotures;
+$$;
+
+-- Les dates legacy sont du texte, en principe "YYYY-MM-DD HH:MM:SS" : une
+-- valeur illisible donne NULL (pas de compteur du jour) au lieu de faire
+-- échouer la migration, puis chaque écriture sur le ticket. Le passage par
+-- ::text marche aussi bien sur du texte que sur un timestamp.
+CREATE OR REPLACE FUNCTION kpi_jour(v TEXT)
+RETURNS DATE LANGUAGE plpgsql STABLE AS $$
+BEGIN
+    RETURN NULLIF(btrim(v), '')::date;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION tickets_kpi_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM kpi_bump_statut(OLD.statut, -1);
+        PERFORM kpi_bump_jour(kpi_jour(OLD.date_depot::text), -1, 0);
+        PERFORM kpi_bump_jour(kpi_jour(OLD.date_cloture::text), 0, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM kpi_bump_statut(NEW.statut, 1);
+        PERFORM kpi_bump_jour(kpi_jour(NEW.date_depot::text), 1, 0);
+        PERFORM kpi_bump_jour(kpi_jour(NEW.date_cloture::text), 0, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER tickets_kpi_ins_del
+    AFTER INSERT OR DELETE ON tickets
+    FOR EACH ROW EXECUTE FUNCTION tickets_kpi_trigger();
+
+CREATE OR REPLACE TRIGGER tickets_kpi_upd
+    AFTER UPDATE OF statut, date_depot, date_cloture ON tickets
+    FOR EACH ROW
+    WHEN (OLD.statut IS DISTINCT FROM NEW.statut
+          OR OLD.date_depot IS DISTINCT FROM NEW.date_depot
+          OR OLD.date_cloture IS DISTINCT FROM NEW.date_cloture)
+    EXECUTE FUNCTION tickets_kpi_trigger();
+
+LOCK TABLE tickets IN SHARE MODE;
+
+TRUNCATE ticket_kpi_statut, ticket_kpi_jour;
+
+INSERT INTO ticket_kpi_statut (statut, total)
+SELECT COALESCE(statut, ''), COUNT(*) FROM tickets GROUP BY 1;
+
+INSERT INTO ticket_kpi_jour (jour, nouveaux, clotures)
+SELECT jour, SUM(nouveaux), SUM(clotures)
+FROM (
+    SELECT kpi_jour(date_depot::text) AS jour, 1 AS nouveaux, 0 AS clotures
+    FROM tickets
+    UNION ALL
+    SELECT kpi_jour(date_cloture::text), 0, 1
+    FROM tickets
+) d
+WHERE jour IS NOT NULL
+GROUP BY jour;
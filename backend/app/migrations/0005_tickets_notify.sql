@@ -0,0 +1,28 @@
+-- Notifications temps réel des changements de tickets (flux SSE).
+
+CREATE SEQUENCE IF NOT EXISTS ticket_changes_seq;
+
+CREATE OR REPLACE FUNCTION tickets_notify_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    rec RECORD;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        rec := OLD;
+    ELSE
+        rec := NEW;
+    END IF;
+    PERFORM pg_notify('ticket_changes', json_build_object(
+        'seq', nextval('ticket_changes_seq'),
+        'op', TG_OP,
+        'id', rec.id,
+        'statut', rec.statut,
+        'ancien_statut', CASE WHEN TG_OP = 'UPDATE' THEN OLD.statut END
+    )::text);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER tickets_notify
+    AFTER INSERT OR UPDATE OR DELETE ON tickets
+    FOR EACH ROW EXECUTE FUNCTION tickets_notify_trigger();
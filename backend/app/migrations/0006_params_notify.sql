@@ -0,0 +1,13 @@
+-- Invalidation du cache params des workers.
+
+CREATE OR REPLACE FUNCTION params_notify_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('params_changed', '');
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER params_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON params
+    FOR EACH STATEMENT EXECUTE FUNCTION params_notify_trigger();
@@ -0,0 +1,49 @@
+-- Grille tarifaire : table, clé naturelle unique et historique des prix.
+
+CREATE TABLE IF NOT EXISTS tarifs (
+    id SERIAL PRIMARY KEY,
+    marque VARCHAR(50) NOT NULL,
+    modele VARCHAR(100) NOT NULL,
+    type_piece VARCHAR(50) NOT NULL,
+    qualite VARCHAR(50) DEFAULT '',
+    nom_fournisseur TEXT DEFAULT '',
+    prix_fournisseur_ht DECIMAL(10,2),
+    prix_client INTEGER NOT NULL,
+    categorie VARCHAR(20) DEFAULT 'standard',
+    source VARCHAR(50) DEFAULT 'mobilax',
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_tarifs_marque ON tarifs(marque);
+CREATE INDEX IF NOT EXISTS idx_tarifs_modele ON tarifs(modele);
+CREATE INDEX IF NOT EXISTS idx_tarifs_recherche ON tarifs(marque, modele, type_piece);
+
+-- Clé naturelle (marque, modele, type_piece, qualite) : on supprime d'abord
+-- les doublons en gardant le prix fournisseur le plus bas, comme le scraper.
+LOCK TABLE tarifs IN SHARE ROW EXCLUSIVE MODE;
+
+UPDATE tarifs SET qualite = '' WHERE qualite IS NULL;
+
+DELETE FROM tarifs a USING tarifs b
+WHERE a.marque = b.marque AND a.modele = b.modele
+  AND a.type_piece = b.type_piece AND a.qualite = b.qualite
+  AND (COALESCE(a.prix_fournisseur_ht, 0), a.id)
+    > (COALESCE(b.prix_fournisseur_ht, 0), b.id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_tarifs_cle ON tarifs(marque, modele, type_piece, qualite);
+
+CREATE TABLE IF NOT EXISTS tarifs_history (
+    id BIGSERIAL PRIMARY KEY,
+    marque VARCHAR(50) NOT NULL,
+    modele VARCHAR(100) NOT NULL,
+    type_piece VARCHAR(50) NOT NULL,
+    qualite VARCHAR(50) NOT NULL DEFAULT '',
+    ancien_prix_fournisseur_ht DECIMAL(10,2),
+    nouveau_prix_fournisseur_ht DECIMAL(10,2),
+    ancien_prix_client INTEGER,
+    nouveau_prix_client INTEGER,
+    changed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_tarifs_history_modele
+    ON tarifs_history(marque, modele, changed_at);
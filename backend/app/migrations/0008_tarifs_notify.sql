@@ -0,0 +1,13 @@
+-- Reconstruction des index mémoire des tarifs dans chaque worker.
+
+CREATE OR REPLACE FUNCTION tarifs_notify_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('tarifs_changed', '');
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER tarifs_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON tarifs
+    FOR EACH STATEMENT EXECUTE FUNCTION tarifs_notify_trigger();
@@ -0,0 +1,22 @@
+-- Mise à jour incrémentale des alias du moteur de devis.
+
+CREATE OR REPLACE FUNCTION catalog_modeles_notify_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    rec RECORD;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        rec := OLD;
+    ELSE
+        rec := NEW;
+    END IF;
+    PERFORM pg_notify('catalog_changed', json_build_object(
+        'op', TG_OP, 'marque', rec.marque, 'modele', rec.modele
+    )::text);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER catalog_modeles_notify
+    AFTER INSERT OR UPDATE OR DELETE ON catalog_modeles
+    FOR EACH ROW EXECUTE FUNCTION catalog_modeles_notify_trigger();
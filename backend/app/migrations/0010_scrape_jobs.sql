@@ -0,0 +1,22 @@
+-- Jobs de scraping des tarifs (historique, progression, annulation).
+
+CREATE TABLE IF NOT EXISTS scrape_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    replay BOOLEAN NOT NULL DEFAULT FALSE,
+    requested_by TEXT DEFAULT '',
+    progress JSONB NOT NULL DEFAULT '{}'::jsonb,
+    summary JSONB,
+    error TEXT,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    duration_s REAL
+);
+
+-- Au plus un job actif (filet de sécurité en plus du verrou consultatif)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_scrape_jobs_actif
+    ON scrape_jobs ((true)) WHERE status IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_scrape_jobs_created ON scrape_jobs(created_at DESC);
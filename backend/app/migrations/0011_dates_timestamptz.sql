@@ -0,0 +1,89 @@
+-- Dates en timestamptz au lieu du texte "YYYY-MM-DD HH:MM:SS" : valeurs
+-- par défaut côté serveur (NOW()), comparaisons et index sur de vraies dates.
+--
+-- Les anciennes valeurs sont lues comme heures locales de la boutique
+-- (paramètre SHOP_TIMEZONE, Europe/Paris par défaut) ; une valeur illisible
+-- devient NULL. Le même fuseau devient celui de la base, pour que l'app
+-- Streamlit, qui écrit encore des dates texte, reste à la bonne heure.
+-- Les dates saisies à la main (date_recuperation, date_commande,
+-- date_reception) restent du texte.
+
+DO $$
+DECLARE
+    tz TEXT := COALESCE(
+        NULLIF((SELECT valeur FROM params WHERE cle = 'SHOP_TIMEZONE'), ''),
+        'Europe/Paris'
+    );
+BEGIN
+    -- Fuseau inconnu : erreur ici, avant toute conversion
+    PERFORM set_config('TimeZone', tz, true);
+    BEGIN
+        EXECUTE format('ALTER DATABASE %I SET TimeZone = %L', current_database(), tz);
+    EXCEPTION WHEN insufficient_privilege THEN
+        RAISE NOTICE 'Fuseau par défaut de la base inchangé (droits insuffisants)';
+    END;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION pg_temp.legacy_ts(v TEXT)
+RETURNS TIMESTAMPTZ LANGUAGE plpgsql AS $$
+BEGIN
+    RETURN NULLIF(btrim(v), '')::timestamptz;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$;
+
+-- Le trigger KPI porte sur date_depot / date_cloture : recréé plus bas
+DROP TRIGGER IF EXISTS tickets_kpi_upd ON tickets;
+
+ALTER TABLE tickets
+    ALTER COLUMN date_depot DROP DEFAULT,
+    ALTER COLUMN date_depot TYPE TIMESTAMPTZ USING pg_temp.legacy_ts(date_depot::text),
+    ALTER COLUMN date_depot SET DEFAULT NOW(),
+    ALTER COLUMN date_maj DROP DEFAULT,
+    ALTER COLUMN date_maj TYPE TIMESTAMPTZ USING pg_temp.legacy_ts(date_maj::text),
+    ALTER COLUMN date_maj SET DEFAULT NOW(),
+    ALTER COLUMN date_cloture TYPE TIMESTAMPTZ USING pg_temp.legacy_ts(date_cloture::text);
+
+ALTER TABLE clients
+    ALTER COLUMN date_creation DROP DEFAULT,
+    ALTER COLUMN date_creation TYPE TIMESTAMPTZ USING pg_temp.legacy_ts(date_creation::text),
+    ALTER COLUMN date_creation SET DEFAULT NOW();
+
+ALTER TABLE commandes_pieces
+    ALTER COLUMN date_creation DROP DEFAULT,
+    ALTER COLUMN date_creation TYPE TIMESTAMPTZ USING pg_temp.legacy_ts(date_creation::text),
+    ALTER COLUMN date_creation SET DEFAULT NOW();
+
+ALTER TABLE tarifs ALTER COLUMN updated_at TYPE TIMESTAMPTZ;
+ALTER TABLE tarifs_history ALTER COLUMN changed_at TYPE TIMESTAMPTZ;
+
+DROP FUNCTION pg_temp.legacy_ts(TEXT);
+
+-- "Aujourd'hui" se lit désormais par intervalle sur les index de dates :
+-- plus besoin des compteurs par jour, le trigger ne suit que les statuts.
+CREATE OR REPLACE FUNCTION tickets_kpi_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM kpi_bump_statut(OLD.statut, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM kpi_bump_statut(NEW.statut, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER tickets_kpi_upd
+    AFTER UPDATE OF statut ON tickets
+    FOR EACH ROW
+    WHEN (OLD.statut IS DISTINCT FROM NEW.statut)
+    EXECUTE FUNCTION tickets_kpi_trigger();
+
+DROP FUNCTION IF EXISTS kpi_bump_jour(DATE, INTEGER, INTEGER);
+DROP TABLE IF EXISTS ticket_kpi_jour;
+
+-- date_depot est déjà couverte par idx_tickets_depot_id (date_depot DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_tickets_cloture ON tickets(date_cloture);
@@ -0,0 +1,27 @@
+-- Index des filtres chauds de l'API, contrôlés par `python -m app.explain_check`.
+-- Les tables historiques (Streamlit) n'en avaient aucun de garanti.
+
+-- Liste filtrée par statut, triée comme la liste complète
+CREATE INDEX IF NOT EXISTS idx_tickets_statut_depot
+    ON tickets(statut, date_depot DESC, id DESC);
+
+-- Tickets d'un client (fiche client, contrôle avant suppression)
+CREATE INDEX IF NOT EXISTS idx_tickets_client_depot
+    ON tickets(client_id, date_depot DESC);
+
+-- Suivi public par code (get_ticket_by_code)
+CREATE INDEX IF NOT EXISTS idx_tickets_code ON tickets(ticket_code);
+
+-- get_client_by_tel, create_or_get_client
+CREATE INDEX IF NOT EXISTS idx_clients_telephone ON clients(telephone);
+
+-- Commandes d'un ticket, triées comme la liste (et ON DELETE CASCADE)
+CREATE INDEX IF NOT EXISTS idx_commandes_ticket_creation
+    ON commandes_pieces(ticket_id, date_creation DESC, id DESC);
+
+-- Listes du catalogue : filtre et tri servis par le même index. Les bases
+-- créées par Streamlit n'ont pas forcément les contraintes UNIQUE de 0001.
+CREATE INDEX IF NOT EXISTS idx_catalog_marques_categorie
+    ON catalog_marques(categorie, marque);
+CREATE INDEX IF NOT EXISTS idx_catalog_modeles_categorie_marque
+    ON catalog_modeles(categorie, marque, modele);
@@ -0,0 +1,23 @@
+-- Pagination par curseur : les listes trient sur COALESCE(date, '-infinity')
+-- (dates NULL en fin de liste, voir app/api/pagination.py). Les index de tri
+-- portent la même expression pour rester utilisables.
+-- idx_tickets_depot_id reste : il sert les intervalles de dates (KPI).
+
+CREATE INDEX IF NOT EXISTS idx_tickets_depot_tri
+    ON tickets(COALESCE(date_depot, '-infinity'::timestamptz) DESC, id DESC);
+
+DROP INDEX IF EXISTS idx_tickets_statut_depot;
+CREATE INDEX IF NOT EXISTS idx_tickets_statut_depot_tri
+    ON tickets(statut, COALESCE(date_depot, '-infinity'::timestamptz) DESC, id DESC);
+
+DROP INDEX IF EXISTS idx_clients_creation_id;
+CREATE INDEX IF NOT EXISTS idx_clients_creation_tri
+    ON clients(COALESCE(date_creation, '-infinity'::timestamptz) DESC, id DESC);
+
+DROP INDEX IF EXISTS idx_commandes_creation_id;
+CREATE INDEX IF NOT EXISTS idx_commandes_creation_tri
+    ON commandes_pieces(COALESCE(date_creation, '-infinity'::timestamptz) DESC, id DESC);
+
+DROP INDEX IF EXISTS idx_commandes_ticket_creation;
+CREATE INDEX IF NOT EXISTS idx_commandes_ticket_creation_tri
+    ON commandes_pieces(ticket_id, COALESCE(date_creation, '-infinity'::timestamptz) DESC, id DESC);
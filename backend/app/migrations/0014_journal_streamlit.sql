@@ -0,0 +1,67 @@
+-- L'app Streamlit écrit encore le journal dans les colonnes texte
+-- historique / notes_internes. Une fois un ticket migré vers ticket_events
+-- (python -m app.services.ticket_events), l'API n'affiche plus ces colonnes :
+-- les lignes ajoutées ensuite sont recopiées ici en événements.
+--
+-- Streamlit ajoute en fin de texte ; si le texte a été réécrit, seules les
+-- lignes absentes de l'ancienne version sont reprises.
+
+CREATE OR REPLACE FUNCTION ticket_legacy_lines(old_text TEXT, new_text TEXT)
+RETURNS SETOF TEXT LANGUAGE sql IMMUTABLE AS $$
+    WITH v AS (
+        SELECT COALESCE(old_text, '') AS o, COALESCE(new_text, '') AS n
+    )
+    SELECT btrim(l.line)
+    FROM v,
+         unnest(string_to_array(
+             CASE WHEN starts_with(v.n, v.o) THEN substr(v.n, length(v.o) + 1) ELSE v.n END,
+             E'\n'
+         )) WITH ORDINALITY AS l(line, i)
+    WHERE btrim(l.line) <> ''
+      AND (starts_with(v.n, v.o) OR l.line <> ALL (string_to_array(v.o, E'\n')))
+    ORDER BY l.i
+$$;
+
+CREATE OR REPLACE FUNCTION tickets_legacy_journal_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    line TEXT;
+    texte TEXT;
+    statut TEXT[];
+BEGIN
+    -- Ticket pas encore migré : l'API affiche encore les colonnes texte
+    IF NOT EXISTS (
+        SELECT 1 FROM ticket_events WHERE ticket_id = NEW.id AND payload ? 'legacy'
+    ) THEN
+        RETURN NULL;
+    END IF;
+
+    FOR line IN SELECT ticket_legacy_lines(OLD.historique, NEW.historique) LOOP
+        -- L'horodatage "[dd/mm HH:MM]" de la ligne est remplacé par ts
+        texte := regexp_replace(line, '^\[[0-9/]+\s+[0-9]{2}:[0-9]{2}\]\s?', '');
+        statut := regexp_match(texte, '^Statut:\s*(.*?)\s*→\s*(.*)$');
+        IF statut IS NOT NULL THEN
+            INSERT INTO ticket_events (ticket_id, kind, author, payload)
+            VALUES (NEW.id, 'statut', 'streamlit',
+                    jsonb_build_object('de', statut[1], 'vers', statut[2]));
+        ELSE
+            INSERT INTO ticket_events (ticket_id, kind, author, payload)
+            VALUES (NEW.id, 'historique', 'streamlit', jsonb_build_object('texte', texte));
+        END IF;
+    END LOOP;
+
+    FOR line IN SELECT ticket_legacy_lines(OLD.notes_internes, NEW.notes_internes) LOOP
+        texte := regexp_replace(line, '^\[[0-9/]+\s+[0-9]{2}:[0-9]{2}\]\s?', '');
+        INSERT INTO ticket_events (ticket_id, kind, author, payload)
+        VALUES (NEW.id, 'note', 'streamlit', jsonb_build_object('texte', texte));
+    END LOOP;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE TRIGGER tickets_legacy_journal
+    AFTER UPDATE OF historique, notes_internes ON tickets
+    FOR EACH ROW
+    WHEN (OLD.historique IS DISTINCT FROM NEW.historique
+          OR OLD.notes_internes IS DISTINCT FROM NEW.notes_internes)
+    EXECUTE FUNCTION tickets_legacy_journal_trigger();
@@ -0,0 +1,34 @@
+-- Renommage / suppression d'un modèle du catalogue : la notification porte
+-- aussi l'ancien couple (marque, modele), pour retirer son alias. `reste`
+-- indique qu'une autre ligne du catalogue porte encore ce couple (le
+-- trigger est AFTER : la ligne modifiée n'y figure plus sous ce nom).
+
+CREATE OR REPLACE FUNCTION catalog_modeles_notify_trigger()
+RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    rec RECORD;
+    ancien JSON;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        rec := OLD;
+    ELSE
+        rec := NEW;
+    END IF;
+    IF TG_OP = 'DELETE'
+       OR (TG_OP = 'UPDATE' AND (OLD.marque, OLD.modele) IS DISTINCT FROM (NEW.marque, NEW.modele)) THEN
+        ancien := json_build_object(
+            'marque', OLD.marque,
+            'modele', OLD.modele,
+            'reste', EXISTS (
+                SELECT 1 FROM catalog_modeles
+                WHERE marque IS NOT DISTINCT FROM OLD.marque
+                  AND modele IS NOT DISTINCT FROM OLD.modele
+            )
+        );
+    END IF;
+    PERFORM pg_notify('catalog_changed', json_build_object(
+        'op', TG_OP, 'marque', rec.marque, 'modele', rec.modele, 'ancien', ancien
+    )::text);
+    RETURN NULL;
+END;
+$$;
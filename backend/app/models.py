@@ -53,7 +53,7 @@ class ClientOut(BaseModel):
     email: Optional[str] = None
     societe: Optional[str] = None
     carte_camby: Optional[int] = 0
-    date_creation: Optional[str] = None
+    date_creation: Optional[datetime] = None
 
 
 # ============================================================
@@ -75,7 +75,7 @@ class TicketCreate(BaseModel):
 
 
 class TicketUpdate(BaseModel):
-    notes_internes: Optional[str] = None
+    # notes_internes : ajout uniquement via POST /api/tickets/{id}/note
     commentaire_client: Optional[str] = None
     devis_estime: Optional[float] = None
     acompte: Optional[float] = None
@@ -131,13 +131,23 @@ class TicketOut(BaseModel):
     msg_sms: Optional[int] = 0
     msg_email: Optional[int] = 0
     statut: Optional[str] = None
-    date_depot: Optional[str] = None
-    date_maj: Optional[str] = None
-    date_cloture: Optional[str] = None
+    date_depot: Optional[datetime] = None
+    date_maj: Optional[datetime] = None
+    date_cloture: Optional[datetime] = None
     type_ecran: Optional[str] = None
     historique: Optional[str] = None
 
 
+class TicketEventOut(BaseModel):
+    """Entrée du journal d'un ticket (table ticket_events)."""
+    id: int
+    ticket_id: int
+    ts: datetime
+    kind: str
+    author: Optional[str] = ""
+    payload: dict = {}
+
+
 class TicketFull(TicketOut):
     """Ticket avec les infos client jointes."""
     client_nom: Optional[str] = None
@@ -178,7 +188,7 @@ class CommandePieceOut(BaseModel):
     date_commande: Optional[str] = None
     date_reception: Optional[str] = None
     notes: Optional[str] = None
-    date_creation: Optional[str] = None
+    date_creation: Optional[datetime] = None
 
 
 # ============================================================
@@ -277,7 +287,7 @@ class TarifOut(BaseModel):
     prix_client: Optional[int] = None
     categorie: Optional[str] = "standard"
     source: Optional[str] = "mobilax"
-    updated_at: Optional[str] = None
+    updated_at: Optional[datetime] = None
 
 
 class TarifImportItem(BaseModel):
@@ -296,11 +306,73 @@ class TarifImportRequest(BaseModel):
     tarifs: List[TarifImportItem]
 
 
+class QuoteOption(BaseModel):
+    tarif_id: int
+    marque: Optional[str] = None
+    modele: str
+    type_piece: str
+    qualite: str = ""
+    prix_client: Optional[int] = None
+    prix_fournisseur_ht: Optional[float] = None
+    correspondance: str
+
+
+class QuoteModele(BaseModel):
+    modele: str
+    correspondance: str
+
+
+class TicketQuote(BaseModel):
+    ticket_id: int
+    marque: Optional[str] = None
+    modele: Optional[str] = None
+    panne: Optional[str] = None
+    pieces: List[str] = []
+    modeles: List[QuoteModele] = []
+    options: List[QuoteOption] = []
+
+
+class TarifSearchResult(BaseModel):
+    total: int = 0
+    items: List[TarifOut] = []
+    facets: dict = {}
+    took_ms: float = 0
+
+
+class TarifPrixPoint(BaseModel):
+    date: datetime
+    prix_fournisseur_ht: Optional[float] = None
+    prix_client: Optional[int] = None
+
+
+class TarifTendance(BaseModel):
+    marque: str
+    modele: str
+    type_piece: str
+    qualite: str = ""
+    points: List[TarifPrixPoint] = []
+
+
+class ScrapeJobOut(BaseModel):
+    id: int
+    status: str
+    replay: bool = False
+    requested_by: Optional[str] = ""
+    progress: dict = {}
+    summary: Optional[dict] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_s: Optional[float] = None
+
+
 class TarifStats(BaseModel):
     total_tarifs: int = 0
     total_modeles: int = 0
     total_marques: int = 0
     prix_min: Optional[int] = None
     prix_max: Optional[int] = None
-    last_update: Optional[str] = None
+    last_update: Optional[datetime] = None
     par_marque: Optional[dict] = None
@@ -4,33 +4,26 @@ Reprend exactement la logique de l'app Streamlit.
 """
 
 import httpx
-from app.database import get_cursor
-
-
-def _get_param(key: str) -> str:
-    with get_cursor() as cur:
-        cur.execute("SELECT valeur FROM params WHERE cle = %s", (key,))
-        row = cur.fetchone()
-    return row["valeur"] if row else ""
+from app.services import params
 
 
 def envoyer_vers_caisse(ticket: dict, payment_override: int = None):
     """Envoie un ticket de réparation vers caisse.enregistreuse.fr"""
     try:
-        apikey = _get_param("CAISSE_APIKEY")
-        shopid = _get_param("CAISSE_SHOPID")
+        apikey = params.get("CAISSE_APIKEY")
+        shopid = params.get("CAISSE_SHOPID")
         if not apikey or not shopid:
             return False, "Configuration API manquante (APIKEY ou SHOPID)"
 
-        caisse_id = (_get_param("CAISSE_ID") or "49343").strip()
-        user_id = (_get_param("CAISSE_USER_ID") or "42867").strip()
+        caisse_id = (params.get("CAISSE_ID") or "49343").strip()
+        user_id = (params.get("CAISSE_USER_ID") or "42867").strip()
 
         if not caisse_id.isdigit():
             return False, f"CAISSE_ID invalide: '{caisse_id}'"
         if not user_id.isdigit():
             return False, f"CAISSE_USER_ID invalide: '{user_id}'"
 
-        delivery_method = (_get_param("CAISSE_DELIVERY_METHOD") or "4").strip()
+        delivery_method = (params.get("CAISSE_DELIVERY_METHOD") or "4").strip()
         if not delivery_method.isdigit():
             delivery_method = "4"
 
@@ -0,0 +1,68 @@
+"""
+Compteurs KPI du dashboard maintenus au fil de l'eau.
+
+`get_kpi` lisait auparavant toute la table tickets (huit COUNT FILTER, dont
+deux casts ::date qu'aucun index ne peut servir). Les compteurs par statut
+sont désormais tenus par un trigger sur `tickets`, donc mis à jour dans la
+même transaction que l'écriture. Cela vaut pour create_ticket,
+change_status et delete_ticket, mais aussi pour tout autre écrivain, comme
+l'ancienne app Streamlit.
+
+    ticket_kpi_statut  (statut → nombre de tickets)
+
+Les chiffres du jour (nouveaux, clôturés) sont des comptages par intervalle
+[début, fin) de la journée boutique sur date_depot / date_cloture, servis
+par leurs index (voir shop_time).
+
+Reconstruction complète (réconciliation) :
+    python -m app.services.kpi
+"""
+
+from app.database import get_sync_cursor
+
+
+# Lecture des KPI : quelques lignes de compteurs plus deux parcours d'index
+# limités à la journée. Paramètres : {"debut", "fin"} (shop_time.day_bounds).
+KPI_SQL = """
+SELECT
+    COALESCE(SUM(total) FILTER (WHERE statut = 'En attente de diagnostic'), 0) as en_attente_diagnostic,
+    COALESCE(SUM(total) FILTER (WHERE statut = 'En cours de réparation'), 0) as en_cours,
+    COALESCE(SUM(total) FILTER (WHERE statut = 'En attente de pièce'), 0) as en_attente_piece,
+    COALESCE(SUM(total) FILTER (WHERE statut = 'En attente d''accord client'), 0) as en_attente_accord,
+    COALESCE(SUM(total) FILTER (WHERE statut = 'Réparation terminée'), 0) as reparation_terminee,
+    COALESCE(SUM(total) FILTER (WHERE statut NOT IN ('Clôturé', 'Rendu au client')), 0) as total_actifs,
+    (SELECT COUNT(*) FROM tickets
+     WHERE date_cloture >= %(debut)s AND date_cloture < %(fin)s) as clotures_aujourdhui,
+    (SELECT COUNT(*) FROM tickets
+     WHERE date_depot >= %(debut)s AND date_depot < %(fin)s) as nouveaux_aujourdhui
+FROM ticket_kpi_statut
+"""
+
+REBUILD_SQL = """
+LOCK TABLE tickets IN SHARE MODE;
+
+TRUNCATE ticket_kpi_statut;
+
+INSERT INTO ticket_kpi_statut (statut, total)
+SELECT COALESCE(statut, ''), COUNT(*) FROM tickets GROUP BY 1;
+"""
+
+
+def rebuild():
+    """Recalcule tous les compteurs depuis la table tickets.
+
+    Les écritures sur tickets sont bloquées le temps du recalcul pour que
+    le trigger ne fasse pas dériver les compteurs pendant la reconstruction.
+    """
+    with get_sync_cursor() as cur:
+        cur.execute(REBUILD_SQL)
+        cur.execute("SELECT COALESCE(SUM(total), 0) AS total FROM ticket_kpi_statut")
+        total = cur.fetchone()["total"]
+    print(f"[KPI] Compteurs reconstruits ({total} tickets)")
+    return total
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    rebuild()
@@ -14,17 +14,7 @@ from email.utils import formataddr
 
 import httpx
 
-from app.database import get_cursor
-
-
-# ─── HELPERS ────────────────────────────────────────────────────
-
-def _get_param(key: str) -> str:
-    """Récupère un paramètre de la table params."""
-    with get_cursor() as cur:
-        cur.execute("SELECT valeur FROM params WHERE cle = %s", (key,))
-        row = cur.fetchone()
-    return row["valeur"] if row else ""
+from app.services import params
 
 
 # ─── DISCORD ────────────────────────────────────────────────────
@@ -32,7 +22,7 @@ def _get_param(key: str) -> str:
 def envoyer_notification_discord(message: str, emoji: str = "📢", utilisateur: str = ""):
     """Envoie une notification vers Discord via webhook (non bloquant)."""
     try:
-        webhook_url = _get_param("DISCORD_WEBHOOK")
+        webhook_url = params.get("DISCORD_WEBHOOK")
         if not webhook_url:
             return False
 
@@ -77,12 +67,12 @@ def notif_deconnexion(utilisateur: str):
 
 def envoyer_email(destinataire: str, sujet: str, message: str, html_content: str = None):
     """Envoie un email via SMTP avec option HTML."""
-    smtp_host = _get_param("SMTP_HOST")
-    smtp_port = _get_param("SMTP_PORT") or "587"
-    smtp_user = _get_param("SMTP_USER")
-    smtp_pass = _get_param("SMTP_PASS")
-    smtp_from = _get_param("SMTP_FROM")
-    smtp_from_name = _get_param("SMTP_FROM_NAME") or "Klikphone"
+    smtp_host = params.get("SMTP_HOST")
+    smtp_port = params.get_int("SMTP_PORT", 587)
+    smtp_user = params.get("SMTP_USER")
+    smtp_pass = params.get("SMTP_PASS")
+    smtp_from = params.get("SMTP_FROM")
+    smtp_from_name = params.get("SMTP_FROM_NAME") or "Klikphone"
 
     if not smtp_host or not smtp_user or not smtp_pass:
         return False, "Configuration SMTP incomplète"
@@ -110,12 +100,12 @@ def envoyer_email(destinataire: str, sujet: str, message: str, html_content: str
 
 def envoyer_email_avec_pdf(destinataire: str, sujet: str, message: str, pdf_bytes: bytes, filename: str = "document.pdf"):
     """Envoie un email avec une pièce jointe PDF."""
-    smtp_host = _get_param("SMTP_HOST")
-    smtp_port = _get_param("SMTP_PORT") or "587"
-    smtp_user = _get_param("SMTP_USER")
-    smtp_pass = _get_param("SMTP_PASS")
-    smtp_from = _get_param("SMTP_FROM")
-    smtp_from_name = _get_param("SMTP_FROM_NAME") or "Klikphone"
+    smtp_host = params.get("SMTP_HOST")
+    smtp_port = params.get_int("SMTP_PORT", 587)
+    smtp_user = params.get("SMTP_USER")
+    smtp_pass = params.get("SMTP_PASS")
+    smtp_from = params.get("SMTP_FROM")
+    smtp_from_name = params.get("SMTP_FROM_NAME") or "Klikphone"
 
     if not smtp_host or not smtp_user or not smtp_pass:
         return False, "Configuration SMTP incomplète"
@@ -0,0 +1,195 @@
+"""
+Cache disque des pages brutes du scraper Mobilax.
+
+    <racine>/index.json            clé de page → empreinte, ETag, Last-Modified
+    <racine>/pages/ab/abcd....gz   corps de page, adressé par son sha256
+    <racine>/parsed/v<N>/abcd....json   résultat du parseur pour cette page
+
+Une page dont le contenu n'a pas changé (304, ou même empreinte) n'est ni
+réécrite ni re-parsée. Le mode replay du scraper reconstruit les tarifs à
+partir du seul cache, sans réseau.
+
+Racine : `SCRAPER_CACHE_DIR` (défaut `.scraper_cache` dans le répertoire
+courant). Après chaque scraping, `prune()` oublie les pages non revues depuis
+`SCRAPER_CACHE_MAX_AGE_DAYS` jours (30 par défaut) et supprime les fichiers
+qu'aucune entrée de l'index ne référence plus.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR", ".scraper_cache")
+CACHE_MAX_AGE_DAYS = int(os.getenv("SCRAPER_CACHE_MAX_AGE_DAYS", "30"))
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class PageCache:
+    """Pages brutes adressées par contenu + index des validateurs HTTP."""
+
+    def __init__(self, root: str = CACHE_DIR):
+        self.root = root
+        self._index_path = os.path.join(root, "index.json")
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+
+    @staticmethod
+    def key(slug: str, page: int) -> str:
+        return f"{slug}/{page}"
+
+    def _page_path(self, digest: str) -> str:
+        return os.path.join(self.root, "pages", digest[:2], f"{digest}.gz")
+
+    def entry(self, key: str):
+        return self._index.get(key)
+
+    def conditional_headers(self, key: str) -> dict:
+        """En-têtes de revalidation pour une page déjà en cache."""
+        entry = self._index.get(key)
+        if not entry or not os.path.exists(self._page_path(entry["sha256"])):
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, key: str, body: bytes, etag=None, last_modified=None) -> tuple:
+        """Enregistre une page téléchargée. Retourne (empreinte, inchangée)."""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._page_path(digest)
+        if not os.path.exists(path):
+            _write_atomic(path, gzip.compress(body))
+        return self._remember(key, digest, etag, last_modified)
+
+    async def store_stream(self, key: str, chunks, etag=None, last_modified=None) -> tuple:
+        """store() pour un corps reçu en morceaux (itérable async d'octets).
+
+        Les morceaux sont compressés et hachés au fil de l'eau dans un
+        fichier temporaire : la page n'est jamais entière en mémoire.
+        """
+        pages_dir = os.path.join(self.root, "pages")
+        os.makedirs(pages_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=pages_dir, prefix=".tmp-")
+        sha = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+                async for chunk in chunks:
+                    sha.update(chunk)
+                    gz.write(chunk)
+            digest = sha.hexdigest()
+            path = self._page_path(digest)
+            if os.path.exists(path):
+                os.unlink(tmp)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return self._remember(key, digest, etag, last_modified)
+
+    def _remember(self, key: str, digest: str, etag, last_modified) -> tuple:
+        previous = self._index.get(key, {})
+        self._index[key] = {
+            "sha256": digest,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        return digest, previous.get("sha256") == digest
+
+    def revalidated(self, key: str) -> str:
+        """Page confirmée inchangée par le serveur (304). Retourne son empreinte."""
+        entry = self._index[key]
+        entry["fetched_at"] = datetime.now().isoformat(timespec="seconds")
+        return entry["sha256"]
+
+    def text(self, digest: str) -> str:
+        with open(self._page_path(digest), "rb") as f:
+            return gzip.decompress(f.read()).decode("utf-8")
+
+    def iter_text(self, digest: str, size: int = 65536):
+        """Page en morceaux de texte, décompressée au fil de la lecture."""
+        with gzip.open(self._page_path(digest), "rt", encoding="utf-8") as f:
+            while True:
+                chunk = f.read(size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def parsed(self, digest: str, parse, version: int):
+        """Résultat de `parse(morceaux de texte)` pour une page, mis en cache.
+
+        La page n'est re-parsée que si ce contenu n'a jamais été vu par
+        cette version du parseur.
+        """
+        path = os.path.join(self.root, "parsed", f"v{version}", f"{digest}.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        result = parse(self.iter_text(digest))
+        _write_atomic(path, json.dumps(result, ensure_ascii=False).encode("utf-8"))
+        return result
+
+    def prune(self, max_age_days: int = CACHE_MAX_AGE_DAYS, parser_version: int = None) -> int:
+        """Éviction : entrées non revues depuis `max_age_days`, puis fichiers orphelins.
+
+        Les résultats parsés d'une autre version que `parser_version` sont
+        aussi supprimés. Retourne le nombre de fichiers supprimés.
+        """
+        cutoff = datetime.now() - timedelta(days=max_age_days)
+        for key, entry in list(self._index.items()):
+            try:
+                fetched_at = datetime.fromisoformat(entry.get("fetched_at") or "")
+            except ValueError:
+                fetched_at = None
+            if fetched_at is None or fetched_at < cutoff:
+                del self._index[key]
+
+        live = {entry["sha256"] for entry in self._index.values()}
+        stale = []
+        for dirpath, _, files in os.walk(os.path.join(self.root, "pages")):
+            stale += [os.path.join(dirpath, f) for f in files
+                      if f.endswith(".gz") and f[:-3] not in live]
+        for dirpath, _, files in os.walk(os.path.join(self.root, "parsed")):
+            other_version = (parser_version is not None
+                             and os.path.basename(dirpath) != f"v{parser_version}")
+            stale += [os.path.join(dirpath, f) for f in files
+                      if f.endswith(".json") and (other_version or f[:-5] not in live)]
+
+        removed = 0
+        for path in stale:
+            try:
+                os.unlink(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def save(self):
+        _write_atomic(
+            self._index_path,
+            json.dumps(self._index, indent=1, sort_keys=True).encode("utf-8"),
+        )
@@ -0,0 +1,102 @@
+"""
+Cache process des paramètres boutique (table `params`).
+
+Les services relisaient chaque clé par un SELECT (six allers-retours avant
+d'envoyer un email, sept pour la caisse, un à chaque tentative de login).
+La table est désormais chargée en une requête et gardée en mémoire.
+
+Invalidation : un trigger sur `params` (migration 0006) émet
+`pg_notify('params_changed')` à chaque écriture, y compris celles de l'app
+Streamlit. Le listener de chaque worker vide alors son cache ; le TTL (`PARAMS_CACHE_TTL`) borne
+l'obsolescence si une notification est perdue.
+
+Usage:
+    from app.services import params
+    host = params.get("SMTP_HOST")
+    port = params.get_int("SMTP_PORT", 587)
+"""
+
+import os
+import threading
+import time
+
+from app.database import get_sync_cursor, run_in_db_thread
+from app.services.pg_listener import get_listener
+
+CHANNEL = "params_changed"
+CACHE_TTL = float(os.getenv("PARAMS_CACHE_TTL", "60"))
+
+
+class ParamsCache:
+    """Copie en mémoire de la table params, rechargée à la demande."""
+
+    def __init__(self, ttl: float = CACHE_TTL):
+        self.ttl = ttl
+        self._values = {}
+        self._loaded_at = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def _load(self) -> dict:
+        with self._lock:
+            if self._fresh():
+                return self._values
+            generation = self._generation
+            with get_sync_cursor() as cur:
+                cur.execute("SELECT cle, valeur FROM params")
+                values = {row["cle"]: row["valeur"] for row in cur.fetchall()}
+            self._values = values
+            # Invalidé pendant la lecture : la copie est peut-être déjà périmée
+            if generation == self._generation:
+                self._loaded_at = time.monotonic()
+            return values
+
+    def invalidate(self, *_):
+        """Vide le cache (callback du listener, ou après une écriture locale)."""
+        self._generation += 1
+        self._loaded_at = None
+
+    def all(self) -> dict:
+        return self._values if self._fresh() else self._load()
+
+    async def aall(self) -> dict:
+        """Version async : le rechargement éventuel passe par le pool de threads DB."""
+        return self._values if self._fresh() else await run_in_db_thread(self._load)
+
+    def start(self):
+        """Abonne le cache aux notifications params_changed du listener."""
+        listener = get_listener()
+        listener.subscribe(CHANNEL, self.invalidate)
+        listener.on_reconnect(self.invalidate)
+
+
+cache = ParamsCache()
+
+
+def get(key: str, default: str = "") -> str:
+    value = cache.all().get(key)
+    return value if value not in (None, "") else default
+
+
+def get_int(key: str, default: int = 0) -> int:
+    try:
+        return int(str(get(key)).strip())
+    except ValueError:
+        return default
+
+
+def get_float(key: str, default: float = 0.0) -> float:
+    try:
+        return float(str(get(key)).strip().replace(",", "."))
+    except ValueError:
+        return default
+
+
+def get_bool(key: str, default: bool = False) -> bool:
+    value = str(get(key)).strip().lower()
+    if not value:
+        return default
+    return value in ("1", "true", "oui", "yes", "on")
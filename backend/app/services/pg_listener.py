@@ -0,0 +1,184 @@
+"""
+Écoute PostgreSQL LISTEN/NOTIFY pour tout le process.
+
+Une seule connexion dédiée (hors pool, en autocommit) tourne dans un thread
+daemon et distribue les notifications aux callbacks abonnés. Chaque worker
+uvicorn a son propre listener : un NOTIFY émis par n'importe quel worker
+(ou par un trigger) est vu par tous.
+
+LISTEN ne passe pas par PgBouncer en mode transaction : `DATABASE_LISTEN_URL`
+permet de pointer sur une connexion directe (sinon DATABASE_URL).
+
+Une connexion LISTEN inactive peut être coupée sans bruit (proxy, NAT) :
+keepalives TCP, et `SELECT 1` après PING_INTERVAL secondes sans trafic,
+pour qu'une socket morte lève une erreur et déclenche la reconnexion.
+
+Usage:
+    listener = get_listener()
+    listener.subscribe("ticket_changes", lambda channel, payload: ...)
+    listener.start()
+"""
+
+import os
+import select
+import threading
+import time
+from collections import defaultdict
+
+import psycopg2
+import psycopg2.extensions
+
+from app.database import with_sslmode
+
+# Délai max d'un select() : borne le temps de prise en compte d'un stop()
+POLL_TIMEOUT = 5.0
+# Ping de la connexion après ce délai sans notification
+PING_INTERVAL = 30.0
+RECONNECT_DELAY_MAX = 30.0
+
+
+class PgListener:
+    """Thread LISTEN sur une connexion dédiée, avec reconnexion automatique."""
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._callbacks = defaultdict(list)
+        self._reconnect_callbacks = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._conn = None
+        self._listening = set()
+        self.connected = False
+
+    def subscribe(self, channel: str, callback):
+        """Abonne `callback(channel, payload)` à un canal (appelé depuis le thread listener)."""
+        with self._lock:
+            self._callbacks[channel].append(callback)
+
+    def on_reconnect(self, callback):
+        """`callback()` est appelé après une reconnexion : des NOTIFY ont pu être perdus."""
+        with self._lock:
+            self._reconnect_callbacks.append(callback)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="pg-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=POLL_TIMEOUT + 1)
+            self._thread = None
+
+    # ─── BOUCLE ──────────────────────────────────────────────
+
+    def _connect(self):
+        conn = psycopg2.connect(
+            self.dsn,
+            connect_timeout=10,
+            keepalives=1,
+            keepalives_idle=30,
+            keepalives_interval=10,
+            keepalives_count=3,
+        )
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        self._conn = conn
+        self._listening = set()
+        self.connected = True
+
+    def _sync_channels(self):
+        with self._lock:
+            wanted = set(self._callbacks)
+        with self._conn.cursor() as cur:
+            for channel in wanted - self._listening:
+                cur.execute(f'LISTEN "{channel}"')
+                self._listening.add(channel)
+
+    def _ping(self):
+        with self._conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        # Les NOTIFY reçus pendant la requête sont déjà dans conn.notifies
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._conn.notifies:
+            notify = self._conn.notifies.pop(0)
+            with self._lock:
+                callbacks = list(self._callbacks.get(notify.channel, ()))
+            for callback in callbacks:
+                try:
+                    callback(notify.channel, notify.payload)
+                except Exception as e:
+                    print(f"[LISTEN] Erreur callback {notify.channel}: {e}")
+
+    def _notify_reconnect(self):
+        with self._lock:
+            callbacks = list(self._reconnect_callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[LISTEN] Erreur callback reconnexion: {e}")
+
+    def _close(self):
+        self.connected = False
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except psycopg2.Error:
+                pass
+            self._conn = None
+
+    def _run(self):
+        delay = 1.0
+        first = True
+        last_seen = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                if self._conn is None:
+                    self._connect()
+                    self._sync_channels()
+                    delay = 1.0
+                    if not first:
+                        self._notify_reconnect()
+                    first = False
+                self._sync_channels()
+                ready, _, _ = select.select([self._conn], [], [], POLL_TIMEOUT)
+                if ready:
+                    self._conn.poll()
+                    self._dispatch()
+                    last_seen = time.monotonic()
+                elif time.monotonic() - last_seen >= PING_INTERVAL:
+                    self._ping()
+                    last_seen = time.monotonic()
+            except (psycopg2.Error, OSError) as e:
+                print(f"[LISTEN] Connexion perdue ({e}), reconnexion dans {delay:.0f}s")
+                self._close()
+                self._stop.wait(delay)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+        self._close()
+
+
+_listener = None
+
+
+def get_listener() -> PgListener:
+    """Listener partagé du process (créé à la demande)."""
+    global _listener
+    if _listener is None:
+        dsn = os.getenv("DATABASE_LISTEN_URL") or os.getenv("DATABASE_URL")
+        if not dsn:
+            raise RuntimeError("DATABASE_URL non définie")
+        _listener = PgListener(with_sslmode(dsn))
+    return _listener
+
+
+def stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
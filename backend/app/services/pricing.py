@@ -0,0 +1,201 @@
+"""
+Calcul des prix client à partir des prix fournisseur.
+
+Règle KLIKPHONE : (prix fournisseur HT × coefficient) + marge, arrondi au 9.
+La marge dépend du type de pièce et, pour les écrans, de la catégorie du
+modèle (standard, haut de gamme, pliant).
+
+Coefficient et marges sont des paramètres boutique (table `params`) :
+
+    TARIF_COEF                       1.2   (TVA)
+    TARIF_MARGE_ECRAN                60
+    TARIF_MARGE_ECRAN_HAUT_DE_GAMME  70
+    TARIF_MARGE_ECRAN_PLIANT         100
+    TARIF_MARGE_AUTRE                60    (batteries, connecteurs, caméras...)
+
+Après un changement de marge, `reprice_tarifs()` recalcule toute la table
+sans re-scraper : calcul vectorisé (NumPy si disponible), puis un seul
+UPDATE ensembliste des prix qui ont changé, tracés dans `tarifs_history`.
+"""
+
+import time
+
+from app.database import get_sync_cursor
+from app.services import params
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ECRAN_TYPES = ("ecran", "écran")
+
+DEFAULTS = {
+    "TARIF_COEF": 1.2,
+    "TARIF_MARGE_ECRAN": 60,
+    "TARIF_MARGE_ECRAN_HAUT_DE_GAMME": 70,
+    "TARIF_MARGE_ECRAN_PLIANT": 100,
+    "TARIF_MARGE_AUTRE": 60,
+}
+
+
+class PricingRules:
+    """Coefficient et marges en vigueur."""
+
+    __slots__ = ("coef", "marge_ecran", "marge_haut_de_gamme", "marge_pliant", "marge_autre")
+
+    def __init__(self, coef=1.2, marge_ecran=60, marge_haut_de_gamme=70,
+                 marge_pliant=100, marge_autre=60):
+        self.coef = coef
+        self.marge_ecran = marge_ecran
+        self.marge_haut_de_gamme = marge_haut_de_gamme
+        self.marge_pliant = marge_pliant
+        self.marge_autre = marge_autre
+
+    @classmethod
+    def from_params(cls):
+        def value(key):
+            return params.get_float(key, DEFAULTS[key])
+        return cls(
+            coef=value("TARIF_COEF"),
+            marge_ecran=value("TARIF_MARGE_ECRAN"),
+            marge_haut_de_gamme=value("TARIF_MARGE_ECRAN_HAUT_DE_GAMME"),
+            marge_pliant=value("TARIF_MARGE_ECRAN_PLIANT"),
+            marge_autre=value("TARIF_MARGE_AUTRE"),
+        )
+
+    def marge(self, type_piece, categorie="standard"):
+        if (type_piece or "").lower() in ECRAN_TYPES:
+            if categorie == "pliant":
+                return self.marge_pliant
+            if categorie == "haut_de_gamme":
+                return self.marge_haut_de_gamme
+            return self.marge_ecran
+        return self.marge_autre
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def current_rules() -> PricingRules:
+    """Règles lues dans params (cache process)."""
+    return PricingRules.from_params()
+
+
+# ─── CALCUL LIGNE À LIGNE ───────────────────────────────────
+
+def arrondi_9(prix):
+    """Arrondi au 9 : 0-1→9 inf, 2-9→9 sup."""
+    p = round(prix)
+    if p <= 0:
+        return 9
+    last = p % 10
+    if last == 9:
+        return p
+    elif last <= 1:
+        return p - last - 1
+    else:
+        return p + (9 - last)
+
+
+def calcul_prix_client(prix_ht, type_piece, categorie="standard", rules: PricingRules = None):
+    """Prix client d'une pièce (règles de params si `rules` n'est pas donné)."""
+    rules = rules or current_rules()
+    return arrondi_9(prix_ht * rules.coef + rules.marge(type_piece, categorie))
+
+
+# ─── CALCUL EN MASSE ────────────────────────────────────────
+
+def prix_clients(prix_ht, types_piece, categories, rules: PricingRules = None) -> list:
+    """Prix client d'une série de pièces (mêmes résultats que calcul_prix_client).
+
+    Les marges sont résolues une fois par couple (type, catégorie), puis
+    le calcul et l'arrondi au 9 sont vectorisés avec NumPy s'il est
+    installé.
+    """
+    rules = rules or current_rules()
+    marges_cache = {}
+    marges = []
+    for type_piece, categorie in zip(types_piece, categories):
+        key = (type_piece, categorie)
+        if key not in marges_cache:
+            marges_cache[key] = rules.marge(type_piece, categorie)
+        marges.append(marges_cache[key])
+
+    if np is None:
+        return [arrondi_9(float(p) * rules.coef + m) for p, m in zip(prix_ht, marges)]
+
+    # np.round arrondit au pair comme round() : résultats identiques
+    p = np.round(np.asarray(prix_ht, dtype=np.float64) * rules.coef
+                 + np.asarray(marges, dtype=np.float64)).astype(np.int64)
+    last = p % 10
+    result = np.where(last == 9, p, np.where(last <= 1, p - last - 1, p + (9 - last)))
+    result = np.where(p <= 0, 9, result)
+    return result.tolist()
+
+
+# Un seul UPDATE : l'auto-jointure sur `old` donne les prix d'avant pour l'historique
+REPRICE_SQL = """
+WITH v AS (
+    SELECT unnest(%(ids)s::int[]) AS id, unnest(%(prix)s::int[]) AS prix_client
+),
+upd AS (
+    UPDATE tarifs t SET prix_client = v.prix_client, updated_at = NOW()
+    FROM v JOIN tarifs old ON old.id = v.id
+    WHERE t.id = v.id AND t.prix_client IS DISTINCT FROM v.prix_client
+    RETURNING t.marque, t.modele, t.type_piece, t.qualite, t.prix_fournisseur_ht,
+              old.prix_client AS ancien_prix_client, v.prix_client AS nouveau_prix_client
+)
+INSERT INTO tarifs_history
+    (marque, modele, type_piece, qualite,
+     ancien_prix_fournisseur_ht, nouveau_prix_fournisseur_ht,
+     ancien_prix_client, nouveau_prix_client)
+SELECT marque, modele, type_piece, COALESCE(qualite, ''),
+       prix_fournisseur_ht, prix_fournisseur_ht,
+       ancien_prix_client, nouveau_prix_client
+FROM upd
+"""
+
+
+def reprice_tarifs(rules: PricingRules = None, dry_run: bool = False) -> dict:
+    """Recalcule le prix client de tous les tarifs ayant un prix fournisseur.
+
+    Retourne {"rows", "updated", "unchanged", "seconds", "rules"} ;
+    `dry_run` compte les changements sans rien écrire.
+    """
+    start = time.perf_counter()
+    rules = rules or current_rules()
+    with get_sync_cursor() as cur:
+        # Pas d'import concurrent pendant le recalcul ; les lectures continuent
+        cur.execute("LOCK TABLE tarifs IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute("""
+            SELECT id, prix_fournisseur_ht, type_piece, categorie, prix_client
+            FROM tarifs WHERE prix_fournisseur_ht IS NOT NULL
+        """)
+        rows = cur.fetchall()
+        new_prices = prix_clients(
+            [r["prix_fournisseur_ht"] for r in rows],
+            [r["type_piece"] for r in rows],
+            [r["categorie"] or "standard" for r in rows],
+            rules,
+        )
+        changed = [(r["id"], prix) for r, prix in zip(rows, new_prices) if r["prix_client"] != prix]
+        if changed and not dry_run:
+            cur.execute(REPRICE_SQL, {
+                "ids": [i for i, _ in changed],
+                "prix": [p for _, p in changed],
+            })
+
+    seconds = time.perf_counter() - start
+    report = {
+        "rows": len(rows),
+        "updated": len(changed),
+        "unchanged": len(rows) - len(changed),
+        "seconds": round(seconds, 3),
+        "rules": rules.as_dict(),
+    }
+    print(
+        f"[TARIFS] Recalcul{' (simulation)' if dry_run else ''}: {len(changed)} prix modifiés "
+        f"sur {len(rows)} en {seconds:.2f}s"
+    )
+    return report
@@ -0,0 +1,250 @@
+"""
+Moteur de devis : du modèle et de la panne d'un ticket aux tarifs.
+
+Les modèles du catalogue (`catalog_modeles`, saisis à l'accueil) ne
+s'écrivent pas comme ceux de la grille tarifaire, normalisés par le
+scraper : "Galaxy S21" d'un côté, "Samsung Galaxy S21 5G" de l'autre.
+Un index d'alias relie chaque modèle du catalogue aux modèles tarifés :
+
+    exact       même nom une fois passé par les NORMALIZERS du scraper
+    variante    même nom au 4G / 5G près
+    approchant  tous les mots du catalogue présents dans le modèle tarifé
+
+La panne est traduite en type de pièce par les règles de classification
+du scraper ("Écran casse" → Ecran). Un devis est alors une seule lecture
+dans l'index, classée par correspondance puis par prix.
+
+Mise à jour incrémentale :
+  - tarifs : à chaque nouvel index mémoire des tarifs, seules les marques
+    dont la liste de modèles a changé voient leurs alias recalculés ;
+  - catalogue : un trigger sur `catalog_modeles` (migrations 0009, 0015)
+    notifie chaque ajout / renommage / suppression (`catalog_changed`),
+    seul ce modèle est recalculé et l'alias de son ancien nom retiré.
+"""
+
+import json
+import re
+import threading
+from collections import defaultdict
+
+from app.database import get_sync_cursor, run_in_db_thread
+from app.services.pg_listener import get_listener
+from app.services.scraper_mobilax import NORMALIZERS, classify_piece
+from app.services.tarif_index import fold
+from app.services.tarif_index import index as tarif_index
+
+CHANNEL = "catalog_changed"
+MATCH_LABELS = ("exact", "variante", "approchant")
+# Modèles "approchants" gardés par modèle du catalogue
+MAX_APPROX = 5
+
+_TOKEN_RE = re.compile(r"[a-z0-9+]+")
+_NETWORK_TOKENS = frozenset(["4g", "5g"])
+_PANNE_SPLIT_RE = re.compile(r"\s*[,+/]\s*")
+
+
+def _tokens(name) -> tuple:
+    return tuple(_TOKEN_RE.findall(fold(name)))
+
+
+def _variant_key(name) -> str:
+    """Nom comparable au 4G / 5G près."""
+    return " ".join(t for t in _tokens(name) if t not in _NETWORK_TOKENS)
+
+
+def pieces_for_panne(panne, detail=None) -> list:
+    """Types de pièce tarifés correspondant à une panne (dans l'ordre de saisie)."""
+    pieces = []
+    for part in _PANNE_SPLIT_RE.split(panne or ""):
+        piece = classify_piece(part) if part else None
+        if piece and piece not in pieces:
+            pieces.append(piece)
+    if not pieces and detail:
+        piece = classify_piece(detail)
+        if piece:
+            pieces.append(piece)
+    return pieces
+
+
+class _BrandModels:
+    """Modèles tarifés d'une marque, indexés pour la résolution d'alias."""
+
+    def __init__(self, models):
+        self.models = frozenset(models)
+        self.by_name = {fold(m): m for m in self.models}
+        self.by_variant = defaultdict(list)
+        self.tokens = {}
+        for model in sorted(self.models):
+            self.by_variant[_variant_key(model)].append(model)
+            self.tokens[model] = frozenset(_tokens(model))
+
+    def resolve(self, marque, modele) -> tuple:
+        """((modèle tarifé, rang de correspondance), ...) du meilleur au moins bon."""
+        candidates = [f"{marque} {modele}", modele]
+        normalizer = NORMALIZERS.get(marque.strip().title())
+        if normalizer is not None:
+            normalized = normalizer(f"{marque} {modele}") or normalizer(modele)
+            if normalized:
+                candidates.insert(0, normalized)
+
+        for name in candidates:
+            model = self.by_name.get(fold(name))
+            if model:
+                return ((model, 0),)
+        for name in candidates:
+            variants = self.by_variant.get(_variant_key(name))
+            if variants:
+                return tuple((m, 1) for m in variants)
+
+        wanted = frozenset(_tokens(modele)) - frozenset(_tokens(marque)) - _NETWORK_TOKENS
+        if not wanted:
+            return ()
+        approx = sorted(
+            (len(tokens - wanted), model)
+            for model, tokens in self.tokens.items() if wanted <= tokens
+        )
+        return tuple((model, 2) for _, model in approx[:MAX_APPROX])
+
+
+class QuoteIndex:
+    """Alias catalogue → modèles tarifés, et tarifs par (modèle, pièce)."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tarifs = None          # instantané TarifIndex de référence
+        self._brands = {}            # marque (pliée) → _BrandModels
+        self._rows = {}              # (modèle, type de pièce) → tarifs triés par prix
+        self._catalog = None         # marque (pliée) → {(marque, modele)}
+        self._aliases = {}           # (marque, modele) → ((modèle tarifé, rang), ...)
+
+    # ─── SYNCHRONISATION ────────────────────────────────────
+
+    def _sync_tarifs(self, snapshot):
+        """Prend en compte un nouvel instantané des tarifs (marques modifiées seulement)."""
+        by_brand = defaultdict(set)
+        rows = defaultdict(list)
+        for row in snapshot.rows:
+            by_brand[fold(row["marque"])].add(row["modele"])
+            rows[(row["modele"], row["type_piece"])].append(row)
+        for options in rows.values():
+            options.sort(key=lambda r: (r["prix_client"] is None, r["prix_client"] or 0))
+
+        changed = {
+            brand for brand in set(by_brand) | set(self._brands)
+            if brand not in self._brands or self._brands[brand].models != by_brand.get(brand)
+        }
+        for brand in changed:
+            if brand in by_brand:
+                self._brands[brand] = _BrandModels(by_brand[brand])
+            else:
+                self._brands.pop(brand, None)
+            for entry in self._catalog.get(brand, ()):
+                self._aliases[entry] = self._resolve(*entry)
+        self._rows = dict(rows)
+        self._tarifs = snapshot
+        if changed:
+            print(f"[DEVIS] Alias recalculés pour {len(changed)} marque(s)")
+
+    def _load_catalog(self):
+        with get_sync_cursor() as cur:
+            cur.execute("SELECT to_regclass('catalog_modeles') IS NOT NULL AS ok")
+            if cur.fetchone()["ok"]:
+                cur.execute("SELECT DISTINCT marque, modele FROM catalog_modeles")
+                entries = [(r["marque"] or "", r["modele"] or "") for r in cur.fetchall()]
+            else:
+                entries = []
+        catalog = defaultdict(set)
+        for entry in entries:
+            catalog[fold(entry[0])].add(entry)
+        self._catalog = catalog
+        self._aliases = {entry: self._resolve(*entry) for entry in entries}
+
+    def _resolve(self, marque, modele) -> tuple:
+        brand = self._brands.get(fold(marque))
+        if brand is None or not modele:
+            return ()
+        return brand.resolve(marque, modele)
+
+    def refresh(self):
+        """Met l'index à jour (bloquant : lit la base au premier appel)."""
+        snapshot = tarif_index.get()
+        with self._lock:
+            if self._catalog is None:
+                self._tarifs = None
+                self._brands = {}
+                self._catalog = {}
+                self._sync_tarifs(snapshot)
+                self._load_catalog()
+            elif snapshot is not self._tarifs:
+                self._sync_tarifs(snapshot)
+
+    def _on_catalog(self, channel, payload):
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            return
+        entry = (change.get("marque") or "", change.get("modele") or "")
+        ancien = change.get("ancien")
+        with self._lock:
+            if self._catalog is None:
+                return
+            if ancien is None and change.get("op") == "DELETE":
+                ancien = {"marque": entry[0], "modele": entry[1]}  # notification d'avant 0015
+            if ancien and not ancien.get("reste"):
+                old = (ancien.get("marque") or "", ancien.get("modele") or "")
+                self._catalog.get(fold(old[0]), set()).discard(old)
+                self._aliases.pop(old, None)
+            if change.get("op") != "DELETE":
+                self._catalog.setdefault(fold(entry[0]), set()).add(entry)
+                self._aliases[entry] = self._resolve(*entry)
+
+    def _on_reconnect(self):
+        # Des ajouts au catalogue ont pu être manqués : rechargement au prochain devis
+        with self._lock:
+            self._catalog = None
+
+    def start(self):
+        """Abonne l'index aux notifications catalog_changed du listener."""
+        listener = get_listener()
+        listener.subscribe(CHANNEL, self._on_catalog)
+        listener.on_reconnect(self._on_reconnect)
+
+    # ─── DEVIS ──────────────────────────────────────────────
+
+    def aliases(self, marque, modele) -> tuple:
+        with self._lock:
+            found = self._aliases.get((marque or "", modele or ""))
+            return found if found is not None else self._resolve(marque or "", modele or "")
+
+    def quote(self, marque, modele, panne, panne_detail=None) -> dict:
+        """Options de prix classées (correspondance du modèle, ordre des pannes, prix)."""
+        pieces = pieces_for_panne(panne, panne_detail)
+        with self._lock:
+            models = self.aliases(marque, modele)
+            options = []
+            for model, rank in models:
+                for piece_rank, piece in enumerate(pieces):
+                    for row in self._rows.get((model, piece), ()):
+                        options.append(((rank, piece_rank), {
+                            "tarif_id": row["id"],
+                            "marque": row["marque"],
+                            "modele": model,
+                            "type_piece": piece,
+                            "qualite": row["qualite"] or "",
+                            "prix_client": row["prix_client"],
+                            "prix_fournisseur_ht": row["prix_fournisseur_ht"],
+                            "correspondance": MATCH_LABELS[rank],
+                        }))
+        options.sort(key=lambda o: o[0])  # tri stable : prix croissant par groupe
+        return {
+            "pieces": pieces,
+            "modeles": [{"modele": m, "correspondance": MATCH_LABELS[r]} for m, r in models],
+            "options": [o for _, o in options],
+        }
+
+    async def aquote(self, marque, modele, panne, panne_detail=None) -> dict:
+        await run_in_db_thread(self.refresh)
+        return self.quote(marque, modele, panne, panne_detail)
+
+
+quotes = QuoteIndex()
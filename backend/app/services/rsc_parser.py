@@ -0,0 +1,155 @@
+"""
+Lecture incrémentale du flux RSC (React Server Components) des pages Next.js.
+
+Une page Mobilax embarque ses données dans des scripts
+`self.__next_f.push([1,"<fragment>"])` : chaque fragment est une chaîne JSON
+échappée, et leur concaténation forme le flux "flight", une ligne par
+enregistrement (`<id hex>:<JSON>`). Le parseur :
+
+    1. repère les appels push au fil du texte reçu et décode leur chaîne ;
+    2. recolle les fragments et découpe le flux en lignes complètes ;
+    3. décode chaque ligne JSON et y cherche les produits (objets ayant
+       `id`, `name` et une grille `prices` avec le palier Bronze),
+       quel que soit l'ordre de leurs champs.
+
+Les produits sont rendus au fur et à mesure : la page n'est jamais
+reconstituée en une seule chaîne.
+
+Usage:
+    parser = RscFlightParser()
+    for chunk in chunks:
+        for product in parser.feed(chunk):
+            ...
+    products = parser.close()
+"""
+
+import json
+import re
+
+PUSH_MARKER = "self.__next_f.push("
+# Palier de prix retenu comme prix fournisseur HT
+PRICE_TIER = "Bronze"
+
+_ROW_RE = re.compile(r"^[0-9a-fA-F]+:")
+_decoder = json.JSONDecoder()
+
+
+class RscFlightParser:
+    """Parseur à alimenter par morceaux de texte HTML (`feed`, puis `close`)."""
+
+    def __init__(self):
+        self._html = ""
+        self._flight = ""
+        self.total = None
+
+    # ─── HTML → FRAGMENTS FLIGHT ────────────────────────────
+
+    def _next_fragment(self):
+        """Décode le prochain appel push complet du tampon HTML, ou None."""
+        start = self._html.find(PUSH_MARKER)
+        if start < 0:
+            # Garder de quoi reconnaître un marqueur coupé en deux
+            self._html = self._html[-len(PUSH_MARKER):]
+            return None
+        begin = start + len(PUSH_MARKER)
+        try:
+            args, end = _decoder.raw_decode(self._html, begin)
+        except ValueError:
+            end_script = self._html.find("</script>", begin)
+            if end_script < 0:
+                self._html = self._html[start:]  # appel incomplet : attendre la suite
+                return None
+            self._html = self._html[end_script:]  # appel illisible : on l'ignore
+            return ""
+        self._html = self._html[end:]
+        if isinstance(args, list) and len(args) > 1 and args[0] == 1 and isinstance(args[1], str):
+            return args[1]
+        return ""
+
+    # ─── FLIGHT → PRODUITS ──────────────────────────────────
+
+    def _walk(self, value, found):
+        """Parcours en profondeur, dans l'ordre du document."""
+        if isinstance(value, dict):
+            product = _as_product(value)
+            if product is not None:
+                found.append(product)
+                return
+            if self.total is None and isinstance(value.get("total"), int):
+                self.total = value["total"]
+            for v in value.values():
+                if isinstance(v, (dict, list)):
+                    self._walk(v, found)
+        elif isinstance(value, list):
+            for v in value:
+                if isinstance(v, (dict, list)):
+                    self._walk(v, found)
+
+    def _parse_row(self, line, found):
+        m = _ROW_RE.match(line)
+        if not m:
+            return
+        payload = line[m.end():]
+        if not payload or payload[0] not in "[{":
+            return  # lignes texte (T...), imports (I[...]), hints (HL[...])
+        try:
+            value = json.loads(payload)
+        except ValueError:
+            return
+        self._walk(value, found)
+
+    def _drain_rows(self, found, final=False):
+        *complete, self._flight = self._flight.split("\n")
+        for line in complete:
+            self._parse_row(line, found)
+        if final and self._flight:
+            self._parse_row(self._flight, found)
+            self._flight = ""
+
+    # ─── API ────────────────────────────────────────────────
+
+    def feed(self, chunk: str) -> list:
+        """Ajoute un morceau de page ; retourne les produits complétés."""
+        found = []
+        self._html += chunk
+        while True:
+            fragment = self._next_fragment()
+            if fragment is None:
+                break
+            if fragment:
+                self._flight += fragment
+                if "\n" in fragment:
+                    self._drain_rows(found)
+        return found
+
+    def close(self) -> list:
+        """Fin de page : traite la dernière ligne du flux."""
+        found = []
+        self._drain_rows(found, final=True)
+        self._html = ""
+        return found
+
+
+def _as_product(obj: dict):
+    """{"id", "name", "price_ht"} si l'objet est un produit avec un prix Bronze."""
+    pid, name, prices = obj.get("id"), obj.get("name"), obj.get("prices")
+    if not isinstance(pid, int) or isinstance(pid, bool) or not isinstance(name, str):
+        return None
+    if not isinstance(prices, list):
+        return None
+    for tier in prices:
+        if isinstance(tier, dict) and tier.get("name") == PRICE_TIER:
+            price = tier.get("price")
+            if isinstance(price, (int, float)) and not isinstance(price, bool):
+                return {"id": pid, "name": name, "price_ht": float(price)}
+    return None
+
+
+def parse_products(chunks) -> tuple:
+    """Parse une page entière (itérable de morceaux). Retourne (produits, total)."""
+    parser = RscFlightParser()
+    products = []
+    for chunk in chunks:
+        products.extend(parser.feed(chunk))
+    products.extend(parser.close())
+    return products, parser.total
@@ -0,0 +1,267 @@
+"""
+Jobs de mise à jour des tarifs (scraping Mobilax).
+
+Un seul scraping à la fois, tous workers confondus : le job tient un verrou
+consultatif PostgreSQL (`pg_try_advisory_lock`) sur une connexion dédiée
+pendant toute son exécution. Un second clic renvoie le job déjà en cours.
+
+Chaque job est une ligne de `scrape_jobs` (qui sert aussi d'historique) :
+
+    status     queued → running → finished | failed | cancelled
+    progress   par marque : statut, pages faites / total, produits, tarifs
+    summary    compteurs du run (pages, tarifs ajoutés / modifiés / ...)
+
+La progression est écrite en base au plus toutes les PROGRESS_INTERVAL
+secondes ; la même écriture relit `cancel_requested`, posé par l'endpoint
+d'annulation depuis n'importe quel worker.
+
+Le même thread vérifie la connexion du verrou toutes les LOCK_CHECK_INTERVAL
+secondes : si elle est tombée (le verrou est alors libéré côté serveur), il
+le reprend sur une nouvelle connexion, ou arrête le job si un autre worker
+l'a pris entre-temps.
+"""
+
+import os
+import threading
+import time
+
+import psycopg2
+from psycopg2.extras import Json
+
+from app.database import get_sync_cursor, with_sslmode
+
+# Clé du verrou consultatif "scraping tarifs" (arbitraire, propre à l'app)
+LOCK_KEY = 7_310_001
+PROGRESS_INTERVAL = 1.0
+LOCK_CHECK_INTERVAL = 10.0
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+JOB_COLUMNS = """
+    id, status, replay, requested_by, progress, summary, error, cancel_requested,
+    created_at, started_at, finished_at, duration_s
+"""
+
+
+def get_job(job_id: int):
+    with get_sync_cursor() as cur:
+        cur.execute(f"SELECT {JOB_COLUMNS} FROM scrape_jobs WHERE id = %s", (job_id,))
+        return cur.fetchone()
+
+
+def list_jobs(limit: int = 20):
+    with get_sync_cursor() as cur:
+        cur.execute(
+            f"SELECT {JOB_COLUMNS} FROM scrape_jobs ORDER BY created_at DESC, id DESC LIMIT %s",
+            (limit,),
+        )
+        return cur.fetchall()
+
+
+def request_cancel(job_id: int):
+    """Demande l'arrêt d'un job actif. Retourne le job (None s'il n'existe pas)."""
+    with get_sync_cursor() as cur:
+        cur.execute(
+            f"""UPDATE scrape_jobs SET cancel_requested = TRUE
+                WHERE id = %s AND status IN %s
+                RETURNING {JOB_COLUMNS}""",
+            (job_id, ACTIVE_STATUSES),
+        )
+        row = cur.fetchone()
+    return row or get_job(job_id)
+
+
+class _JobRunner:
+    """Exécute un job dans un thread, avec son verrou et sa progression."""
+
+    def __init__(self, job_id: int, lock_conn, replay: bool):
+        self.job_id = job_id
+        self.replay = replay
+        self._lock_conn = lock_conn
+        self._progress = {}
+        self._progress_lock = threading.Lock()
+        self._done = threading.Event()
+        self._lock_error = None
+        self.cancel = threading.Event()
+
+    def report(self, brand, **fields):
+        """Callback de progression du scraper (thread asyncio du scraping)."""
+        with self._progress_lock:
+            self._progress.setdefault(brand, {}).update(fields)
+
+    def _snapshot(self):
+        with self._progress_lock:
+            return {brand: dict(fields) for brand, fields in self._progress.items()}
+
+    def _flush(self):
+        with get_sync_cursor() as cur:
+            cur.execute(
+                """UPDATE scrape_jobs SET progress = %s WHERE id = %s
+                   RETURNING cancel_requested""",
+                (Json(self._snapshot()), self.job_id),
+            )
+            row = cur.fetchone()
+        if row and row["cancel_requested"]:
+            self.cancel.set()
+
+    def _check_lock(self):
+        """Vérifie la connexion du verrou ; la remplace si elle est tombée."""
+        try:
+            with self._lock_conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return
+        except psycopg2.Error as e:
+            print(f"[JOBS] Connexion du verrou perdue (job #{self.job_id}): {e}")
+        self._lock_conn.close()
+        try:
+            conn = _lock_connection()
+        except (psycopg2.Error, RuntimeError) as e:
+            self._abort(f"Verrou perdu, reconnexion impossible: {e}")
+            return
+        self._lock_conn = conn
+        if not _try_lock(conn):
+            self._abort("Verrou perdu : un autre scraping a démarré")
+            return
+        print(f"[JOBS] Verrou repris pour le job #{self.job_id}")
+
+    def _abort(self, reason):
+        self._lock_error = reason
+        self.cancel.set()
+
+    def _watch(self):
+        last_check = time.monotonic()
+        while not self._done.wait(PROGRESS_INTERVAL):
+            try:
+                self._flush()
+            except psycopg2.Error as e:
+                print(f"[JOBS] Progression du job #{self.job_id} non enregistrée: {e}")
+            if self._lock_error is None and time.monotonic() - last_check >= LOCK_CHECK_INTERVAL:
+                self._check_lock()
+                last_check = time.monotonic()
+
+    def _finish(self, status, summary=None, error=None):
+        with get_sync_cursor() as cur:
+            cur.execute("""
+                UPDATE scrape_jobs SET
+                    status = %s, summary = %s, error = %s, progress = %s,
+                    finished_at = NOW(),
+                    duration_s = EXTRACT(EPOCH FROM NOW() - started_at)
+                WHERE id = %s
+            """, (status, Json(summary) if summary else None, error,
+                  Json(self._snapshot()), self.job_id))
+
+    def run(self):
+        from app.services.scraper_mobilax import ScrapeCancelled, scrape_and_update
+
+        start = time.time()
+        watcher = threading.Thread(target=self._watch, name=f"scrape-job-{self.job_id}-progress", daemon=True)
+        try:
+            with get_sync_cursor() as cur:
+                cur.execute(
+                    "UPDATE scrape_jobs SET status = 'running', started_at = NOW() WHERE id = %s",
+                    (self.job_id,),
+                )
+            watcher.start()
+            summary = scrape_and_update(replay=self.replay, progress=self.report, cancel=self.cancel)
+            self._done.set()
+            self._finish("finished", summary=summary)
+            print(f"[JOBS] Job #{self.job_id} terminé en {time.time() - start:.1f}s")
+        except ScrapeCancelled:
+            self._done.set()
+            if self._lock_error:
+                self._finish("failed", error=self._lock_error)
+                print(f"[JOBS] Job #{self.job_id} arrêté: {self._lock_error}")
+            else:
+                self._finish("cancelled")
+                print(f"[JOBS] Job #{self.job_id} annulé")
+        except Exception as e:
+            self._done.set()
+            print(f"[JOBS] Job #{self.job_id} en échec: {e}")
+            try:
+                self._finish("failed", error=str(e))
+            except psycopg2.Error as db_error:
+                print(f"[JOBS] Statut du job #{self.job_id} non enregistré: {db_error}")
+        finally:
+            self._done.set()
+            if watcher.is_alive():
+                watcher.join()
+            self._release()
+
+    def _release(self):
+        if self._lock_conn.closed:
+            return
+        try:
+            with self._lock_conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+        except psycopg2.Error:
+            pass  # la fermeture de la connexion libère aussi le verrou
+        finally:
+            self._lock_conn.close()
+
+
+def _lock_connection():
+    # Verrou de session : comme LISTEN, il faut une connexion directe (pas PgBouncer)
+    dsn = os.getenv("DATABASE_LISTEN_URL") or os.getenv("DATABASE_URL")
+    if not dsn:
+        raise RuntimeError("DATABASE_URL non définie")
+    conn = psycopg2.connect(
+        with_sslmode(dsn),
+        connect_timeout=10,
+        # Keepalives TCP : une connexion coupée (et son verrou perdu) se voit vite
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=3,
+    )
+    conn.autocommit = True
+    return conn
+
+
+def _try_lock(conn) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (LOCK_KEY,))
+        return cur.fetchone()[0]
+
+
+def start_job(replay: bool = False, requested_by: str = "") -> tuple:
+    """Lance un scraping, ou renvoie celui déjà en cours.
+
+    Retourne (job, créé). Appel bloquant (à passer par run_in_db_thread).
+    """
+    conn = _lock_connection()
+    try:
+        if not _try_lock(conn):
+            conn.close()
+            with get_sync_cursor() as cur:
+                cur.execute(
+                    f"""SELECT {JOB_COLUMNS} FROM scrape_jobs
+                        WHERE status IN %s ORDER BY id DESC LIMIT 1""",
+                    (ACTIVE_STATUSES,),
+                )
+                return cur.fetchone(), False
+
+        with get_sync_cursor() as cur:
+            # Verrou libre : un job "actif" restant vient d'un worker arrêté en route
+            cur.execute(
+                """UPDATE scrape_jobs
+                   SET status = 'failed', error = 'Interrompu (arrêt du serveur)',
+                       finished_at = NOW()
+                   WHERE status IN %s""",
+                (ACTIVE_STATUSES,),
+            )
+            cur.execute(
+                f"""INSERT INTO scrape_jobs (status, replay, requested_by)
+                    VALUES ('queued', %s, %s)
+                    RETURNING {JOB_COLUMNS}""",
+                (replay, requested_by),
+            )
+            job = cur.fetchone()
+    except Exception:
+        conn.close()
+        raise
+
+    runner = _JobRunner(job["id"], conn, replay)
+    threading.Thread(target=runner.run, name=f"scrape-job-{job['id']}", daemon=True).start()
+    print(f"[JOBS] Job #{job['id']} lancé{' (replay)' if replay else ''} par {requested_by or '?'}")
+    return job, True
@@ -4,16 +4,26 @@ Récupère les prix des pièces détachées (écrans, batteries, connecteurs)
 pour Samsung, Google, Xiaomi, Huawei, Motorola.
 """
 
+import asyncio
+import multiprocessing
+import os
 import re
+import sys
 import math
 import json
+import random
+import threading
 import time
-from datetime import datetime
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
 
 import httpx
 
-from app.database import get_cursor
+from app.services.page_cache import PageCache
+from app.services.pricing import calcul_prix_client, current_rules
+from app.services.rsc_parser import parse_products
+from app.services.tarif_loader import TarifLoadError, load_tarifs
 
 
 # ─── CONFIG ─────────────────────────────────────────────────
@@ -27,6 +37,42 @@ BRANDS_SLUGS = {
     "Motorola": "motorola",
 }
 
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+
+# Requêtes en vol : au total, et par hôte
+SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", "8"))
+SCRAPER_PER_HOST = int(os.getenv("SCRAPER_PER_HOST", "4"))
+PAGE_TIMEOUT = 30.0
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 20.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Produits par page de résultats Mobilax
+PER_PAGE = 50
+# Processus de classification des noms produits (0 : dans le process courant)
+SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", str(min(4, (os.cpu_count() or 1) - 1))))
+# Produits envoyés par lot aux processus de classification
+CLASSIFY_CHUNK = 2000
+
+# À incrémenter quand le parseur RSC change : invalide les pages déjà
+# parsées du cache disque
+PARSER_VERSION = 2
+
+try:
+    import h2  # noqa: F401  (HTTP/2 pour httpx)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+try:
+    import resource  # mesure du pic mémoire (Unix)
+except ImportError:
+    resource = None
+
 # Modèles haut de gamme (marge 70€ au lieu de 60€)
 HAUT_DE_GAMME_PATTERNS = [
     r"Galaxy\s+S2[0-9]", r"Galaxy\s+Note\s*(1[0-9]|2[0-9])",
@@ -45,231 +91,214 @@ PLIANT_PATTERNS = [
     r"Razr\s+\d+",
 ]
 
+# Taille des caches de mémoïsation (noms produits / modèles distincts)
+RULES_CACHE_SIZE = 65536
+
+
+def _any_of(patterns):
+    """Une seule regex compilée équivalente à "une des regex matche"."""
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
 
-# ─── PRIX ────────────────────────────────────────────────────
 
-def arrondi_9(prix):
-    """Arrondi à 9 : dernier chiffre 0-1→9 inf, 2-9→9 sup."""
-    p = round(prix)
-    if p <= 0:
-        return 9
-    last = p % 10
-    if last == 9:
-        return p
-    elif last <= 1:
-        return p - last - 1
-    else:
-        return p + (9 - last)
+_PLIANT_RE = _any_of(PLIANT_PATTERNS)
+_HAUT_DE_GAMME_RE = _any_of(HAUT_DE_GAMME_PATTERNS)
 
 
+# ─── PRIX ────────────────────────────────────────────────────
+
+@lru_cache(maxsize=RULES_CACHE_SIZE)
 def detect_categorie(model_name):
     """Détecte si un modèle est pliant, haut de gamme, ou standard."""
-    for pat in PLIANT_PATTERNS:
-        if re.search(pat, model_name, re.IGNORECASE):
-            return "pliant"
-    for pat in HAUT_DE_GAMME_PATTERNS:
-        if re.search(pat, model_name, re.IGNORECASE):
-            return "haut_de_gamme"
+    if _PLIANT_RE.search(model_name):
+        return "pliant"
+    if _HAUT_DE_GAMME_RE.search(model_name):
+        return "haut_de_gamme"
     return "standard"
 
 
-def calcul_prix_client(prix_ht, type_piece, categorie="standard"):
-    base = prix_ht * 1.2
-    if type_piece.lower() in ["ecran", "écran"]:
-        if categorie == "pliant":
-            marge = 100
-        elif categorie == "haut_de_gamme":
-            marge = 70
-        else:
-            marge = 60
-    else:
-        marge = 60
-    return arrondi_9(base + marge)
+# ─── CLASSIFICATION ──────────────────────────────────────────
 
+# Règles évaluées dans l'ordre sur le nom en minuscules, la première qui
+# s'applique gagne : (un de ces mots, tous ces mots, aucun de ces mots, résultat)
+PIECE_RULES = (
+    (("ecran", "écran", "bloc écran", "lcd", "oled", "tactile"), (), (), "Ecran"),
+    (("batterie", "battery"), (), (), "Batterie"),
+    (("connecteur de charge", "connecteur charge"), (), (), "Connecteur de charge"),
+    (("camera arriere", "caméra arrière", "appareil photo"), (), (), "Camera arriere"),
+)
+
+QUALITY_RULES = (
+    (("original pulled", "piec"), (), (), "Original Pulled"),
+    (("assembled",), (), (), "Assembled"),
+    (("bloc écran complet",), ("original",), (), "Original (Bloc)"),
+    (("original",), (), (), "Original"),
+    (("soft oled",), (), (), "Soft OLED"),
+    (("hard oled",), (), (), "Hard OLED"),
+    (("oled",), (), ("incell",), "OLED"),
+    (("incell",), (), (), "Incell"),
+    (("cof",), (), (), "COF"),
+    (("cog",), (), (), "COG"),
+    (("tft",), (), (), "TFT"),
+    (("ips",), (), (), "IPS"),
+    (("lcd",), (), (), "LCD"),
+    (("premium",), (), (), "Premium"),
+    (("oem",), (), (), "OEM"),
+)
+
+
+def _first_rule(rules, name, default):
+    low = name.lower()
+    for any_of, all_of, none_of, result in rules:
+        if (any(w in low for w in any_of)
+                and all(w in low for w in all_of)
+                and not any(w in low for w in none_of)):
+            return result
+    return default
 
-# ─── CLASSIFICATION ──────────────────────────────────────────
 
+@lru_cache(maxsize=RULES_CACHE_SIZE)
 def classify_piece(name):
     """Classifie le type de pièce depuis le nom produit."""
-    low = name.lower()
-    if any(x in low for x in ["ecran", "écran", "bloc écran", "lcd", "oled", "tactile"]):
-        return "Ecran"
-    elif "batterie" in low or "battery" in low:
-        return "Batterie"
-    elif "connecteur de charge" in low or "connecteur charge" in low:
-        return "Connecteur de charge"
-    elif "camera arriere" in low or "caméra arrière" in low or "appareil photo" in low:
-        return "Camera arriere"
-    return None
+    return _first_rule(PIECE_RULES, name, None)
 
 
+@lru_cache(maxsize=RULES_CACHE_SIZE)
 def extract_quality(name):
     """Extrait la qualité d'un écran depuis le nom produit."""
-    low = name.lower()
-    if "original pulled" in low or "piec" in low:
-        return "Original Pulled"
-    elif "assembled" in low:
-        return "Assembled"
-    elif "bloc écran complet" in low and "original" in low:
-        return "Original (Bloc)"
-    elif "original" in low:
-        return "Original"
-    elif "soft oled" in low:
-        return "Soft OLED"
-    elif "hard oled" in low:
-        return "Hard OLED"
-    elif "oled" in low and "incell" not in low:
-        return "OLED"
-    elif "incell" in low:
-        return "Incell"
-    elif "cof" in low:
-        return "COF"
-    elif "cog" in low:
-        return "COG"
-    elif "tft" in low:
-        return "TFT"
-    elif "ips" in low:
-        return "IPS"
-    elif "lcd" in low:
-        return "LCD"
-    elif "premium" in low:
-        return "Premium"
-    elif "oem" in low:
-        return "OEM"
-    return "Standard"
+    return _first_rule(QUALITY_RULES, name, "Standard")
 
 
 # ─── MODEL NORMALIZATION ────────────────────────────────────
 
-def normalize_samsung(name):
-    cleaned = re.sub(
-        r"\s+(?:Noir|Blanc|Bleu|Rouge|Vert|Rose|Gris|Argent|Or|Violet|Jaune|Orange|"
-        r"Cream|Lavande|Graphite|Phantom|Burgundy|Berry|Clair|Nuit|Eclipse|Lime|"
-        r"Corail|Lilas|Sauge|Bronze)(?:\s.*)?$", "", name
-    )
-    cleaned = re.sub(r"\s+(?:GH\d{2}-\d+\w?\s*)+", " ", cleaned)
-    cleaned = re.sub(r"\s+SM-\w+", "", cleaned)
-    cleaned = re.sub(r"\s+[A-Z]\d{3}[A-Z]?\s*(?:/.*)?$", "", cleaned)
-    cleaned = re.sub(r"\s+EB-\w+", "", cleaned)
-    cleaned = re.sub(r"\s+HQ-\w+", "", cleaned)
-
-    patterns = [
-        r"(Galaxy\s+Z\s+(?:Flip|Fold)\s*\d+\s*(?:5G)?(?:\s+(?:Ultra|FE))?)",
-        r"(Galaxy\s+S\d+\s*(?:Ultra|Plus|\+|FE|Lite|5G)*)",
-        r"(Galaxy\s+A\d+\s*(?:s|e)?\s*(?:5G|4G)*)",
-        r"(Galaxy\s+M\d+\s*(?:s)?)",
-        r"(Galaxy\s+Note\s*\d+\s*(?:Ultra|Plus|\+|Lite|5G|FE)*)",
-        r"(Galaxy\s+XCover\s*\d+\s*(?:Pro|s)?)",
-        r"(Galaxy\s+Tab\s+\w+\s*\d*)",
-    ]
-    for pat in patterns:
-        m = re.search(pat, cleaned, re.IGNORECASE)
-        if m:
-            return "Samsung " + re.sub(r"\s+", " ", m.group(1).strip())
-    return None
-
-
-def normalize_google(name):
-    cleaned = re.sub(r"\s+G\d{3}[\w-]*", "", name)
-    cleaned = re.sub(r"\s+\d{10,}\w*", "", cleaned)
-    m = re.search(r"(Pixel\s+\d+\s*(?:Pro\s*(?:XL|Fold)?|a\s*(?:5G)?|XL)?)", cleaned, re.IGNORECASE)
-    if m:
-        return "Google " + m.group(1).strip()
-    return None
-
-
-def normalize_xiaomi(name):
-    cleaned = re.sub(r"\s+\d{10,}\w*", "", name)
-    cleaned = re.sub(r"\s+BM\w+", "", cleaned)
-    cleaned = re.sub(r"\s+BLP\w+", "", cleaned)
-    cleaned = re.sub(r"\s+BN\d+\w*", "", cleaned)
-    cleaned = re.sub(
-        r"\s+(?:Noir|Blanc|Bleu|Rouge|Vert|Rose|Gris|Argent|Or|Violet|Jaune|"
-        r"Orange|Azur|Perle|Nuit|Tarnish|Arctic|Global)(?:\s.*)?$", "", cleaned
-    )
+# Par marque :
+#   cleanup  (regex, remplacement) appliqués dans l'ordre (couleurs, références)
+#   models   regex du modèle (insensibles à la casse), la première qui matche gagne
+#   finish   mise en forme du groupe capturé
+BRAND_RULES = {
+    "Samsung": {
+        "cleanup": (
+            (r"\s+(?:Noir|Blanc|Bleu|Rouge|Vert|Rose|Gris|Argent|Or|Violet|Jaune|Orange|"
+             r"Cream|Lavande|Graphite|Phantom|Burgundy|Berry|Clair|Nuit|Eclipse|Lime|"
+             r"Corail|Lilas|Sauge|Bronze)(?:\s.*)?$", ""),
+            (r"\s+(?:GH\d{2}-\d+\w?\s*)+", " "),
+            (r"\s+SM-\w+", ""),
+            (r"\s+[A-Z]\d{3}[A-Z]?\s*(?:/.*)?$", ""),
+            (r"\s+EB-\w+", ""),
+            (r"\s+HQ-\w+", ""),
+        ),
+        "models": (
+            r"(Galaxy\s+Z\s+(?:Flip|Fold)\s*\d+\s*(?:5G)?(?:\s+(?:Ultra|FE))?)",
+            r"(Galaxy\s+S\d+\s*(?:Ultra|Plus|\+|FE|Lite|5G)*)",
+            r"(Galaxy\s+A\d+\s*(?:s|e)?\s*(?:5G|4G)*)",
+            r"(Galaxy\s+M\d+\s*(?:s)?)",
+            r"(Galaxy\s+Note\s*\d+\s*(?:Ultra|Plus|\+|Lite|5G|FE)*)",
+            r"(Galaxy\s+XCover\s*\d+\s*(?:Pro|s)?)",
+            r"(Galaxy\s+Tab\s+\w+\s*\d*)",
+        ),
+        "finish": lambda m: "Samsung " + re.sub(r"\s+", " ", m),
+    },
+    "Google": {
+        "cleanup": (
+            (r"\s+G\d{3}[\w-]*", ""),
+            (r"\s+\d{10,}\w*", ""),
+        ),
+        "models": (
+            r"(Pixel\s+\d+\s*(?:Pro\s*(?:XL|Fold)?|a\s*(?:5G)?|XL)?)",
+        ),
+        "finish": lambda m: "Google " + m,
+    },
+    "Xiaomi": {
+        "cleanup": (
+            (r"\s+\d{10,}\w*", ""),
+            (r"\s+BM\w+", ""),
+            (r"\s+BLP\w+", ""),
+            (r"\s+BN\d+\w*", ""),
+            (r"\s+(?:Noir|Blanc|Bleu|Rouge|Vert|Rose|Gris|Argent|Or|Violet|Jaune|"
+             r"Orange|Azur|Perle|Nuit|Tarnish|Arctic|Global)(?:\s.*)?$", ""),
+        ),
+        "models": (
+            r"(Redmi\s+Note\s+\d+\s*(?:Pro\s*(?:\+|Plus)?|S|T|R)?(?:\s+5G)?)",
+            r"(Redmi\s+(?:A\s*)?\d+\s*(?:A|C|Pro|Plus|Note|T)?(?:\s+5G)?)",
+            r"(Poco\s+[A-Z]\d+\s*(?:Pro|Plus|GT)?(?:\s+5G)?)",
+            r"(Poco\s+(?:M|F|C|X)\d+\s*(?:Pro|Plus|GT)?(?:\s+5G)?)",
+            r"(Xiaomi\s+\d+\s*(?:T\s*(?:Pro)?|Lite(?:\s+5G)?|Pro|Ultra|NE|5G)*)",
+            r"((?:Xiaomi\s+)?Mi\s+\d+\s*(?:T\s*(?:Pro)?|Lite(?:\s+5G)?|Pro|Ultra|5G|NE)*)",
+            r"((?:Xiaomi\s+)?Mi\s+Note\s+\d+\s*(?:Lite|Pro|5G)*)",
+            r"((?:Xiaomi\s+)?Mi\s+[A-Z]\d+\s*(?:Lite)?)",
+            r"((?:Xiaomi\s+)?Mi\s+Mix\s*\d*(?:\s+5G)?)",
+        ),
+        "finish": lambda m: m if m.startswith("Xiaomi") else "Xiaomi " + m,
+    },
+    "Huawei": {
+        "cleanup": (
+            (r"\s+02\d{3}\w+", ""),
+            (r"\s+\d{10,}\w*", ""),
+            (r"\s+HB\d+\w*", ""),
+            (r"\s+(?:Noir|Blanc|Bleu|Rouge|Vert|Rose|Gris|Argent|Or|Violet|Jaune|"
+             r"Orange|Star|Twilight|Aurora|Breathing|Midnight|Sakura|Phantom|Emerald)(?:\s.*)?$", ""),
+        ),
+        "models": (
+            r"((?:Huawei\s+)?P\s*\d+\s*(?:Pro\s*(?:\+|Plus)?|Lite)?)",
+            r"(Huawei\s+P\s+Smart\s*(?:\+|Plus|Z|S|2019|2020|2021)?)",
+            r"(Huawei\s+Mate\s+\d+\s*(?:Pro\s*(?:\+)?|Lite|X\s*(?:4G|5G)?|S|RS)?)",
+            r"(Huawei\s+Nova\s+\d+\s*(?:i|SE|T|Pro|Lite)?)",
+            r"(Huawei\s+Y\d+\s*(?:p|s|a|Prime|Pro)?(?:\s+\d{4})?)",
+            r"(Honor\s+\d+\s*(?:X|A|s|Lite|Pro)?)",
+            r"(Honor\s+(?:Magic|View|Play|X)\s*\d+\s*(?:Pro|Lite|5G|4G)?)",
+        ),
+        "finish": lambda m: (
+            "Huawei " + m if m.startswith("P") and not m.startswith(("Poco", "Pixel")) else m
+        ),
+    },
+    "Motorola": {
+        "cleanup": (
+            (r"\s+5[DP]\d{2}C\w*", ""),
+            (r"\s+XT\d+\w*", ""),
+            (r"\s+SB\d+\w*", ""),
+            (r"\s+\(\w+\)", ""),
+            (r"\s+(?:KG\d|JE\d|JK\d|KR\d|KS\d|KT\d|MT\d|ND\d|NE\d|NF\d|NG\d|"
+             r"NP\d|NQ\d|NR\d|NS\d|NT\d|PC\d|PG\d)\w*", ""),
+            (r"\s+(?:Noir|Blanc|Bleu|Rouge|Vert|Rose|Gris|Argent|Or|Violet|Jaune|"
+             r"Orange|Eclipse|Lunaire|Indigo|Mystic|Titanium|Nebula|Charcoal)(?:\s.*)?$", ""),
+        ),
+        "models": (
+            r"((?:Motorola\s+)?Edge\s+\d+\s*(?:Ultra|Pro|Neo|Lite|Fusion|Plus|5G)?)",
+            r"((?:Motorola\s+)?Razr\s+\d+\s*(?:Ultra|Plus)?)",
+            r"((?:Motorola\s+)?Moto\s+G\d+\s*(?:Plus|Play|Power|Fast|Stylus|Force|Pro|5G)?)",
+            r"((?:Motorola\s+)?Moto\s+G\s+(?:5G|Power|Play|Stylus|Fast|Pure|Pro)\s*\d*)",
+            r"((?:Motorola\s+)?Moto\s+E\d+\s*(?:i|s|Play|Plus|Power)?)",
+            r"((?:Motorola\s+)?Moto\s+(?:X|Z|One)\s*\d*\s*(?:Vision|Action|Macro|Zoom|Fusion|Hyper|Power|Play|Force|5G)?)",
+            r"((?:Motorola\s+)?(?:One|Defy|ThinkPhone)(?:\s+(?:Vision|Action|Macro|Zoom|Fusion|Hyper|Power|5G))?)",
+        ),
+        "finish": lambda m: m if m.startswith("Motorola") else "Motorola " + m,
+    },
+}
 
-    patterns = [
-        r"(Redmi\s+Note\s+\d+\s*(?:Pro\s*(?:\+|Plus)?|S|T|R)?(?:\s+5G)?)",
-        r"(Redmi\s+(?:A\s*)?\d+\s*(?:A|C|Pro|Plus|Note|T)?(?:\s+5G)?)",
-        r"(Poco\s+[A-Z]\d+\s*(?:Pro|Plus|GT)?(?:\s+5G)?)",
-        r"(Poco\s+(?:M|F|C|X)\d+\s*(?:Pro|Plus|GT)?(?:\s+5G)?)",
-        r"(Xiaomi\s+\d+\s*(?:T\s*(?:Pro)?|Lite(?:\s+5G)?|Pro|Ultra|NE|5G)*)",
-        r"((?:Xiaomi\s+)?Mi\s+\d+\s*(?:T\s*(?:Pro)?|Lite(?:\s+5G)?|Pro|Ultra|5G|NE)*)",
-        r"((?:Xiaomi\s+)?Mi\s+Note\s+\d+\s*(?:Lite|Pro|5G)*)",
-        r"((?:Xiaomi\s+)?Mi\s+[A-Z]\d+\s*(?:Lite)?)",
-        r"((?:Xiaomi\s+)?Mi\s+Mix\s*\d*(?:\s+5G)?)",
-    ]
-    for pat in patterns:
-        m = re.search(pat, cleaned, re.IGNORECASE)
-        if m:
-            model = m.group(1).strip()
-            if not model.startswith("Xiaomi"):
-                model = "Xiaomi " + model
-            return model
-    return None
-
-
-def normalize_huawei(name):
-    cleaned = re.sub(r"\s+02\d{3}\w+", "", name)
-    cleaned = re.sub(r"\s+\d{10,}\w*", "", cleaned)
-    cleaned = re.sub(r"\s+HB\d+\w*", "", cleaned)
-    cleaned = re.sub(
-        r"\s+(?:Noir|Blanc|Bleu|Rouge|Vert|Rose|Gris|Argent|Or|Violet|Jaune|"
-        r"Orange|Star|Twilight|Aurora|Breathing|Midnight|Sakura|Phantom|Emerald)(?:\s.*)?$",
-        "", cleaned,
-    )
-    patterns = [
-        r"((?:Huawei\s+)?P\s*\d+\s*(?:Pro\s*(?:\+|Plus)?|Lite)?)",
-        r"(Huawei\s+P\s+Smart\s*(?:\+|Plus|Z|S|2019|2020|2021)?)",
-        r"(Huawei\s+Mate\s+\d+\s*(?:Pro\s*(?:\+)?|Lite|X\s*(?:4G|5G)?|S|RS)?)",
-        r"(Huawei\s+Nova\s+\d+\s*(?:i|SE|T|Pro|Lite)?)",
-        r"(Huawei\s+Y\d+\s*(?:p|s|a|Prime|Pro)?(?:\s+\d{4})?)",
-        r"(Honor\s+\d+\s*(?:X|A|s|Lite|Pro)?)",
-        r"(Honor\s+(?:Magic|View|Play|X)\s*\d+\s*(?:Pro|Lite|5G|4G)?)",
-    ]
-    for pat in patterns:
-        m = re.search(pat, cleaned, re.IGNORECASE)
-        if m:
-            model = m.group(1).strip()
-            if model.startswith("P") and not model.startswith(("Poco", "Pixel")):
-                model = "Huawei " + model
-            return model
-    return None
-
-
-def normalize_motorola(name):
-    cleaned = re.sub(r"\s+5[DP]\d{2}C\w*", "", name)
-    cleaned = re.sub(r"\s+XT\d+\w*", "", cleaned)
-    cleaned = re.sub(r"\s+SB\d+\w*", "", cleaned)
-    cleaned = re.sub(r"\s+\(\w+\)", "", cleaned)
-    cleaned = re.sub(
-        r"\s+(?:KG\d|JE\d|JK\d|KR\d|KS\d|KT\d|MT\d|ND\d|NE\d|NF\d|NG\d|"
-        r"NP\d|NQ\d|NR\d|NS\d|NT\d|PC\d|PG\d)\w*", "", cleaned
-    )
-    cleaned = re.sub(
-        r"\s+(?:Noir|Blanc|Bleu|Rouge|Vert|Rose|Gris|Argent|Or|Violet|Jaune|"
-        r"Orange|Eclipse|Lunaire|Indigo|Mystic|Titanium|Nebula|Charcoal)(?:\s.*)?$",
-        "", cleaned,
-    )
-    patterns = [
-        r"((?:Motorola\s+)?Edge\s+\d+\s*(?:Ultra|Pro|Neo|Lite|Fusion|Plus|5G)?)",
-        r"((?:Motorola\s+)?Razr\s+\d+\s*(?:Ultra|Plus)?)",
-        r"((?:Motorola\s+)?Moto\s+G\d+\s*(?:Plus|Play|Power|Fast|Stylus|Force|Pro|5G)?)",
-        r"((?:Motorola\s+)?Moto\s+G\s+(?:5G|Power|Play|Stylus|Fast|Pure|Pro)\s*\d*)",
-        r"((?:Motorola\s+)?Moto\s+E\d+\s*(?:i|s|Play|Plus|Power)?)",
-        r"((?:Motorola\s+)?Moto\s+(?:X|Z|One)\s*\d*\s*(?:Vision|Action|Macro|Zoom|Fusion|Hyper|Power|Play|Force|5G)?)",
-        r"((?:Motorola\s+)?(?:One|Defy|ThinkPhone)(?:\s+(?:Vision|Action|Macro|Zoom|Fusion|Hyper|Power|5G))?)",
-    ]
-    for pat in patterns:
-        m = re.search(pat, cleaned, re.IGNORECASE)
-        if m:
-            model = m.group(1).strip()
-            if not model.startswith("Motorola"):
-                model = "Motorola " + model
-            return model
-    return None
+
+def _compile_normalizer(rules):
+    cleanup = tuple((re.compile(pat), repl) for pat, repl in rules["cleanup"])
+    models = tuple(re.compile(pat, re.IGNORECASE) for pat in rules["models"])
+    finish = rules["finish"]
+
+    @lru_cache(maxsize=RULES_CACHE_SIZE)
+    def normalize(name):
+        cleaned = name
+        for pattern, repl in cleanup:
+            cleaned = pattern.sub(repl, cleaned)
+        for pattern in models:
+            m = pattern.search(cleaned)
+            if m:
+                return finish(m.group(1).strip())
+        return None
+    return normalize
 
 
+normalize_samsung = _compile_normalizer(BRAND_RULES["Samsung"])
+normalize_google = _compile_normalizer(BRAND_RULES["Google"])
+normalize_xiaomi = _compile_normalizer(BRAND_RULES["Xiaomi"])
+normalize_huawei = _compile_normalizer(BRAND_RULES["Huawei"])
+normalize_motorola = _compile_normalizer(BRAND_RULES["Motorola"])
+
 NORMALIZERS = {
     "Samsung": normalize_samsung,
     "Google": normalize_google,
@@ -279,211 +308,546 @@ NORMALIZERS = {
 }
 
 
+# Modèles trop anciens (S6 et en-dessous...), testés sur le modèle en minuscules :
+# (regex, numéro capturé max ou None = toujours trop vieux, mots qui annulent la règle)
+TOO_OLD_RULES = {
+    "Samsung": (
+        (r"galaxy\s+s(\d+)", 6, ()),
+        (r"galaxy\s+j\d", None, ()),
+        (r"galaxy\s+note\s*(\d+)", 5, ()),
+    ),
+    "Google": (
+        (r"pixel\s+(\d+)", 2, ()),
+    ),
+    "Xiaomi": (
+        (r"(?:^|\s)mi\s+(\d+)\b", 5, ("note", "mix")),
+        (r"redmi\s+note\s+(\d+)", 4, ()),
+    ),
+    "Huawei": (
+        (r"\bp(\d+)\b", 8, ("smart",)),
+        (r"mate\s+(\d+)", 8, ()),
+    ),
+    "Motorola": (
+        (r"moto\s+g(\d+)", 4, ()),
+        (r"moto\s+[xz]", None, ()),
+    ),
+}
+
+_TOO_OLD_COMPILED = {
+    brand: tuple((re.compile(pat), max_num, unless) for pat, max_num, unless in rules)
+    for brand, rules in TOO_OLD_RULES.items()
+}
+
+
+@lru_cache(maxsize=RULES_CACHE_SIZE)
 def is_too_old(model, brand):
     """Filtre les modèles trop anciens (S6 et en-dessous)."""
     low = model.lower()
-
-    if brand == "Samsung":
-        m = re.search(r"galaxy\s+s(\d+)", low)
-        if m and int(m.group(1)) <= 6:
-            return True
-        if re.search(r"galaxy\s+j\d", low):
+    for pattern, max_num, unless in _TOO_OLD_COMPILED.get(brand, ()):
+        m = pattern.search(low)
+        if not m:
+            continue
+        if max_num is None:
             return True
-        m = re.search(r"galaxy\s+note\s*(\d+)", low)
-        if m and int(m.group(1)) <= 5:
+        if int(m.group(1)) <= max_num and not any(w in low for w in unless):
             return True
+    return False
 
-    elif brand == "Google":
-        m = re.search(r"pixel\s+(\d+)", low)
-        if m and int(m.group(1)) <= 2:
-            return True
 
-    elif brand == "Xiaomi":
-        m = re.search(r"(?:^|\s)mi\s+(\d+)\b", low)
-        if m and int(m.group(1)) <= 5 and "note" not in low and "mix" not in low:
-            return True
-        m = re.search(r"redmi\s+note\s+(\d+)", low)
-        if m and int(m.group(1)) <= 4:
-            return True
+# ─── SCRAPING ────────────────────────────────────────────────
 
-    elif brand == "Huawei":
-        m = re.search(r"\bp(\d+)\b", low)
-        if m and int(m.group(1)) <= 8 and "smart" not in low:
-            return True
-        m = re.search(r"mate\s+(\d+)", low)
-        if m and int(m.group(1)) <= 8:
-            return True
+class ScrapeCancelled(Exception):
+    """Scraping interrompu à la demande (job annulé)."""
 
-    elif brand == "Motorola":
-        m = re.search(r"moto\s+g(\d+)", low)
-        if m and int(m.group(1)) <= 4:
-            return True
-        if re.search(r"moto\s+[xz]", low):
-            return True
 
-    return False
+def _check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise ScrapeCancelled()
 
 
-# ─── SCRAPING ────────────────────────────────────────────────
+class PageStats:
+    """Temps de chargement par page (pour le résumé en fin de scraping)."""
 
-def _fetch_mobilax_brand(client, brand_slug, page=1):
-    """Fetch une page de résultats Mobilax pour une marque."""
-    url = f"{MOBILAX_BASE}/marques/{brand_slug}?page={page}"
-    resp = client.get(url, timeout=30.0)
-    return resp.text
+    def __init__(self):
+        self.pages = []  # (marque, page, secondes, tentatives, ok)
+        self.unchanged = 0
 
+    def add(self, brand, page, seconds, attempts, ok, unchanged=False):
+        self.pages.append((brand, page, seconds, attempts, ok))
+        self.unchanged += unchanged
 
-def _extract_products_rsc(text):
-    """Extrait les produits depuis le flux RSC Next.js."""
-    products = []
-    # Pattern pour extraire id, name, price depuis le RSC stream
-    pattern = re.compile(
-        r'\\"id\\":(\d+),\\"name\\":\\"((?:[^\\"\\\\]|\\\\.)*)\\",\\"suffix.*?'
-        r'\\"prices\\":\[\{\\"id\\":1,\\"name\\":\\"Bronze\\",\\"rate\\":[\d.]+,\\"price\\":([\d.]+)'
-    )
-    for match in pattern.finditer(text):
-        pid = int(match.group(1))
-        name = match.group(2).replace('\\"', '"').replace("\\\\", "\\")
-        price = float(match.group(3))
-        products.append({"id": pid, "name": name, "price_ht": price})
-    return products
+    def summary(self) -> dict:
+        durations = sorted(p[2] for p in self.pages if p[4])
+        if not durations:
+            return {"pages": len(self.pages), "errors": len(self.pages), "unchanged": 0}
 
+        def pct(q):
+            return durations[min(len(durations) - 1, int(q * len(durations)))]
 
-def scrape_brand(client, brand, brand_slug):
-    """Scrape tous les produits d'une marque sur Mobilax."""
-    print(f"[SCRAPER] Scraping {brand}...")
-    all_products = []
-
-    # Page 1
-    text = _fetch_mobilax_brand(client, brand_slug, 1)
-    prods = _extract_products_rsc(text)
-    all_products.extend(prods)
-
-    # Détecter le nombre total de pages
-    total_match = re.search(r'\\"total\\":(\d+)', text)
-    if total_match:
-        total = int(total_match.group(1))
-        per_page = 50
-        total_pages = math.ceil(total / per_page)
-        print(f"[SCRAPER] {brand}: {total} produits, {total_pages} pages")
-
-        for page in range(2, total_pages + 1):
-            try:
-                text = _fetch_mobilax_brand(client, brand_slug, page)
-                prods = _extract_products_rsc(text)
-                all_products.extend(prods)
-                if page % 20 == 0:
-                    print(f"[SCRAPER] {brand}: page {page}/{total_pages}")
-            except Exception as e:
-                print(f"[SCRAPER] Erreur page {page}: {e}")
-                continue
+        return {
+            "pages": len(self.pages),
+            "errors": sum(1 for p in self.pages if not p[4]),
+            "retries": sum(p[3] - 1 for p in self.pages),
+            "unchanged": self.unchanged,
+            "p50": round(pct(0.50), 3),
+            "p95": round(pct(0.95), 3),
+            "max": round(durations[-1], 3),
+        }
 
-    print(f"[SCRAPER] {brand}: {len(all_products)} produits récupérés")
-    return all_products
 
+class _Limiter:
+    """Limite globale + limite par hôte sur les requêtes en vol."""
 
-def process_products(brand, raw_products):
-    """Classifie, normalise et calcule les prix pour les produits d'une marque."""
-    normalizer = NORMALIZERS.get(brand)
-    if not normalizer:
-        return []
+    def __init__(self, total: int, per_host: int):
+        self._total = asyncio.Semaphore(total)
+        self._per_host = per_host
+        self._hosts = {}
 
-    results = []
-    grouped = defaultdict(list)
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = httpx.URL(url).host
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self._per_host)
+        async with self._total, self._hosts[host]:
+            yield
 
-    for p in raw_products:
-        name = p["name"]
-        if name in ["Bronze", "Silver", "Gold", "Diamond", "Platinum", "Mobilax Repair"]:
-            continue
 
-        piece_type = classify_piece(name)
-        if not piece_type:
-            continue
+def _backoff(attempt: int, retry_after=None) -> float:
+    """Délai avant la tentative suivante : Retry-After, sinon exponentiel + jitter."""
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+async def _fetch_mobilax_brand(client, limiter, stats, cache, cancel, brand, brand_slug, page=1):
+    """Fetch une page de résultats Mobilax pour une marque (avec retries).
+
+    La page est revalidée (ETag / Last-Modified) puis écrite dans le cache
+    disque au fil de la réception. Retourne son empreinte dans le cache.
+    """
+    url = f"{str(client.base_url).rstrip('/')}/marques/{brand_slug}?page={page}"
+    key = cache.key(brand_slug, page)
+    start = time.perf_counter()
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        retry_after = None
+        try:
+            async with limiter.slot(url):
+                _check_cancel(cancel)
+                async with client.stream(
+                    "GET", f"/marques/{brand_slug}", params={"page": page},
+                    headers=cache.conditional_headers(key),
+                ) as resp:
+                    if resp.status_code == 304:
+                        stats.add(brand, page, time.perf_counter() - start, attempt, True, unchanged=True)
+                        return cache.revalidated(key)
+                    if resp.status_code not in RETRY_STATUSES:
+                        resp.raise_for_status()
+                        digest, unchanged = await cache.store_stream(
+                            key, resp.aiter_bytes(),
+                            resp.headers.get("ETag"), resp.headers.get("Last-Modified"),
+                        )
+                        stats.add(brand, page, time.perf_counter() - start, attempt, True, unchanged)
+                        return digest
+                    error = f"HTTP {resp.status_code}"
+                    retry_after = resp.headers.get("Retry-After")
+        except httpx.TransportError as e:
+            error = f"{type(e).__name__}: {e}"
+        except httpx.HTTPStatusError:
+            stats.add(brand, page, time.perf_counter() - start, attempt, False)
+            raise
+        if attempt == MAX_ATTEMPTS:
+            break
+        await asyncio.sleep(_backoff(attempt, retry_after))
+    stats.add(brand, page, time.perf_counter() - start, MAX_ATTEMPTS, False)
+    raise RuntimeError(f"{url} : {error} après {MAX_ATTEMPTS} tentatives")
 
-        model = normalizer(name)
-        if not model:
-            continue
 
-        if is_too_old(model, brand):
-            continue
+def _extract_products_rsc(text):
+    """Extrait les produits depuis le flux RSC Next.js."""
+    return parse_products([text])[0]
 
-        quality = extract_quality(name) if piece_type == "Ecran" else ""
-        key = (model, piece_type, quality)
-        grouped[key].append(p)
 
-    for (model, piece_type, quality), products in grouped.items():
-        min_price = min(p["price_ht"] for p in products)
-        best_name = min(products, key=lambda p: p["price_ht"])["name"]
-        categorie = detect_categorie(model)
-        prix_client = calcul_prix_client(min_price, piece_type, categorie)
+def _parse_page(chunks):
+    products, total = parse_products(chunks)
+    return {"products": products, "total": total}
 
-        results.append({
-            "marque": brand,
-            "modele": model,
-            "type_piece": piece_type,
-            "qualite": quality,
-            "nom_fournisseur": best_name,
-            "prix_fournisseur_ht": min_price,
-            "prix_client": prix_client,
-            "categorie": categorie,
-        })
 
-    return results
+def _parsed_page(cache, digest):
+    """{"products", "total"} d'une page du cache (parsée une seule fois)."""
+    return cache.parsed(digest, _parse_page, PARSER_VERSION)
 
 
-# ─── MAIN ENTRY POINT ───────────────────────────────────────
+def _replay_fetch(cache, cancel, brand_slug):
+    """Équivalent hors ligne de _fetch_mobilax_brand : lit l'index du cache."""
+    async def fetch(page):
+        _check_cancel(cancel)
+        entry = cache.entry(cache.key(brand_slug, page))
+        if entry is None:
+            raise RuntimeError(f"page {brand_slug}/{page} absente du cache")
+        return entry["sha256"]
+    return fetch
 
-def scrape_and_update():
-    """Scrape Mobilax et met à jour la table tarifs."""
-    print("[SCRAPER] Démarrage du scraping Mobilax...")
-    start = time.time()
 
-    client = httpx.Client(
-        headers={
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                          "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        },
-        follow_redirects=True,
-        timeout=30.0,
-    )
+async def _brand_pages(fetch, cache, brand, report):
+    """Pages d'une marque au fil de leur arrivée : (numéro, produits bruts).
 
-    all_tarifs = []
+    La page 1 donne le nombre total de produits ; les pages suivantes sont
+    chargées en parallèle et rendues dès qu'elles sont parsées, dans leur
+    ordre d'arrivée. Une page en erreur est signalée puis sautée.
+    """
+    first = _parsed_page(cache, await fetch(1))
+    yield 1, first["products"]
 
-    for brand, slug in BRANDS_SLUGS.items():
+    total = first["total"]
+    if not total:
+        return
+    total_pages = math.ceil(total / PER_PAGE)
+    print(f"[SCRAPER] {brand}: {total} produits, {total_pages} pages")
+    report(brand, pages_total=total_pages, pages_done=1)
+
+    async def fetch_page(page):
         try:
-            raw = scrape_brand(client, brand, slug)
-            processed = process_products(brand, raw)
-            all_tarifs.extend(processed)
-            print(f"[SCRAPER] {brand}: {len(processed)} tarifs générés")
+            return page, await fetch(page)
         except Exception as e:
-            print(f"[SCRAPER] Erreur {brand}: {e}")
-            continue
+            return page, e
+
+    tasks = [asyncio.ensure_future(fetch_page(p)) for p in range(2, total_pages + 1)]
+    try:
+        for pages_done, next_page in enumerate(asyncio.as_completed(tasks), start=2):
+            page, digest = await next_page
+            report(brand, pages_done=pages_done)
+            if isinstance(digest, ScrapeCancelled):
+                raise digest
+            if isinstance(digest, Exception):
+                print(f"[SCRAPER] Erreur page {page}: {digest}")
+                continue
+            yield page, _parsed_page(cache, digest)["products"]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class BrandTarifs:
+    """Tarifs d'une marque, réduits au prix mini au fil des pages.
+
+    Seul le meilleur produit de chaque (modèle, pièce, qualité) est gardé :
+    la mémoire suit le nombre de tarifs, pas le nombre de produits bruts.
+    À prix égal, le premier produit dans l'ordre des pages l'emporte, quel
+    que soit l'ordre d'arrivée des pages.
+
+    Avec `pool` (ProcessPoolExecutor), la classification part par lots de
+    CLASSIFY_CHUNK produits dans les processus de classification ; la
+    fusion des minima reste ici et ne dépend ni du découpage ni de l'ordre
+    de retour des lots. Appeler `finish()` avant de lire les tarifs.
+    """
+
+    def __init__(self, brand, pool=None):
+        self.brand = brand
+        self.products = 0
+        self._known = brand in NORMALIZERS
+        self._pool = pool
+        self._pending = []   # candidats pas encore envoyés au pool
+        self._futures = []
+        self._best = {}  # (modèle, pièce, qualité) → (prix, page, position, nom)
+
+    def add(self, page, raw_products):
+        self.products += len(raw_products)
+        if not self._known:
+            return
+        candidates = [(p["price_ht"], page, pos, p["name"]) for pos, p in enumerate(raw_products)]
+        if self._pool is None:
+            self._merge(_classify_chunk(self.brand, candidates))
+            return
+        self._pending.extend(candidates)
+        if len(self._pending) >= CLASSIFY_CHUNK:
+            self._collect(wait=False)
+            self._futures.append(self._pool.submit(_classify_chunk, self.brand, self._pending))
+            self._pending = []
+
+    def _merge(self, chunk_best):
+        best = self._best
+        for key, candidate in chunk_best.items():
+            current = best.get(key)
+            if current is None or candidate < current:
+                best[key] = candidate
+
+    def _collect(self, wait):
+        remaining = []
+        for future in self._futures:
+            if wait or future.done():
+                self._merge(future.result())
+            else:
+                remaining.append(future)
+        self._futures = remaining
+
+    def finish(self):
+        """Classe le reste et attend les lots en cours (bloquant)."""
+        if self._pending:
+            self._merge(_classify_chunk(self.brand, self._pending))
+            self._pending = []
+        self._collect(wait=True)
+
+    def __len__(self):
+        return len(self._best)
+
+    def tarifs(self):
+        """Tarifs calculés (générateur, consommé par le chargement COPY)."""
+        self.finish()
+        rules = current_rules()
+        for (model, piece_type, quality), (min_price, _, _, best_name) in self._best.items():
+            categorie = detect_categorie(model)
+            yield {
+                "marque": self.brand,
+                "modele": model,
+                "type_piece": piece_type,
+                "qualite": quality,
+                "nom_fournisseur": best_name,
+                "prix_fournisseur_ht": min_price,
+                "prix_client": calcul_prix_client(min_price, piece_type, categorie, rules),
+                "categorie": categorie,
+            }
+
+
+async def scrape_brand(fetch, cache, brand, progress=None):
+    """Scrape tous les produits d'une marque sur Mobilax.
+
+    `fetch(page)` renvoie l'empreinte de la page dans le cache (réseau ou
+    replay). Chaque page est parsée et réduite dès son arrivée ; les
+    produits bruts ne sont pas conservés. `progress(brand, **champs)` est
+    appelé à chaque page. Retourne un BrandTarifs.
+    """
+    print(f"[SCRAPER] Scraping {brand}...")
+    report = progress or (lambda brand, **fields: None)
+    report(brand, status="running", pages_done=0)
+
+    tarifs = BrandTarifs(brand, classifier_pool())
+    async for page, products in _brand_pages(fetch, cache, brand, report):
+        tarifs.add(page, products)
+    await asyncio.to_thread(tarifs.finish)
+
+    print(f"[SCRAPER] {brand}: {tarifs.products} produits récupérés, {len(tarifs)} tarifs")
+    report(brand, status="scraped", products=tarifs.products, tarifs=len(tarifs))
+    return tarifs
+
+
+async def scrape_all(base_url: str = MOBILAX_BASE, brands: dict = None,
+                     replay: bool = False, cache: PageCache = None,
+                     progress=None, cancel=None, flush=None):
+    """Scrape toutes les marques en parallèle.
+
+    `replay` : aucune requête réseau, tout vient du cache disque.
+    `cancel` (threading.Event) : interrompt les requêtes restantes.
+    `flush(marque, BrandTarifs)` : fonction bloquante appelée (dans un
+    thread, une marque à la fois) dès qu'une marque est scrapée ; son
+    résultat remplace alors le BrandTarifs, libéré aussitôt.
+    Retourne ({marque: BrandTarifs, résultat de flush ou exception}, PageStats).
+    """
+    brands = brands or BRANDS_SLUGS
+    cache = cache or PageCache()
+    stats = PageStats()
+    flush_lock = asyncio.Lock()
+
+    async def run_brand(fetch, brand):
+        tarifs = await scrape_brand(fetch, cache, brand, progress)
+        if flush is None:
+            return tarifs
+        async with flush_lock:
+            return await asyncio.to_thread(flush, brand, tarifs)
+
+    if replay:
+        results = await asyncio.gather(
+            *(run_brand(_replay_fetch(cache, cancel, slug), brand)
+              for brand, slug in brands.items()),
+            return_exceptions=True,
+        )
+        return dict(zip(brands, results)), stats
+
+    limiter = _Limiter(SCRAPER_CONCURRENCY, SCRAPER_PER_HOST)
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers=HEADERS,
+        http2=_HTTP2,
+        follow_redirects=True,
+        timeout=httpx.Timeout(PAGE_TIMEOUT, connect=10.0),
+        limits=httpx.Limits(
+            max_connections=SCRAPER_CONCURRENCY,
+            max_keepalive_connections=SCRAPER_CONCURRENCY,
+        ),
+    ) as client:
+        try:
+            results = await asyncio.gather(
+                *(run_brand(
+                    partial(_fetch_mobilax_brand, client, limiter, stats, cache, cancel, brand, slug),
+                    brand,
+                  ) for brand, slug in brands.items()),
+                return_exceptions=True,
+            )
+        finally:
+            removed = cache.prune(parser_version=PARSER_VERSION)
+            if removed:
+                print(f"[SCRAPER] Cache: {removed} fichiers périmés supprimés")
+            cache.save()
+    return dict(zip(brands, results)), stats
 
-    client.close()
 
-    if not all_tarifs:
-        print("[SCRAPER] Aucun tarif récupéré, abandon.")
-        return
+IGNORED_NAMES = frozenset(["Bronze", "Silver", "Gold", "Diamond", "Platinum", "Mobilax Repair"])
+
+
+@lru_cache(maxsize=RULES_CACHE_SIZE)
+def _analyse_name(brand, name):
+    """(modèle, type de pièce, qualité) d'un nom produit, ou None s'il est ignoré."""
+    if name in IGNORED_NAMES:
+        return None
+
+    piece_type = classify_piece(name)
+    if not piece_type:
+        return None
 
-    # Insérer en BDD
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    with get_cursor() as cur:
-        cur.execute("DELETE FROM tarifs")
-
-        for t in all_tarifs:
-            cur.execute(
-                """INSERT INTO tarifs
-                   (marque, modele, type_piece, qualite, nom_fournisseur,
-                    prix_fournisseur_ht, prix_client, categorie, source, updated_at)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
-                (
-                    t["marque"], t["modele"], t["type_piece"], t["qualite"],
-                    t["nom_fournisseur"], t["prix_fournisseur_ht"], t["prix_client"],
-                    t["categorie"], "mobilax", now,
-                ),
+    model = NORMALIZERS[brand](name)
+    if not model:
+        return None
+
+    if is_too_old(model, brand):
+        return None
+
+    quality = extract_quality(name) if piece_type == "Ecran" else ""
+    return (model, piece_type, quality)
+
+
+def _classify_chunk(brand, candidates):
+    """Meilleur candidat (prix, page, position, nom) par clé pour un lot.
+
+    Tourne dans un processus de classification (ou en local sans pool) ;
+    chaque processus garde son propre cache de _analyse_name.
+    """
+    best = {}
+    for candidate in candidates:
+        key = _analyse_name(brand, candidate[3])
+        if key is None:
+            continue
+        current = best.get(key)
+        if current is None or candidate < current:
+            best[key] = candidate
+    return best
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def classifier_pool():
+    """Pool de processus de classification (None si SCRAPER_WORKERS=0).
+
+    Créé à la demande et gardé pour les runs suivants (caches chauds).
+    Démarrage en `spawn` : pas de fork d'un process qui a des threads et
+    des connexions ouvertes.
+    """
+    global _classifier
+    if SCRAPER_WORKERS <= 0:
+        return None
+    with _classifier_lock:
+        if _classifier is None or getattr(_classifier, "_broken", False):
+            _classifier = ProcessPoolExecutor(
+                max_workers=SCRAPER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
             )
+        return _classifier
+
+
+def process_products(brand, raw_products):
+    """Classifie, normalise et calcule les prix pour les produits d'une marque."""
+    tarifs = BrandTarifs(brand)
+    tarifs.add(1, raw_products)
+    return list(tarifs.tarifs())
+
+
+def _peak_rss_mb():
+    """Pic de mémoire résidente du process (Mo), None si non mesurable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Ko sous Linux, octets sous macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+LOAD_COUNTERS = ("rows", "inserted", "updated", "unchanged", "removed")
+
+
+# ─── MAIN ENTRY POINT ───────────────────────────────────────
+
+def scrape_and_update(replay: bool = False, progress=None, cancel=None) -> dict:
+    """Scrape Mobilax et met à jour la table tarifs, marque par marque.
+
+    Chaque marque est chargée en BDD dès qu'elle est scrapée (COPY + fusion
+    limitée à la marque) : une marque en erreur garde ses anciens tarifs.
+    `replay` : reconstruit les tarifs depuis le cache disque, sans réseau
+    (pour voir l'effet d'un changement de normalisation ou de prix).
+    `progress` / `cancel` : voir scrape_all (utilisés par les jobs). Une
+    annulation arrête les marques restantes ; celles déjà chargées le restent.
+
+    Retourne le résumé du run ; lève ScrapeCancelled si annulé, TarifLoadError
+    si aucune marque n'a pu être chargée.
+    """
+    print(f"[SCRAPER] Démarrage du scraping Mobilax{' (replay)' if replay else ''}...")
+    start = time.time()
+    rss_before = _peak_rss_mb()
+    report = progress or (lambda brand, **fields: None)
+
+    def flush(brand, tarifs):
+        _check_cancel(cancel)
+        if not len(tarifs):
+            raise TarifLoadError("Aucun tarif récupéré")
+        loaded = load_tarifs(tarifs.tarifs(), source="mobilax", marque=brand)
+        report(brand, status="done", tarifs=loaded["rows"])
+        return loaded
+
+    results, stats = asyncio.run(
+        scrape_all(replay=replay, progress=progress, cancel=cancel, flush=flush)
+    )
+    _check_cancel(cancel)
+
+    loads = {}
+    errors = {}
+    for brand, result in results.items():
+        if isinstance(result, Exception):
+            print(f"[SCRAPER] Erreur {brand}: {result}")
+            errors[brand] = str(result)
+            report(brand, status="failed", error=str(result))
+            continue
+        loads[brand] = result
+
+    summary = {
+        "pages": stats.summary(),
+        "errors": errors,
+        "tarifs": sum(r["rows"] for r in loads.values()),
+        "load": {k: sum(r[k] for r in loads.values()) for k in LOAD_COUNTERS},
+        "brands": loads,
+        "memory": {"rss_peak_before_mb": rss_before, "rss_peak_mb": _peak_rss_mb()},
+    }
+    print(f"[SCRAPER] Pages: {summary['pages']}")
+    print(f"[SCRAPER] Mémoire: pic RSS {summary['memory']['rss_peak_mb']} Mo "
+          f"(avant le run : {rss_before} Mo)")
+
+    if not loads:
+        raise TarifLoadError("Aucun tarif récupéré")
 
     elapsed = time.time() - start
-    print(f"[SCRAPER] Terminé: {len(all_tarifs)} tarifs insérés en {elapsed:.1f}s")
+    print(f"[SCRAPER] Terminé: {summary['tarifs']} tarifs chargés "
+          f"({len(loads)}/{len(results)} marques) en {elapsed:.1f}s")
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Scraping Mobilax → table tarifs")
+    parser.add_argument("--replay", action="store_true",
+                        help="reconstruire les tarifs depuis le cache disque, sans réseau")
+    try:
+        scrape_and_update(replay=parser.parse_args().replay)
+    except TarifLoadError as e:
+        print(f"[SCRAPER] Tarifs non remplacés: {e}")
@@ -0,0 +1,79 @@
+"""
+Recherche tickets / clients : documents de recherche indexés en trigrammes.
+
+Les anciennes recherches enchaînaient des `ILIKE '%x%'` sur plusieurs
+colonnes des deux côtés d'un JOIN, soit un parcours séquentiel complet à
+chaque frappe. Chaque table a désormais une colonne générée `search_doc`
+(minuscules, sans accents) indexée en GIN `pg_trgm`, et les clients une
+colonne `tel_digits` (chiffres seuls du téléphone) :
+
+    tickets.search_doc   code, marque, modèle, modèle autre, IMEI
+    clients.search_doc   nom, prénom, société, email
+    clients.tel_digits   "06 12 34 56 78" → "0612345678"
+
+Colonnes et index : migration 0002. Le filtre reste une recherche de
+sous-chaîne (mêmes résultats qu'avant, accents en plus) ; les résultats
+sont classés par `word_similarity`.
+"""
+
+import re
+
+# Un terme ne contenant que des chiffres et séparateurs est un téléphone
+_PHONE_RE = re.compile(r"^[\d\s.+\-/()]+$")
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def phone_digits(term: str) -> str:
+    """Chiffres d'un numéro, préfixe international français ramené à 0."""
+    digits = re.sub(r"\D", "", term or "")
+    if digits.startswith("0033"):
+        digits = "0" + digits[4:]
+    elif digits.startswith("33") and len(digits) == 11:
+        digits = "0" + digits[2:]
+    return digits
+
+
+def is_phone(term: str) -> bool:
+    return bool(_PHONE_RE.match(term or "")) and len(phone_digits(term)) >= 2
+
+
+def phone_clause(term: str, params: list, alias: str = "") -> str:
+    """Condition "le téléphone contient ces chiffres".
+
+    Sans aucun chiffre, le motif '%%' accepterait tout : on compare alors le
+    texte brut au téléphone saisi, comme l'ancien filtre.
+    """
+    digits = phone_digits(term)
+    if not digits:
+        params.append(_like_pattern(term or ""))
+        return f"{alias}telephone LIKE %s"
+    params.append(_like_pattern(digits))
+    return f"{alias}tel_digits LIKE %s"
+
+
+def text_clause(term: str, params: list, *aliases: str) -> str:
+    """Condition "un des search_doc contient le terme" (accents/casse ignorés)."""
+    parts = []
+    for alias in aliases:
+        params.append(_like_pattern(term.strip()))
+        parts.append(f"{alias}search_doc LIKE f_unaccent(lower(%s))")
+    return "(" + " OR ".join(parts) + ")"
+
+
+def rank_expr(term: str, params: list, *aliases: str, phone_alias: str = None) -> str:
+    """Score de pertinence (0..1) du terme sur les search_doc donnés.
+
+    Pour un numéro, le score porte sur `tel_digits` de `phone_alias`.
+    """
+    scores = []
+    if phone_alias is not None and is_phone(term):
+        params.append(phone_digits(term))
+        scores.append(f"word_similarity(%s, {phone_alias}tel_digits)")
+    for alias in aliases:
+        params.append(term.strip())
+        scores.append(f"word_similarity(f_unaccent(lower(%s)), {alias}search_doc)")
+    return scores[0] if len(scores) == 1 else f"GREATEST({', '.join(scores)})"
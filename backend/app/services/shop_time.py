@@ -0,0 +1,60 @@
+"""
+Heure de la boutique.
+
+Les dates sont stockées en `timestamptz` (instants absolus) ; "aujourd'hui"
+dépend du fuseau de la boutique, paramètre `SHOP_TIMEZONE` de la table
+params (Europe/Paris par défaut).
+
+Une journée est un intervalle [début, fin) d'instants : les filtres
+`date >= début AND date < fin` restent servis par un index B-tree, là où
+`date::date = jour` oblige à calculer la date de chaque ligne.
+
+Usage:
+    from app.services import shop_time
+    debut, fin = await shop_time.atoday_bounds()
+"""
+
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.services import params
+
+DEFAULT_TIMEZONE = "Europe/Paris"
+
+
+@lru_cache(maxsize=8)
+def _zone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        print(f"[PARAMS] Fuseau SHOP_TIMEZONE inconnu: {name!r}, {DEFAULT_TIMEZONE} utilisé")
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def shop_tz() -> ZoneInfo:
+    return _zone(params.get("SHOP_TIMEZONE", DEFAULT_TIMEZONE))
+
+
+def now() -> datetime:
+    """Heure courante de la boutique (datetime avec fuseau)."""
+    return datetime.now(shop_tz())
+
+
+def day_bounds(day: date = None, tz: ZoneInfo = None) -> tuple:
+    """(début, fin) de la journée `day` (aujourd'hui par défaut) dans le fuseau boutique.
+
+    Chaque borne est calculée à minuit local : une journée de changement
+    d'heure dure 23 ou 25 heures.
+    """
+    tz = tz or shop_tz()
+    day = day or datetime.now(tz).date()
+    start = datetime.combine(day, time(), tzinfo=tz)
+    end = datetime.combine(day + timedelta(days=1), time(), tzinfo=tz)
+    return start, end
+
+
+async def atoday_bounds() -> tuple:
+    """Version async de day_bounds() : le rechargement des params passe par le pool DB."""
+    values = await params.cache.aall()
+    return day_bounds(tz=_zone(values.get("SHOP_TIMEZONE") or DEFAULT_TIMEZONE))
@@ -0,0 +1,285 @@
+"""
+Index mémoire de la grille tarifaire, pour la recherche instantanée.
+
+La table tarifs est petite et ne change qu'aux imports (scraping, import
+JSON, recalcul des prix) : chaque worker en garde une copie indexée au lieu
+d'exécuter `LOWER(col) LIKE '%q%'` sur trois colonnes à chaque frappe.
+
+    tokens     mot normalisé (minuscules, sans accents) → lignes
+    prefixes   début de mot → lignes (saisie au fil de l'eau)
+    facets     marque / type_piece / qualite → valeur → lignes
+
+Un index est immuable : il est reconstruit en entier puis remplacé d'un
+coup, les recherches en cours gardent l'ancien. Un trigger sur `tarifs`
+(migration 0008) émet `pg_notify('tarifs_changed')` à chaque écriture (y
+compris depuis Streamlit) ; le listener du worker déclenche alors une
+reconstruction en arrière-plan.
+
+Usage:
+    from app.services.tarif_index import index
+    result = (await index.aget()).search("a52 oled", marque="samsung")
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from app.database import get_sync_cursor, run_in_db_thread
+from app.services.pg_listener import get_listener
+
+CHANNEL = "tarifs_changed"
+TEXT_FIELDS = ("marque", "modele", "nom_fournisseur")
+FACET_FIELDS = ("marque", "type_piece", "qualite")
+# Regroupe les reconstructions d'une rafale d'écritures (chargement par marque)
+REBUILD_DEBOUNCE = 0.5
+# Préfixes indexés jusqu'à cette longueur ; au-delà, filtre sur les mots
+MAX_PREFIX = 12
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# "a52s" → aussi "52s" ; "s23" → "23"
+_DIGITS_RE = re.compile(r"(?<=[a-z])\d[a-z0-9]*")
+
+
+def fold(text) -> str:
+    """Minuscules sans accents."""
+    text = unicodedata.normalize("NFKD", str(text or "").lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def words(text) -> list:
+    """Mots indexés d'un texte (avec la partie chiffrée des mots mixtes)."""
+    found = []
+    for word in _WORD_RE.findall(fold(text)):
+        found.append(word)
+        found.extend(_DIGITS_RE.findall(word))
+    return found
+
+
+def _bitset(positions) -> int:
+    """Bitset d'une liste croissante de positions."""
+    buf = bytearray((positions[-1] >> 3) + 1 if positions else 0)
+    for pos in positions:
+        buf[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _count(bits: int) -> int:
+    return bin(bits).count("1")
+
+
+def _positions(bits: int, offset: int, limit: int) -> list:
+    """Positions des bits à 1, dans l'ordre, de `offset` à `offset + limit`."""
+    digits = bin(bits)[:1:-1]  # bit 0 en tête
+    found = []
+    pos = digits.find("1")
+    skipped = 0
+    while pos >= 0 and len(found) < limit:
+        if skipped < offset:
+            skipped += 1
+        else:
+            found.append(pos)
+        pos = digits.find("1", pos + 1)
+    return found
+
+
+class TarifIndex:
+    """Instantané immuable de la table tarifs et de ses index.
+
+    Les listes de lignes sont des bitsets (entiers Python, bit n = n-ième
+    ligne dans l'ordre marque / modèle / pièce / qualité) : intersections
+    et comptages se font en C, sans parcourir les lignes.
+    """
+
+    def __init__(self, rows):
+        key = lambda r: (r["marque"] or "", r["modele"] or "", r["type_piece"] or "", r["qualite"] or "")
+        self.rows = tuple(sorted(rows, key=key))
+        self.built_at = time.time()
+        tokens = {}
+        prefixes = {}
+        facets = {field: {} for field in FACET_FIELDS}
+
+        for pos, row in enumerate(self.rows):
+            row_words = set()
+            for field in TEXT_FIELDS:
+                row_words.update(words(row.get(field)))
+            for word in row_words:
+                tokens.setdefault(word, []).append(pos)
+            row_prefixes = {w[:n] for w in row_words for n in range(1, min(len(w), MAX_PREFIX) + 1)}
+            for prefix in row_prefixes:
+                prefixes.setdefault(prefix, []).append(pos)
+            for field in FACET_FIELDS:
+                facets[field].setdefault(fold(row.get(field)), []).append(pos)
+
+        self.tokens = {w: _bitset(p) for w, p in tokens.items()}
+        self.prefixes = {w: _bitset(p) for w, p in prefixes.items()}
+        self.facets = {f: {v: _bitset(p) for v, p in vals.items()} for f, vals in facets.items()}
+        # Champs texte normalisés, pour la recherche par sous-chaîne
+        self._texts = tuple(tuple(fold(r.get(f)) for f in TEXT_FIELDS) for r in self.rows)
+        # Valeur affichée de chaque facette (forme d'origine de la première ligne)
+        self._labels = {
+            field: {fold(r.get(field)): (r.get(field) or "") for r in reversed(self.rows)}
+            for field in FACET_FIELDS
+        }
+        self._all = (1 << len(self.rows)) - 1
+        self.facet_counts = self._count_facets({f: self._all for f in FACET_FIELDS})
+
+    def __len__(self):
+        return len(self.rows)
+
+    # ─── RECHERCHE ──────────────────────────────────────────
+
+    def _term_rows(self, term) -> int:
+        if len(term) <= MAX_PREFIX:
+            return self.prefixes.get(term, 0)
+        bits = 0
+        for word, rows in self.tokens.items():
+            if word.startswith(term):
+                bits |= rows
+        return bits
+
+    def match(self, q=None) -> int:
+        """Lignes dont chaque mot de `q` commence un mot de marque / modèle / fournisseur."""
+        result = self._all
+        for term in set(words(q)) if q else ():
+            result &= self._term_rows(term)
+            if not result:
+                break
+        return result
+
+    def contains(self, q=None) -> int:
+        """Lignes dont la marque, le modèle ou le nom fournisseur contient `q`.
+
+        Sémantique historique de GET /api/tarifs (LIKE '%q%') : parcours de
+        toutes les lignes, réservé à cette route.
+        """
+        if not q:
+            return self._all
+        needle = fold(q)
+        return _bitset([
+            pos for pos, texts in enumerate(self._texts)
+            if any(needle in text for text in texts)
+        ])
+
+    def _count_facets(self, matched_by_facet):
+        counts = {}
+        for field in FACET_FIELDS:
+            matched = matched_by_facet[field]
+            # Peu de valeurs par facette : un ET binaire par valeur
+            counter = Counter({
+                value: _count(matched & rows) for value, rows in self.facets[field].items()
+            })
+            labels = self._labels[field]
+            counts[field] = {labels[value]: n for value, n in counter.most_common() if n}
+        return counts
+
+    def search(self, q=None, limit=50, offset=0, substring=False, **filters) -> dict:
+        """Recherche + facettes. `filters` : marque, type_piece, qualite (égalité, casse ignorée).
+
+        `substring` : `q` est cherché comme sous-chaîne (contains) au lieu
+        de débuts de mots (match).
+        Les compteurs d'une facette ignorent son propre filtre (on voit les
+        autres marques disponibles quand une marque est sélectionnée).
+        """
+        start = time.perf_counter()
+        text_rows = self.contains(q) if substring else self.match(q)
+        selected = {
+            field: self.facets[field].get(fold(value), 0)
+            for field, value in filters.items()
+            if field in FACET_FIELDS and value is not None
+        }
+
+        def narrowed(skip=None):
+            result = text_rows
+            for field, rows in selected.items():
+                if field != skip:
+                    result &= rows
+            return result
+
+        matched = narrowed()
+        if matched == self._all:
+            facets = self.facet_counts
+        else:
+            facets = self._count_facets({f: narrowed(skip=f) for f in FACET_FIELDS})
+
+        return {
+            "total": _count(matched),
+            "items": [self.rows[pos] for pos in _positions(matched, offset, limit)],
+            "facets": facets,
+            "took_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+
+class TarifIndexHolder:
+    """Index courant du worker, reconstruit en arrière-plan après chaque import."""
+
+    def __init__(self):
+        self._index = None
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def _build(self) -> TarifIndex:
+        with self._lock:
+            self._dirty.clear()
+            start = time.perf_counter()
+            with get_sync_cursor() as cur:
+                cur.execute("SELECT to_regclass('tarifs') IS NOT NULL AS ok")
+                if cur.fetchone()["ok"]:
+                    cur.execute("SELECT * FROM tarifs")
+                    rows = cur.fetchall()
+                else:
+                    rows = []
+            index = TarifIndex(rows)
+            self._index = index
+            print(f"[TARIFS] Index mémoire : {len(index)} tarifs en {time.perf_counter() - start:.2f}s")
+            return index
+
+    def get(self) -> TarifIndex:
+        return self._index or self._build()
+
+    async def aget(self) -> TarifIndex:
+        """Version async : le premier chargement passe par le pool de threads DB."""
+        return self._index or await run_in_db_thread(self._build)
+
+    async def arefresh(self) -> TarifIndex:
+        """Reconstruit l'index tout de suite (après une écriture de ce worker)."""
+        return await run_in_db_thread(self._build)
+
+    def invalidate(self, *_):
+        """Demande une reconstruction (callback du listener, ou après un import local)."""
+        if self._index is None:
+            return  # pas encore construit : le sera à la première recherche
+        with self._thread_lock:
+            self._dirty.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._rebuild_loop, name="tarif-index", daemon=True)
+                self._thread.start()
+
+    def _rebuild_loop(self):
+        while True:
+            with self._thread_lock:
+                if not self._dirty.is_set():
+                    self._thread = None
+                    return
+            time.sleep(REBUILD_DEBOUNCE)
+            try:
+                self._build()
+            except Exception as e:
+                # On garde l'ancien index ; le prochain changement réessaiera
+                print(f"[TARIFS] Reconstruction de l'index impossible: {e}")
+                with self._thread_lock:
+                    self._dirty.clear()
+                    self._thread = None
+                return
+
+    def start(self):
+        """Abonne l'index aux notifications tarifs_changed du listener."""
+        listener = get_listener()
+        listener.subscribe(CHANNEL, self.invalidate)
+        listener.on_reconnect(self.invalidate)
+
+
+index = TarifIndexHolder()
@@ -0,0 +1,247 @@
+"""
+Chargement en masse de la table tarifs : COPY puis mise à jour différentielle.
+
+L'import JSON et le scraper Mobilax réécrivaient toute la table à chaque
+passage, même quand presque aucun prix n'avait bougé (WAL, bloat, et
+aucun historique). Désormais :
+
+    1. les lignes sont envoyées en flux par `COPY FROM STDIN` dans une
+       table temporaire `tarifs_import` ;
+    2. le nombre de lignes chargées est vérifié (et comparé à la table
+       actuelle pour refuser un scraping manifestement incomplet) ;
+    3. la grille est fusionnée sur la clé naturelle
+       (marque, modele, type_piece, qualite) : seules les lignes nouvelles,
+       modifiées ou disparues sont écrites, dans une seule transaction ;
+    4. chaque changement de prix est tracé dans `tarifs_history`.
+
+Clé unique et historique : migration 0007.
+
+Avec `marque`, la fusion se limite à cette marque (le scraper charge
+chaque marque dès qu'elle est prête, les autres ne sont pas touchées).
+"""
+
+import time
+from datetime import datetime, timezone
+
+from app.database import get_sync_cursor
+
+COLUMNS = (
+    "marque", "modele", "type_piece", "qualite", "nom_fournisseur",
+    "prix_fournisseur_ht", "prix_client", "categorie", "source", "updated_at",
+)
+
+# Refuse une nouvelle grille de moins de la moitié de l'actuelle
+# (scraping interrompu, fournisseur indisponible...) sauf import forcé
+MIN_RATIO = 0.5
+
+
+KEY = ("marque", "modele", "type_piece", "qualite")
+
+
+# Supprime les doublons de clé en gardant le prix fournisseur le plus bas
+DEDUPE_SQL = """
+DELETE FROM {table} a USING {table} b
+WHERE a.marque = b.marque AND a.modele = b.modele
+  AND a.type_piece = b.type_piece AND a.qualite = b.qualite
+  AND (COALESCE(a.prix_fournisseur_ht, 0), a.{tiebreak})
+    > (COALESCE(b.prix_fournisseur_ht, 0), b.{tiebreak})
+"""
+
+IMPORT_TABLE_SQL = """
+CREATE TEMP TABLE tarifs_import (
+    marque VARCHAR(50) NOT NULL,
+    modele VARCHAR(100) NOT NULL,
+    type_piece VARCHAR(50) NOT NULL,
+    qualite VARCHAR(50) NOT NULL,
+    nom_fournisseur TEXT,
+    prix_fournisseur_ht DECIMAL(10,2),
+    prix_client INTEGER NOT NULL,
+    categorie VARCHAR(20),
+    source VARCHAR(50),
+    updated_at TIMESTAMPTZ
+) ON COMMIT DROP
+"""
+
+_JOIN = " AND ".join(f"t.{k} = s.{k}" for k in KEY)
+
+# Étapes de fusion, dans l'ordre ; le rowcount de chacune est le compteur.
+# L'historique est écrit avant l'UPDATE (RETURNING ne donne pas les anciennes valeurs).
+MERGE_STEPS = (
+    ("history", f"""
+        INSERT INTO tarifs_history
+            (marque, modele, type_piece, qualite,
+             ancien_prix_fournisseur_ht, nouveau_prix_fournisseur_ht,
+             ancien_prix_client, nouveau_prix_client)
+        SELECT t.marque, t.modele, t.type_piece, t.qualite,
+               t.prix_fournisseur_ht, s.prix_fournisseur_ht,
+               t.prix_client, s.prix_client
+        FROM tarifs t JOIN tarifs_import s ON {_JOIN}
+        WHERE (t.prix_fournisseur_ht, t.prix_client)
+              IS DISTINCT FROM (s.prix_fournisseur_ht, s.prix_client)
+    """),
+    ("updated", f"""
+        UPDATE tarifs t SET
+            nom_fournisseur = s.nom_fournisseur,
+            prix_fournisseur_ht = s.prix_fournisseur_ht,
+            prix_client = s.prix_client,
+            categorie = s.categorie,
+            source = s.source,
+            updated_at = s.updated_at
+        FROM tarifs_import s
+        WHERE {_JOIN}
+          AND (t.nom_fournisseur, t.prix_fournisseur_ht, t.prix_client, t.categorie, t.source)
+              IS DISTINCT FROM
+              (s.nom_fournisseur, s.prix_fournisseur_ht, s.prix_client, s.categorie, s.source)
+    """),
+    ("inserted", f"""
+        WITH ins AS (
+            INSERT INTO tarifs ({', '.join(COLUMNS)})
+            SELECT {', '.join('s.' + c for c in COLUMNS)}
+            FROM tarifs_import s
+            WHERE NOT EXISTS (SELECT 1 FROM tarifs t WHERE {_JOIN})
+            RETURNING marque, modele, type_piece, qualite, prix_fournisseur_ht, prix_client
+        )
+        INSERT INTO tarifs_history
+            (marque, modele, type_piece, qualite, nouveau_prix_fournisseur_ht, nouveau_prix_client)
+        SELECT * FROM ins
+    """),
+    ("removed", f"""
+        WITH del AS (
+            DELETE FROM tarifs t
+            WHERE NOT EXISTS (SELECT 1 FROM tarifs_import s WHERE {_JOIN}) {{scope}}
+            RETURNING marque, modele, type_piece, qualite, prix_fournisseur_ht, prix_client
+        )
+        INSERT INTO tarifs_history
+            (marque, modele, type_piece, qualite, ancien_prix_fournisseur_ht, ancien_prix_client)
+        SELECT * FROM del
+    """),
+)
+
+
+class TarifLoadError(Exception):
+    """Chargement refusé : rien n'a été modifié."""
+
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value) -> str:
+    """Valeur au format texte de COPY (\\N pour NULL)."""
+    if value is None:
+        return "\\N"
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class _CopyStream:
+    """Fichier en lecture seule alimenté par un itérateur de lignes.
+
+    Permet à `copy_expert` de consommer les tarifs au fil de l'eau sans
+    construire tout le flux COPY en mémoire.
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._pending = ""
+        self.count = 0
+
+    def _next_line(self):
+        row = next(self._rows, None)
+        if row is None:
+            return ""
+        self.count += 1
+        return "\t".join(_copy_value(v) for v in row) + "\n"
+
+    def read(self, size=-1):
+        while size < 0 or len(self._pending) < size:
+            line = self._next_line()
+            if not line:
+                break
+            self._pending += line
+        if size < 0:
+            data, self._pending = self._pending, ""
+        else:
+            data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+    def readline(self, size=-1):
+        if not self._pending:
+            self._pending = self._next_line()
+        line, sep, rest = self._pending.partition("\n")
+        self._pending = rest
+        return line + sep
+
+
+def _as_row(tarif: dict, source: str, now: datetime) -> tuple:
+    return (
+        tarif["marque"], tarif["modele"], tarif["type_piece"],
+        tarif.get("qualite") or "", tarif.get("nom_fournisseur") or "",
+        tarif.get("prix_fournisseur_ht"), tarif["prix_client"],
+        tarif.get("categorie") or "standard",
+        tarif.get("source") or source, now,
+    )
+
+
+def load_tarifs(tarifs, source: str = "mobilax", force: bool = False,
+                marque: str = None) -> dict:
+    """Aligne la grille tarifaire sur `tarifs` (itérable de dicts).
+
+    Les tarifs absents de `tarifs` sont retirés (de la seule `marque` si
+    elle est donnée). Lève TarifLoadError si le chargement est refusé.
+    Retourne un rapport {"rows", "inserted", "updated", "unchanged",
+    "removed", "seconds", "rows_per_s"}.
+    """
+    start = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    stream = _CopyStream(_as_row(t, source, now) for t in tarifs)
+    scope, scope_params = ("AND t.marque = %s", (marque,)) if marque else ("", None)
+
+    with get_sync_cursor() as cur:
+        cur.execute(IMPORT_TABLE_SQL)
+        cur.copy_expert(f"COPY tarifs_import ({', '.join(COLUMNS)}) FROM STDIN", stream)
+
+        cur.execute("SELECT COUNT(*) AS n FROM tarifs_import")
+        loaded = cur.fetchone()["n"]
+        if loaded != stream.count:
+            raise TarifLoadError(f"{loaded} lignes chargées sur {stream.count} envoyées")
+        if loaded == 0:
+            raise TarifLoadError("Aucun tarif à charger")
+        if marque:
+            cur.execute("SELECT COUNT(*) AS n FROM tarifs_import WHERE marque <> %s", (marque,))
+            if cur.fetchone()["n"]:
+                raise TarifLoadError(f"Tarifs d'une autre marque dans le chargement {marque}")
+        cur.execute(f"SELECT COUNT(*) AS n FROM tarifs t WHERE TRUE {scope}", scope_params)
+        current = cur.fetchone()["n"]
+        if not force and loaded < current * MIN_RATIO:
+            raise TarifLoadError(
+                f"Nouvelle grille trop petite ({loaded} tarifs contre {current}), import refusé"
+            )
+
+        cur.execute(DEDUPE_SQL.format(table="tarifs_import", tiebreak="ctid"))
+        loaded -= cur.rowcount
+        cur.execute("ANALYZE tarifs_import")
+
+        # Un import concurrent attend la fin de celui-ci ; les lectures continuent
+        cur.execute("LOCK TABLE tarifs IN SHARE ROW EXCLUSIVE MODE")
+        counts = {}
+        for name, sql in MERGE_STEPS:
+            # Seules les étapes qui portent {scope} attendent le paramètre marque
+            cur.execute(sql.format(scope=scope), scope_params if "{scope}" in sql else None)
+            counts[name] = cur.rowcount
+
+    seconds = time.perf_counter() - start
+    rate = loaded / seconds if seconds > 0 else float(loaded)
+    report = {
+        "rows": loaded,
+        "inserted": counts["inserted"],
+        "updated": counts["updated"],
+        "unchanged": loaded - counts["inserted"] - counts["updated"],
+        "removed": counts["removed"],
+        "seconds": round(seconds, 3),
+        "rows_per_s": round(rate),
+    }
+    print(
+        f"[TARIFS] {marque + ' : ' if marque else ''}{loaded} tarifs en {seconds:.2f}s ({rate:.0f} lignes/s) : "
+        f"{report['inserted']} ajoutés, {report['updated']} modifiés, "
+        f"{report['unchanged']} inchangés, {report['removed']} retirés"
+    )
+    return report
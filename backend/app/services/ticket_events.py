@@ -0,0 +1,189 @@
+"""
+Journal des tickets : table append-only `ticket_events`.
+
+Remplace les colonnes texte `historique` et `notes_internes` qui étaient
+relues puis réécrites entièrement à chaque ajout (entrées perdues quand deux
+techniciens écrivaient en même temps). Chaque entrée est désormais un INSERT.
+
+Types d'événements :
+    statut      payload {"de": ..., "vers": ...}
+    historique  payload {"texte": ...}
+    note        payload {"texte": ...}
+
+Migration one-shot des anciennes colonnes texte :
+    python -m app.services.ticket_events
+
+Après la migration d'un ticket, les lignes que l'app Streamlit ajoute encore
+aux colonnes texte sont recopiées en événements par un trigger (migration
+0014).
+"""
+
+import re
+from datetime import datetime
+
+from psycopg2.extras import Json, execute_values
+
+from app.database import get_sync_cursor
+
+
+# Types affichés dans le bloc "Historique" (les notes ont leur propre bloc)
+HISTORY_KINDS = ("statut", "historique")
+NOTE_KINDS = ("note",)
+
+# Nombre max d'événements relus pour reconstruire les blocs texte d'un ticket
+JOURNAL_LIMIT = 500
+
+
+# ─── RENDU TEXTE (compat frontend) ───────────────────────────
+
+def format_event(event: dict) -> str:
+    """Formate un événement comme une ligne des anciennes colonnes texte."""
+    ts = event["ts"]
+    payload = event.get("payload") or {}
+    if event["kind"] == "note":
+        return f"[{ts.strftime('%d/%m/%Y %H:%M')}] {payload.get('texte', '')}"
+    if event["kind"] == "statut":
+        texte = f"Statut: {payload.get('de', '')} → {payload.get('vers', '')}"
+    else:
+        texte = payload.get("texte", "")
+    return f"[{ts.strftime('%d/%m %H:%M')}] {texte}"
+
+
+def is_migrated(events: list[dict]) -> bool:
+    """Vrai si le texte legacy du ticket a déjà été recopié en événements."""
+    return any((e.get("payload") or {}).get("legacy") for e in events)
+
+
+def render_journal(ticket: dict, events: list[dict], migrated: bool = None) -> dict:
+    """Remplit `historique` / `notes_internes` d'un ticket depuis ses événements.
+
+    Tant que le ticket n'est pas migré (`migrate_legacy_text`), son texte
+    legacy reste affiché au-dessus des nouveaux événements. Ensuite, les
+    ajouts faits par Streamlit arrivent comme événements (trigger 0014).
+    """
+    if migrated is None:
+        migrated = is_migrated(events)
+    for field, kinds in (("historique", HISTORY_KINDS), ("notes_internes", NOTE_KINDS)):
+        lines = [format_event(e) for e in events if e["kind"] in kinds]
+        if not lines:
+            continue
+        legacy = None if migrated else (ticket.get(field) or "").strip()
+        ticket[field] = "\n".join([legacy] + lines if legacy else lines)
+    return ticket
+
+
+# ─── MIGRATION DES COLONNES TEXTE ────────────────────────────
+
+_LINE_RE = re.compile(
+    r"^\[(?P<day>\d{2})/(?P<month>\d{2})(?:/(?P<year>\d{4}))?\s+"
+    r"(?P<hour>\d{2}):(?P<minute>\d{2})\]\s?(?P<texte>.*)$"
+)
+_STATUT_RE = re.compile(r"^Statut:\s*(?P<de>.*?)\s*→\s*(?P<vers>.*)$")
+
+
+def _parse_depot(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.strptime(str(value)[:19], "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return datetime.now()
+
+
+def parse_legacy(text: str, kind: str, start: datetime) -> list[tuple]:
+    """Découpe un ancien bloc texte en (ts, kind, payload).
+
+    Les lignes "[dd/mm HH:MM]" n'ont pas d'année : on part de l'année de dépôt
+    et on passe à l'année suivante quand le mois recule. Une ligne sans
+    horodatage est rattachée à l'entrée précédente.
+    """
+    entries = []
+    year, last_month = start.year, start.month
+    for line in (text or "").splitlines():
+        if not line.strip():
+            continue
+        m = _LINE_RE.match(line.strip())
+        if not m:
+            if entries:
+                ts, k, payload = entries[-1]
+                payload["texte"] = f"{payload.get('texte', '')}\n{line}".strip()
+                entries[-1] = (ts, k, payload)
+            else:
+                entries.append((start, kind, {"texte": line.strip()}))
+            continue
+
+        month = int(m["month"])
+        if m["year"]:
+            year = int(m["year"])
+        elif month < last_month:
+            year += 1
+        last_month = month
+        try:
+            ts = datetime(year, month, int(m["day"]), int(m["hour"]), int(m["minute"]))
+        except ValueError:
+            ts = start
+
+        texte = m["texte"]
+        statut = _STATUT_RE.match(texte) if kind == "historique" else None
+        if statut:
+            entries.append((ts, "statut", {"de": statut["de"], "vers": statut["vers"]}))
+        else:
+            entries.append((ts, kind, {"texte": texte}))
+    return entries
+
+
+def migrate_legacy_text(batch_size: int = 500) -> int:
+    """Recopie `historique` / `notes_internes` dans ticket_events.
+
+    Idempotent : les tickets ayant déjà des événements "legacy" sont ignorés.
+    Retourne le nombre d'événements insérés.
+    """
+    inserted = 0
+    last_id = 0
+    while True:
+        with get_sync_cursor() as cur:
+            cur.execute("""
+                SELECT t.id, t.date_depot, t.historique, t.notes_internes
+                FROM tickets t
+                WHERE t.id > %s
+                  AND (COALESCE(t.historique, '') <> '' OR COALESCE(t.notes_internes, '') <> '')
+                  AND NOT EXISTS (
+                      SELECT 1 FROM ticket_events e
+                      WHERE e.ticket_id = t.id AND e.payload ? 'legacy'
+                  )
+                ORDER BY t.id
+                LIMIT %s
+                -- Un ajout Streamlit attend la fin du lot : le trigger 0014
+                -- voit alors le ticket migré
+                FOR UPDATE OF t
+            """, (last_id, batch_size))
+            tickets = cur.fetchall()
+            if not tickets:
+                return inserted
+
+            rows = []
+            for t in tickets:
+                start = _parse_depot(t["date_depot"])
+                parsed = (
+                    parse_legacy(t["historique"], "historique", start)
+                    + parse_legacy(t["notes_internes"], "note", start)
+                )
+                for ts, kind, payload in parsed:
+                    payload["legacy"] = True
+                    rows.append((t["id"], ts, kind, "", Json(payload)))
+            if rows:
+                execute_values(
+                    cur,
+                    "INSERT INTO ticket_events (ticket_id, ts, kind, author, payload) VALUES %s",
+                    rows,
+                )
+            inserted += len(rows)
+            last_id = tickets[-1]["id"]
+            print(f"[EVENTS] Tickets migrés jusqu'à #{last_id} ({inserted} événements)")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    total = migrate_legacy_text()
+    print(f"[EVENTS] Migration terminée : {total} événements insérés")
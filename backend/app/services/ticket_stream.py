@@ -0,0 +1,153 @@
+"""
+Flux temps réel des tickets pour le dashboard (Server-Sent Events).
+
+Un trigger sur `tickets` (migration 0005) émet
+`pg_notify('ticket_changes', ...)` à chaque création / modification /
+suppression, avec un numéro de séquence global (`ticket_changes_seq`). Le listener LISTEN/NOTIFY de chaque worker relaie
+ces notifications aux clients SSE connectés, puis pousse un instantané des
+KPI quand un statut a changé.
+
+Reprise : chaque message SSE porte `id: <seq>`. Un client qui se reconnecte
+avec `Last-Event-ID` reçoit les événements manqués encore en mémoire, ou un
+événement `reset` (refetch complet) s'ils ne le sont plus.
+"""
+
+import asyncio
+import json
+from collections import deque
+
+from app.database import get_cursor
+from app.services import kpi, shop_time
+from app.services.pg_listener import get_listener
+
+CHANNEL = "ticket_changes"
+# Événements gardés en mémoire pour la reprise après reconnexion
+REPLAY_BUFFER = 500
+# File max par client avant de lui demander un refetch complet
+CLIENT_QUEUE_SIZE = 1000
+# Regroupe les rafraîchissements KPI d'une rafale de changements
+KPI_DEBOUNCE = 0.3
+
+
+def _sse(event: str, data: dict, event_id=None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class TicketStream:
+    """Diffuse les notifications `ticket_changes` aux abonnés SSE du worker."""
+
+    def __init__(self):
+        self._loop = None
+        self._subscribers = set()
+        self._overflowed = set()
+        self._buffer = deque(maxlen=REPLAY_BUFFER)
+        self._kpi_task = None
+        self._kpi_dirty = False
+
+    def start(self, loop):
+        """Branche le flux sur le listener du process (appelé au démarrage)."""
+        self._loop = loop
+        listener = get_listener()
+        listener.subscribe(CHANNEL, self._on_notify)
+        listener.on_reconnect(self._on_reconnect)
+        listener.start()
+
+    # ─── CÔTÉ THREAD LISTENER ────────────────────────────────
+
+    def _on_notify(self, channel, payload):
+        self._loop.call_soon_threadsafe(self._dispatch, payload)
+
+    def _on_reconnect(self):
+        self._loop.call_soon_threadsafe(self._reset_all)
+
+    # ─── CÔTÉ BOUCLE ASYNCIO ─────────────────────────────────
+
+    def _publish(self, message: str):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._overflowed.add(queue)
+
+    def _dispatch(self, payload):
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            return
+        seq = int(change.pop("seq"))
+        message = _sse("ticket", change, seq)
+        self._buffer.append((seq, message))
+        self._publish(message)
+
+        if change["op"] != "UPDATE" or change.get("statut") != change.get("ancien_statut"):
+            self._schedule_kpi()
+
+    def _reset_all(self):
+        # Des notifications ont pu être perdues : tout le monde refetch
+        self._buffer.clear()
+        self._publish(_sse("reset", {}))
+
+    def _schedule_kpi(self):
+        # Un changement arrivé pendant la requête relance un tour de _push_kpi
+        self._kpi_dirty = True
+        if self._kpi_task is None or self._kpi_task.done():
+            self._kpi_task = self._loop.create_task(self._push_kpi())
+
+    async def _push_kpi(self):
+        while self._kpi_dirty:
+            await asyncio.sleep(KPI_DEBOUNCE)
+            self._kpi_dirty = False
+            try:
+                debut, fin = await shop_time.atoday_bounds()
+                async with get_cursor() as cur:
+                    await cur.execute(kpi.KPI_SQL, {"debut": debut, "fin": fin})
+                    row = await cur.fetchone()
+            except Exception as e:
+                print(f"[STREAM] KPI indisponibles: {e}")
+                continue
+            self._publish(_sse("kpi", dict(row or {})))
+
+    # ─── ABONNÉS ─────────────────────────────────────────────
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        self._overflowed.discard(queue)
+
+    def overflowed(self, queue: asyncio.Queue) -> bool:
+        """Vrai (une seule fois) si le client a décroché et doit tout refetch."""
+        if queue in self._overflowed:
+            self._overflowed.discard(queue)
+            while not queue.empty():
+                queue.get_nowait()
+            return True
+        return False
+
+    def replay(self, last_event_id):
+        """Messages à renvoyer à un client qui reprend après `last_event_id`.
+
+        Retourne None si l'historique en mémoire ne couvre pas la reprise.
+        """
+        try:
+            last = int(last_event_id)
+        except (TypeError, ValueError):
+            return []
+        # Les NOTIFY arrivent dans l'ordre des COMMIT, pas forcément des seq :
+        # on repart de la position du dernier événement reçu par le client.
+        messages = list(self._buffer)
+        for i, (seq, _) in enumerate(messages):
+            if seq == last:
+                return [msg for _, msg in messages[i + 1:]]
+        return None
+
+
+stream = TicketStream()
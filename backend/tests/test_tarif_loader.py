@@ -0,0 +1,85 @@
+"""
+Chargement des tarifs par marque (tarif_loader.load_tarifs).
+
+    python -m pytest tests/test_tarif_loader.py
+
+Le test sur base réelle ne tourne qu'avec TEST_DATABASE_URL (base locale
+jetable : les migrations y sont appliquées et des tarifs y sont écrits).
+"""
+
+import os
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from app.services import tarif_loader  # noqa: E402
+from app.services.tarif_loader import load_tarifs  # noqa: E402
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def _tarif(marque, modele, prix):
+    return {
+        "marque": marque, "modele": modele, "type_piece": "Ecran",
+        "qualite": "Original", "prix_fournisseur_ht": prix, "prix_client": prix * 2,
+    }
+
+
+class _FakeCursor:
+    """Curseur minimal : vérifie les paramètres comme psycopg2 (`sql % params`)."""
+
+    def __init__(self):
+        self.copied = 0
+        self.rowcount = 0
+        self._row = None
+
+    def execute(self, sql, params=None):
+        if params is not None:
+            sql % tuple(params)  # TypeError si placeholders et paramètres divergent
+        self._row = {"n": self.copied if sql == "SELECT COUNT(*) AS n FROM tarifs_import" else 0}
+
+    def copy_expert(self, sql, stream):
+        while stream.readline():
+            pass
+        self.copied = stream.count
+
+    def fetchone(self):
+        return self._row
+
+
+def test_fusion_par_marque_parametres(monkeypatch):
+    cur = _FakeCursor()
+
+    @contextmanager
+    def fake_cursor():
+        yield cur
+
+    monkeypatch.setattr(tarif_loader, "get_sync_cursor", fake_cursor)
+    report = load_tarifs([_tarif("Samsung", "A52", 40.0)], marque="Samsung")
+    assert report["rows"] == 1
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL non définie")
+def test_fusion_par_marque_base(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", TEST_DATABASE_URL)
+    monkeypatch.delenv("DATABASE_READ_URL", raising=False)
+    from app import migrate
+    from app.database import get_sync_cursor
+
+    migrate.migrate()
+    with get_sync_cursor() as cur:
+        cur.execute("DELETE FROM tarifs WHERE marque IN ('TestA', 'TestB')")
+
+    load_tarifs([_tarif("TestA", "M1", 10.0), _tarif("TestA", "M2", 20.0)], marque="TestA", force=True)
+    load_tarifs([_tarif("TestB", "M1", 30.0)], marque="TestB", force=True)
+    report = load_tarifs([_tarif("TestA", "M1", 11.0)], marque="TestA", force=True)
+
+    assert (report["inserted"], report["updated"], report["removed"]) == (0, 1, 1)
+    with get_sync_cursor() as cur:
+        cur.execute(
+            "SELECT marque, modele FROM tarifs WHERE marque IN ('TestA', 'TestB') ORDER BY 1, 2"
+        )
+        assert [(r["marque"], r["modele"]) for r in cur.fetchall()] == [("TestA", "M1"), ("TestB", "M1")]
+        cur.execute("DELETE FROM tarifs WHERE marque IN ('TestA', 'TestB')")
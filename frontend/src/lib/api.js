@@ -121,6 +121,11 @@ class ApiClient {
     return this.get('/api/tickets/stats/kpi');
   }
 
+  // EventSource ne gère pas l'en-tête Authorization : token en query
+  ticketStreamUrl() {
+    return `${API_URL}/api/tickets/stream?token=${encodeURIComponent(this.token || '')}`;
+  }
+
   addNote(id, note) {
     return this.post(`/api/tickets/${id}/note?note=${encodeURIComponent(note)}`);
   }
@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import api from '../lib/api';
 import StatusBadge from '../components/StatusBadge';
@@ -17,6 +17,8 @@ export default function DashboardPage() {
   const [search, setSearch] = useState('');
   const [filterStatut, setFilterStatut] = useState('');
   const [refreshKey, setRefreshKey] = useState(0);
+  // Rechargement demandé par le flux temps réel : lu sur la base principale
+  const freshRef = useRef(false);
 
   const loadData = useCallback(async () => {
     setLoading(true);
@@ -24,6 +26,8 @@ export default function DashboardPage() {
       const params = {};
       if (search) params.search = search;
       if (filterStatut) params.statut = filterStatut;
+      if (freshRef.current) params.fresh = 1;
+      freshRef.current = false;
 
       const [kpiData, ticketsData] = await Promise.all([
         api.getKPI(),
@@ -40,10 +44,54 @@ export default function DashboardPage() {
 
   useEffect(() => { loadData(); }, [loadData]);
 
-  // Auto-refresh toutes les 30s
+  // Tickets affichés et filtres, lus par le flux temps réel sans le relancer
+  const ticketsRef = useRef(tickets);
+  useEffect(() => { ticketsRef.current = tickets; }, [tickets]);
+  const filtersRef = useRef({ search, filterStatut });
+  useEffect(() => { filtersRef.current = { search, filterStatut }; }, [search, filterStatut]);
+
+  // Temps réel (SSE) : on ne recharge que ce qui a changé
   useEffect(() => {
-    const interval = setInterval(() => setRefreshKey(k => k + 1), 30000);
-    return () => clearInterval(interval);
+    const source = new EventSource(api.ticketStreamUrl());
+    const reload = () => setRefreshKey(k => k + 1);
+    // La réplique peut avoir jusqu'à quelques secondes de retard sur le NOTIFY
+    const reloadFresh = () => {
+      freshRef.current = true;
+      reload();
+    };
+
+    source.addEventListener('kpi', (e) => setKpi(JSON.parse(e.data)));
+    source.addEventListener('reset', reloadFresh);
+    source.addEventListener('ticket', async (e) => {
+      const change = JSON.parse(e.data);
+      if (change.op === 'INSERT') {
+        reloadFresh();
+      } else if (change.op === 'DELETE') {
+        setTickets(ts => ts.filter(t => t.id !== change.id));
+      } else if (filtersRef.current.search) {
+        // La correspondance à la recherche se décide côté serveur
+        reloadFresh();
+      } else if (filtersRef.current.filterStatut && change.statut !== filtersRef.current.filterStatut) {
+        setTickets(ts => ts.filter(t => t.id !== change.id));
+      } else if (!ticketsRef.current.some(t => t.id === change.id)) {
+        // Ticket qui entre dans le filtre de statut
+        if (filtersRef.current.filterStatut) reloadFresh();
+      } else {
+        try {
+          const fresh = await api.getTicket(change.id);
+          setTickets(ts => ts.map(t => (t.id === change.id ? fresh : t)));
+        } catch (err) {
+          console.error(err);
+        }
+      }
+    });
+
+    // Filet de sécurité si le flux est coupé par un proxy
+    const interval = setInterval(reload, 5 * 60 * 1000);
+    return () => {
+      source.close();
+      clearInterval(interval);
+    };
   }, []);
 
   const kpiCards = kpi ? [
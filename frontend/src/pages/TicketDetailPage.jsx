@@ -31,7 +31,6 @@ export default function TicketDetailPage() {
         devis_estime: data.devis_estime || '',
         tarif_final: data.tarif_final || '',
         acompte: data.acompte || '',
-        notes_internes: data.notes_internes || '',
         technicien_assigne: data.technicien_assigne || '',
         reparation_supp: data.reparation_supp || '',
         prix_supp: data.prix_supp || '',